@@ -0,0 +1,91 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+from tracing import span
+
+# Cross-container coordination through Postgres session advisory locks.
+# Every container of the function may serve a webhook, so in-process locks
+# are not enough. Locks use the two-int form (namespace, key); a lock is
+# released explicitly or when its connection closes.
+
+CHAT_LOCK_NAMESPACE = 7340201
+LLM_SLOT_NAMESPACE = 7340202
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+LLM_QUEUE_TIMEOUT = float(os.environ.get('LLM_QUEUE_TIMEOUT', '15'))
+
+
+class LLMOverloaded(Exception):
+    """No LLM slot became free within LLM_QUEUE_TIMEOUT; the request is shed"""
+
+
+def chat_key(chat_id: int) -> int:
+    """Telegram chat ids are 64-bit; fold them into the int4 lock key"""
+    return (chat_id ^ (chat_id >> 31)) & 0x7FFFFFFF
+
+
+def try_lock(cur, namespace: int, key: int) -> bool:
+    cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (namespace, key))
+    return bool(cur.fetchone()[0])
+
+
+def unlock(cur, namespace: int, key: int) -> None:
+    cur.execute("SELECT pg_advisory_unlock(%s, %s)", (namespace, key))
+
+
+def wait_for_lock(conn, namespace: int, keys: List[int], timeout: float) -> Optional[int]:
+    """Poll until one of keys is locked; returns it, or None after timeout"""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    with conn.cursor() as cur:
+        while True:
+            for key in keys:
+                if try_lock(cur, namespace, key):
+                    conn.commit()
+                    return key
+            conn.commit()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining) * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, 1.0)
+
+
+def acquire_chat_lock(conn, chat_id: int, timeout: float) -> bool:
+    """Serialize turns of one chat across containers; hold it on a dedicated connection"""
+    with span('db.chat_lock'):
+        return wait_for_lock(conn, CHAT_LOCK_NAMESPACE, [chat_key(chat_id)], timeout) is not None
+
+
+@contextmanager
+def llm_slot(conn, max_concurrency: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[int]:
+    """Hold one of max_concurrency global LLM slots for the duration of a call
+
+    Waits in a randomized poll loop (cheap queueing) and raises LLMOverloaded
+    when nothing frees up in time, so bursts fail fast for the excess
+    requests instead of every request timing out together.
+    """
+    slots = list(range(max_concurrency or LLM_MAX_CONCURRENCY))
+    random.shuffle(slots)
+    started = time.monotonic()
+    with span('llm.queue'):
+        slot = wait_for_lock(conn, LLM_SLOT_NAMESPACE, slots,
+                             LLM_QUEUE_TIMEOUT if timeout is None else timeout)
+    if slot is None:
+        raise LLMOverloaded(f"No LLM slot free after {time.monotonic() - started:.1f}s")
+    waited = time.monotonic() - started
+    if waited > 0.5:
+        print(f"Waited {waited:.1f}s for LLM slot {slot}")
+    try:
+        yield slot
+    finally:
+        # A broken connection has already dropped the lock server-side
+        try:
+            with conn.cursor() as cur:
+                unlock(cur, LLM_SLOT_NAMESPACE, slot)
+            conn.commit()
+        except Exception as e:
+            print(f"Warning: could not release LLM slot {slot}: {str(e)}")
@@ -1,214 +1,29 @@
 import json
 import os
-import psycopg2
-from openai import OpenAI
-from typing import Dict, List, Any, Optional, Tuple
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Tuple
+from lazy_imports import lazy_module
+from telegram_format import format_response_for_telegram, split_message
+from tracing import traced, span, bind_context
+from profiling import profiled
+from advisory_locks import acquire_chat_lock
 
-class AssistantResponse(BaseModel):
-    """Structured response from AI assistant"""
-    completion_text: str = Field(description="Assistant's response text")
-    related_users_ids: List[str] = Field(description="IDs of entrepreneurs related to the response", default=[])
+# Models, DB access and the LLM call live in shared_logic; it is imported on
+# the first POST so preflights and cold starts stay cheap
+core = lazy_module('shared_logic')
 
-class ChatMessage(BaseModel):
-    """Chat message structure"""
-    role: str = Field(pattern="^(user|assistant)$")
-    content: str
+TELEGRAM_API_URL = os.environ.get('TELEGRAM_API_URL', 'https://api.telegram.org')
+TELEGRAM_PROCESSING_TIMEOUT = float(os.environ.get('TELEGRAM_PROCESSING_TIMEOUT', '55'))
+# How long a webhook waits for the previous turn of the same chat; if it gives
+# up, its message stays pending and the turn holding the lock answers it
+TELEGRAM_CHAT_LOCK_TIMEOUT = float(os.environ.get('TELEGRAM_CHAT_LOCK_TIMEOUT', '20'))
+# A queued turn only starts with at least this much of the budget left;
+# otherwise the queued messages get OVERLOADED_TEXT so the user resends
+TELEGRAM_MIN_TURN_SECONDS = float(os.environ.get('TELEGRAM_MIN_TURN_SECONDS', '10'))
+# Messages arriving within this many seconds of each other become one turn
+TELEGRAM_MERGE_WINDOW = float(os.environ.get('TELEGRAM_MERGE_WINDOW', '2'))
 
-class TelegramMessage(BaseModel):
-    """Telegram message structure"""
-    message_id: int
-    text: Optional[str] = None
-    chat: Dict[str, Any]
-    from_user: Optional[Dict[str, Any]] = Field(None, alias="from")
-
-class TelegramUpdate(BaseModel):
-    """Telegram webhook update"""
-    update_id: int
-    message: Optional[TelegramMessage] = None
-
-def get_db_connection():
-    """Get database connection"""
-    return psycopg2.connect(os.environ['DATABASE_URL'])
-
-def get_all_entrepreneurs() -> List[Dict[str, Any]]:
-    """Load all entrepreneurs from database"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        cur.execute("""
-            SELECT 
-                e.id,
-                e.name,
-                e.description,
-                e.goal,
-                e.post_url
-            FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs e
-            ORDER BY e.id
-        """)
-        
-        entrepreneurs = []
-        for row in cur.fetchall():
-            entrepreneurs.append({
-                "id": row[0],
-                "name": row[1],
-                "description": row[2] or "",
-                "goal": row[3] or "",
-                "post_url": row[4] or ""
-            })
-        
-        return entrepreneurs
-        
-    finally:
-        cur.close()
-        conn.close()
-
-def save_telegram_message(chat_id: int, message_id: int, user_id: Optional[int], role: str, content: str) -> None:
-    """Save message to database"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        cur.execute("""
-            INSERT INTO t_p95295728_unicorn_lab_visualiz.telegram_messages 
-            (chat_id, message_id, user_id, role, content)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (chat_id, message_id) DO NOTHING
-        """, (chat_id, message_id, user_id, role, content))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
-
-def get_telegram_history(chat_id: int, limit: int = 20) -> List[ChatMessage]:
-    """Load chat history from database"""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    try:
-        cur.execute("""
-            SELECT role, content
-            FROM t_p95295728_unicorn_lab_visualiz.telegram_messages
-            WHERE chat_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s
-        """, (chat_id, limit))
-        
-        messages = []
-        for row in reversed(cur.fetchall()):
-            messages.append(ChatMessage(role=row[0], content=row[1]))
-        
-        return messages
-        
-    finally:
-        cur.close()
-        conn.close()
-
-def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
-    """Create system prompt with all entrepreneurs data"""
-    base_prompt = """Ты - AI ассистент для поиска и анализа участников сообщества предпринимателей.
-
-БАЗА ДАННЫХ УЧАСТНИКОВ:
-"""
-    
-    for e in entrepreneurs:
-        base_prompt += f"\nID: {str(e['id'])}\nИмя: {e['name']}\nОписание: {e['description']}\nЦель: {e['goal']}\n---"
-    
-    base_prompt += """
-
-ТВОИ ЗАДАЧИ:
-1. Помогать находить подходящих участников по запросам пользователя
-2. Анализировать связи и возможности для сотрудничества
-3. Давать рекомендации по нетворкингу
-
-ВАЖНЫЕ ПРАВИЛА ОТВЕТА:
-- В тексте ответа НИКОГДА не упоминай ID участников - это внутренние технические данные
-- Используй ТОЛЬКО имена участников (например: "Александр Иванов", "Мария Петрова")
-- Будь дружелюбным и говори простым языком, как личный помощник
-- Объясняй, почему именно эти люди подходят под запрос
-- Можешь предлагать неочевидные связи и синергии
-- Структурируй ответ: сначала кратко, потом детали про каждого
-- НЕ используй Markdown форматирование (жирный шрифт, звездочки, заголовки)
-- Пиши обычным текстом с простыми переносами строк
-
-ТЕХНИЧЕСКИЕ ПРАВИЛА (не для текста):
-- В поле related_users_ids возвращай ID найденных участников для системы
-- Если не нашел подходящих - верни пустой список related_users_ids
-- related_users_ids используется только для подсветки на графе, не упоминай это в тексте
-
-ПРИМЕРЫ ХОРОШИХ ОТВЕТОВ:
-"Нашел 3 отличных кандидата для вашего AI проекта:
-
-Иван Сидоров - разработчик с опытом в машинном обучении, ищет команду для стартапа.
-
-Елена Козлова - продакт-менеджер в сфере AI, может помочь с продуктовой стратегией.
-
-Петр Николаев - инвестор, активно вкладывается в AI проекты на ранних стадиях."
-
-ФОРМАТ ОТВЕТА:
-{
-    "completion_text": "Твой текстовый ответ БЕЗ упоминания ID",
-    "related_users_ids": ["141", "142", "143"]  // ID для системы, не упоминать в тексте
-}"""
-    
-    return base_prompt
-
-def get_openai_client() -> OpenAI:
-    """Initialize OpenAI client with proxy if needed"""
-    api_key = os.environ.get('OPENAI_API_KEY')
-    proxy_url = os.environ.get('OPENAI_HTTP_PROXY')
-    
-    http_client = None
-    if proxy_url:
-        import httpx
-        http_client = httpx.Client(proxies=proxy_url)
-        print(f"Using proxy: {proxy_url}")
-    else:
-        print("WARNING: No proxy configured, OpenAI might be blocked")
-    
-    return OpenAI(api_key=api_key, http_client=http_client)
-
-def process_ai_request(messages: List[ChatMessage]) -> Tuple[str, List[str], List[Dict[str, Any]]]:
-    """Core AI processing logic"""
-    entrepreneurs = get_all_entrepreneurs()
-    if not entrepreneurs:
-        raise Exception("No entrepreneurs found in database")
-    
-    system_prompt = create_system_prompt(entrepreneurs)
-    client = get_openai_client()
-    
-    openai_messages = [{"role": "system", "content": system_prompt}]
-    for msg in messages[-20:]:
-        openai_messages.append({"role": msg.role, "content": msg.content})
-    
-    completion = client.beta.chat.completions.parse(
-        model="gpt-4.1",
-        messages=openai_messages,
-        response_format=AssistantResponse
-    )
-    
-    assistant_response = completion.choices[0].message.parsed
-    return (assistant_response.completion_text, assistant_response.related_users_ids, entrepreneurs)
-
-def format_response_for_telegram(
-    completion_text: str, 
-    related_users_ids: List[str],
-    entrepreneurs: List[Dict[str, Any]]
-) -> str:
-    """Format response for Telegram with hyperlinks"""
-    entrepreneurs_map = {str(e['id']): e for e in entrepreneurs}
-    formatted_text = completion_text
-    
-    for user_id in related_users_ids:
-        entrepreneur = entrepreneurs_map.get(user_id)
-        if entrepreneur and entrepreneur.get('post_url'):
-            name = entrepreneur['name']
-            post_url = entrepreneur['post_url']
-            formatted_text = formatted_text.replace(f"**{name}**", f"[{name}]({post_url})")
-            formatted_text = formatted_text.replace(name, f"[{name}]({post_url})")
-    
-    return formatted_text
+NOT_FOUND_TEXT = "По вашему запросу ничего не нашёл, попробуйте переформулировать запрос и отправить еще один."
+OVERLOADED_TEXT = "Сейчас слишком много запросов. Пожалуйста, повторите через минуту."
 
 def send_telegram_message(chat_id: int, text: str, reply_to_message_id: Optional[int] = None) -> Dict[str, Any]:
     """Send message to Telegram via Bot API"""
@@ -218,7 +33,7 @@ def send_telegram_message(chat_id: int, text: str, reply_to_message_id: Optional
     
     import requests
     
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": text,
@@ -229,7 +44,8 @@ def send_telegram_message(chat_id: int, text: str, reply_to_message_id: Optional
     if reply_to_message_id:
         payload["reply_to_message_id"] = reply_to_message_id
     
-    response = requests.post(url, json=payload)
+    with span('telegram.send'):
+        response = requests.post(url, json=payload)
     
     if not response.ok:
         print(f"Telegram API error: {response.text}")
@@ -245,7 +61,7 @@ def edit_telegram_message(chat_id: int, message_id: int, text: str) -> None:
     
     import requests
     
-    url = f"https://api.telegram.org/bot{bot_token}/editMessageText"
+    url = f"{TELEGRAM_API_URL}/bot{bot_token}/editMessageText"
     payload = {
         "chat_id": chat_id,
         "message_id": message_id,
@@ -254,19 +70,19 @@ def edit_telegram_message(chat_id: int, message_id: int, text: str) -> None:
         "disable_web_page_preview": False
     }
     
-    response = requests.post(url, json=payload)
+    with span('telegram.edit'):
+        response = requests.post(url, json=payload)
     
     if not response.ok:
         print(f"Telegram edit error: {response.text}")
 
 def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle Telegram webhook request with animated status messages"""
+    """Handle Telegram webhook request: queue the message per chat, then answer what is pending"""
     import time
-    import threading
     
     print(f"Received Telegram update: {json.dumps(body_data)}")
     
-    update = TelegramUpdate(**body_data)
+    update = core.TelegramUpdate(**body_data)
     
     if not update.message or not update.message.text:
         return {
@@ -302,14 +118,15 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
         
         bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
         import requests
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+        url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
         payload = {
             "chat_id": chat_id,
             "text": welcome_message,
             "parse_mode": "Markdown",
             "disable_web_page_preview": True
         }
-        requests.post(url, json=payload)
+        with span('telegram.send'):
+            requests.post(url, json=payload)
         
         return {
             'statusCode': 200,
@@ -317,7 +134,72 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
             'body': json.dumps({'ok': True})
         }
     
-    save_telegram_message(chat_id, message_id, user_id, 'user', user_message)
+    received_at = time.monotonic()
+    if not core.save_pending_message(chat_id, message_id, user_id, user_message):
+        print(f"Duplicate update for message {message_id}, already handled")
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'ok': True})
+        }
+    
+    # One turn per chat at a time, across containers. The lock lives on its own
+    # connection, closed on return, so a frozen container cannot keep it.
+    lock_conn = core.open_lock_connection()
+    try:
+        if not acquire_chat_lock(lock_conn, chat_id, TELEGRAM_CHAT_LOCK_TIMEOUT):
+            print(f"Chat {chat_id} is busy; message {message_id} is left to the turn holding the lock")
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'ok': True, 'queued': True})
+            }
+        
+        # Let quick follow-ups land so they are answered together
+        time.sleep(max(0.0, TELEGRAM_MERGE_WINDOW - (time.monotonic() - received_at)))
+        pending = core.get_pending_messages(chat_id)
+        if message_id not in {pending_id for pending_id, _ in pending}:
+            print(f"Message {message_id} was answered by the previous turn")
+            return {
+                'statusCode': 200,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'ok': True, 'merged': True})
+            }
+        
+        budget = TELEGRAM_PROCESSING_TIMEOUT - (time.monotonic() - received_at)
+        response = answer_telegram_turn(chat_id, message_id, pending, budget)
+        answer_queued_messages(chat_id, received_at)
+        return response
+    finally:
+        lock_conn.close()
+
+def answer_queued_messages(chat_id: int, received_at: float) -> None:
+    """Answer messages whose webhooks gave up waiting for the chat lock; call with the lock held"""
+    import time
+    
+    while True:
+        pending = core.get_pending_messages(chat_id)
+        if not pending:
+            return
+        answered_ids = [pending_id for pending_id, _ in pending]
+        budget = TELEGRAM_PROCESSING_TIMEOUT - (time.monotonic() - received_at)
+        if budget < TELEGRAM_MIN_TURN_SECONDS:
+            print(f"No time left for {len(pending)} queued messages of chat {chat_id}; asking to resend")
+            reply = send_telegram_message(chat_id, OVERLOADED_TEXT, reply_to_message_id=answered_ids[-1])
+            core.complete_telegram_turn(chat_id, answered_ids, reply['result']['message_id'], OVERLOADED_TEXT)
+            return
+        print(f"Answering {len(pending)} messages queued behind the previous turn of chat {chat_id}")
+        answer_telegram_turn(chat_id, answered_ids[-1], pending, budget)
+
+def answer_telegram_turn(chat_id: int, message_id: int, pending: List[Tuple[int, str]], timeout: float) -> Dict[str, Any]:
+    """Answer all pending messages of a chat with one LLM turn, animating a status message"""
+    import time
+    import threading
+    
+    answered_ids = [pending_id for pending_id, _ in pending]
+    user_message = "\n\n".join(content for _, content in pending)
+    if len(pending) > 1:
+        print(f"Merging {len(pending)} messages of chat {chat_id} into one turn")
     
     loading_texts = [
         "Думаю...",
@@ -342,18 +224,19 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
                 index = (index + 1) % len(loading_texts)
                 edit_telegram_message(chat_id, status_message_id, loading_texts[index])
     
-    animation_thread = threading.Thread(target=animate_status, daemon=True)
+    animation_thread = threading.Thread(target=bind_context(animate_status), daemon=True)
     animation_thread.start()
     
     result = {'completed': False, 'data': None, 'error': None}
     
     def process_request():
         try:
-            history = get_telegram_history(chat_id, limit=20)
-            messages = history + [ChatMessage(role="user", content=user_message)]
+            history, entrepreneurs = core.load_telegram_context(chat_id, limit=20)
+            messages = history + [core.ChatMessage(role="user", content=user_message)]
             
-            completion_text, related_users_ids, entrepreneurs = process_ai_request(messages)
-            formatted_text = format_response_for_telegram(completion_text, related_users_ids, entrepreneurs)
+            completion_text, related_users_ids, entrepreneurs = core.process_ai_request(messages, entrepreneurs)
+            with span('compute.telegram_format'):
+                formatted_text = format_response_for_telegram(completion_text, related_users_ids, entrepreneurs)
             
             result['data'] = (completion_text, formatted_text)
             result['completed'] = True
@@ -361,20 +244,19 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
             result['error'] = e
             result['completed'] = True
     
-    processing_thread = threading.Thread(target=process_request, daemon=True)
+    processing_thread = threading.Thread(target=bind_context(process_request), daemon=True)
     processing_thread.start()
     
-    processing_thread.join(timeout=55.0)
+    processing_thread.join(timeout=max(timeout, 1.0))
     
     stop_animation.set()
     time.sleep(0.5)
     
-    if not result['completed'] or result['data'] is None:
-        error_text = "По вашему запросу ничего не нашёл, попробуйте переформулировать запрос и отправить еще один."
-        edit_telegram_message(chat_id, status_message_id, error_text)
-        save_telegram_message(chat_id, status_message_id, None, 'assistant', error_text)
+    if not result['completed']:
+        edit_telegram_message(chat_id, status_message_id, NOT_FOUND_TEXT)
+        core.complete_telegram_turn(chat_id, answered_ids, status_message_id, NOT_FOUND_TEXT)
         
-        print(f"Telegram request timeout after 55 seconds")
+        print(f"Telegram request timeout after {timeout:.0f} seconds")
         
         return {
             'statusCode': 200,
@@ -383,9 +265,9 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
         }
     
     if result['error']:
-        error_text = "По вашему запросу ничего не нашёл, попробуйте переформулировать запрос и отправить еще один."
+        error_text = OVERLOADED_TEXT if isinstance(result['error'], (core.LLMOverloaded, core.PoolTimeout)) else NOT_FOUND_TEXT
         edit_telegram_message(chat_id, status_message_id, error_text)
-        save_telegram_message(chat_id, status_message_id, None, 'assistant', error_text)
+        core.complete_telegram_turn(chat_id, answered_ids, status_message_id, error_text)
         
         print(f"Error in Telegram handler: {str(result['error'])}")
         import traceback
@@ -398,8 +280,11 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
         }
     
     completion_text, formatted_text = result['data']
-    edit_telegram_message(chat_id, status_message_id, formatted_text)
-    save_telegram_message(chat_id, status_message_id, None, 'assistant', completion_text)
+    chunks = split_message(formatted_text)
+    edit_telegram_message(chat_id, status_message_id, chunks[0])
+    for chunk in chunks[1:]:
+        send_telegram_message(chat_id, chunk)
+    core.complete_telegram_turn(chat_id, answered_ids, status_message_id, completion_text)
     
     return {
         'statusCode': 200,
@@ -408,12 +293,39 @@ def handle_telegram_webhook(body_data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 def handle_web_chat(body_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle web chat request"""
+    """Handle web chat request: {session_id, message} with history kept on the server,
+    or the legacy {messages} with the whole conversation"""
+    session_id = body_data.get('session_id')
+    if session_id is not None:
+        message = body_data.get('message')
+        if not core.is_valid_session_id(session_id) or not isinstance(message, str) or not message.strip() \
+                or len(message) > core.WEB_CHAT_MAX_MESSAGE_LENGTH:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'session_id and a non-empty message are required'})
+            }
+    
     try:
-        messages_data = body_data.get('messages', [])
-        messages = [ChatMessage(**msg) for msg in messages_data]
+        if session_id is not None:
+            history, entrepreneurs = core.load_web_chat_context(session_id)
+            messages = history + [core.ChatMessage(role='user', content=message)]
+            completion_text, related_users_ids, _ = core.process_ai_request(messages, entrepreneurs)
+            core.save_web_chat_turn(session_id, history, message, completion_text)
+        else:
+            messages_data = body_data.get('messages', [])
+            messages = [core.ChatMessage(**msg) for msg in messages_data]
+            completion_text, related_users_ids, _ = core.process_ai_request(messages)
+        
+        response_data = {
+            'completion_text': completion_text,
+            'related_users_ids': related_users_ids
+        }
+        if session_id is not None:
+            response_data['session_id'] = session_id
         
-        completion_text, related_users_ids, _ = process_ai_request(messages)
+        with span('serialize'):
+            body = json.dumps(response_data, ensure_ascii=False)
         
         return {
             'statusCode': 200,
@@ -421,9 +333,20 @@ def handle_web_chat(body_data: Dict[str, Any]) -> Dict[str, Any]:
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
+            'body': body
+        }
+    except (core.LLMOverloaded, core.PoolTimeout) as e:
+        print(f"Web chat request shed: {str(e)}")
+        return {
+            'statusCode': 503,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+                'Retry-After': '30'
+            },
             'body': json.dumps({
-                'completion_text': completion_text,
-                'related_users_ids': related_users_ids
+                'completion_text': OVERLOADED_TEXT,
+                'related_users_ids': []
             }, ensure_ascii=False)
         }
     except Exception as e:
@@ -438,7 +361,7 @@ def handle_web_chat(body_data: Dict[str, Any]) -> Dict[str, Any]:
                 'Access-Control-Allow-Origin': '*'
             },
             'body': json.dumps({
-                'completion_text': 'По вашему запросу ничего не нашёл, попробуйте переформулировать запрос и отправить еще один.',
+                'completion_text': NOT_FOUND_TEXT,
                 'related_users_ids': []
             }, ensure_ascii=False)
         }
@@ -447,6 +370,8 @@ def is_telegram_update(body_data: Dict[str, Any]) -> bool:
     """Check if request is from Telegram webhook"""
     return 'update_id' in body_data and 'message' in body_data
 
+@traced('ai-assistant')
+@profiled('ai-assistant')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Universal AI Assistant - handles both web chat and Telegram webhook
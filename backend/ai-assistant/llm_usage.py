@@ -0,0 +1,212 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, ContextManager, Iterator, Optional, Tuple
+
+from lazy_imports import lazy_module
+from tracing import span
+
+psycopg2 = lazy_module('psycopg2')
+
+# Kept identical in every function directory that calls OpenAI
+
+# USD per 1M tokens (prompt, completion), used for the daily budget
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    'gpt-5-nano': (0.05, 0.40),
+    'gpt-5-mini': (0.25, 2.00),
+    'gpt-5': (1.25, 10.00),
+    'gpt-4.1-nano': (0.10, 0.40),
+    'gpt-4.1-mini': (0.40, 1.60),
+    'gpt-4.1': (2.00, 8.00),
+}
+
+# Cheapest model first; later models are escalations on validation failure
+ASSISTANT_SIMPLE_MODELS = ['gpt-4.1-mini', 'gpt-4.1']
+ASSISTANT_MODELS = ['gpt-4.1']
+IMPORT_MODELS = ['gpt-5-nano', 'gpt-5-mini']
+
+SIMPLE_QUERY_MAX_CHARS = 120
+SIMPLE_QUERY_MAX_WORDS = 15
+
+# Exceptions meaning "the model answered, but not in the expected shape"
+VALIDATION_ERRORS = {'ValidationError', 'LengthFinishReasonError', 'ContentFilterFinishReasonError'}
+
+
+class LLMValidationError(Exception):
+    """Model response failed validation; the next model in the route may fix it"""
+
+
+class LLMBudgetExceeded(Exception):
+    """Daily LLM budget is spent"""
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated cost of one call in USD"""
+    prompt_price, completion_price = MODEL_PRICES.get(model, MODEL_PRICES['gpt-5'])
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def get_daily_budget() -> Optional[float]:
+    """LLM_DAILY_BUDGET_USD, or None when unlimited"""
+    value = os.environ.get('LLM_DAILY_BUDGET_USD', '')
+    return float(value) if value else None
+
+
+# A callable returning a context manager that lends a DB connection, such as
+# a pool's borrow helper; accounting commits its own statements
+Connection = Callable[[], ContextManager[Any]]
+
+
+@contextmanager
+def call_connection() -> Iterator[Connection]:
+    """One connection for all accounting of a routed call, opened on first use"""
+    opened: List[Any] = []
+
+    @contextmanager
+    def borrow() -> Iterator[Any]:
+        if not opened:
+            with span('db.connect'):
+                opened.append(psycopg2.connect(os.environ['DATABASE_URL']))
+        yield opened[0]
+
+    try:
+        yield borrow
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+SPENT_TODAY_SQL = """
+    SELECT COALESCE(SUM(cost_usd), 0)
+    FROM t_p95295728_unicorn_lab_visualiz.llm_usage
+    WHERE created_at >= date_trunc('day', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+"""
+
+
+def get_spent_today(connection: Connection) -> float:
+    """Sum of estimated LLM cost since midnight UTC"""
+    with connection() as conn, conn.cursor() as cur:
+        with span('db.llm_budget'):
+            cur.execute(SPENT_TODAY_SQL)
+            spent = float(cur.fetchone()[0])
+        # Do not sit idle in a transaction during the LLM call
+        conn.commit()
+        return spent
+
+
+def record_llm_call(
+    connection: Connection,
+    function_name: str,
+    purpose: str,
+    model: str,
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    latency_ms: int,
+    outcome: str,
+    error: Optional[str] = None
+) -> None:
+    """Insert one llm_usage row; accounting failures never break the request"""
+    cost = estimate_cost(model, prompt_tokens or 0, completion_tokens or 0)
+    try:
+        with connection() as conn:
+            try:
+                with conn.cursor() as cur, span('db.llm_usage'):
+                    cur.execute("""
+                        INSERT INTO t_p95295728_unicorn_lab_visualiz.llm_usage
+                        (function_name, purpose, model, prompt_tokens, completion_tokens,
+                         latency_ms, outcome, cost_usd, error)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, (function_name, purpose, model, prompt_tokens, completion_tokens,
+                          latency_ms, outcome, cost, error[:1000] if error else None))
+                conn.commit()
+            except psycopg2.Error:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+    except Exception as e:
+        print(f"Warning: could not record LLM usage: {str(e)}")
+
+
+def choose_assistant_models(messages: List[Any]) -> List[str]:
+    """Route short single questions to the cheaper model"""
+    user_messages = [m for m in messages if m.role == 'user']
+    if not user_messages:
+        return ASSISTANT_MODELS
+
+    last = user_messages[-1].content.strip()
+    is_follow_up = any(m.role == 'assistant' for m in messages)
+    if (not is_follow_up
+            and len(last) <= SIMPLE_QUERY_MAX_CHARS
+            and len(last.split()) <= SIMPLE_QUERY_MAX_WORDS):
+        return ASSISTANT_SIMPLE_MODELS
+    return ASSISTANT_MODELS
+
+
+def choose_import_models(batch_size: int) -> List[str]:
+    """Every batch starts on gpt-5-nano, as before routing; mini only fixes invalid output"""
+    return IMPORT_MODELS
+
+
+def call_with_routing(
+    function_name: str,
+    purpose: str,
+    models: List[str],
+    request: Callable[[str], Any],
+    validate: Optional[Callable[[Any], None]] = None,
+    connection: Optional[Connection] = None
+) -> Tuple[Any, str]:
+    """
+    Call request(model) along the route, escalating only on validation failure.
+    Every attempt is recorded in llm_usage. Returns (completion, model).
+
+    connection lends the DB connection for accounting (e.g. the function's
+    pool); without it one connection is opened for the whole call.
+    """
+    if connection is None:
+        with call_connection() as borrow:
+            return call_with_routing(function_name, purpose, models, request, validate, borrow)
+
+    budget = get_daily_budget()
+    if budget is not None and get_spent_today(connection) >= budget:
+        record_llm_call(connection, function_name, purpose, models[0], None, None, 0, 'budget_exceeded')
+        raise LLMBudgetExceeded(f"Daily LLM budget of ${budget:.2f} is spent")
+
+    last_error: Optional[Exception] = None
+    for attempt, model in enumerate(models):
+        if attempt > 0 and budget is not None and get_spent_today(connection) >= budget:
+            print(f"LLM budget reached, not escalating {purpose} to {model}")
+            break
+
+        started = time.perf_counter()
+        completion = None
+        try:
+            with span('llm'):
+                completion = request(model)
+            if validate:
+                validate(completion)
+        except Exception as e:
+            latency_ms = int((time.perf_counter() - started) * 1000)
+            usage = getattr(completion, 'usage', None)
+            is_validation = isinstance(e, LLMValidationError) or type(e).__name__ in VALIDATION_ERRORS
+            record_llm_call(
+                connection, function_name, purpose, model,
+                getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None),
+                latency_ms, 'validation_error' if is_validation else 'error', str(e)
+            )
+            if not is_validation:
+                raise
+            print(f"LLM validation failed for {purpose} on {model}: {str(e)}")
+            last_error = e
+            continue
+
+        latency_ms = int((time.perf_counter() - started) * 1000)
+        usage = getattr(completion, 'usage', None)
+        record_llm_call(
+            connection, function_name, purpose, model,
+            getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None),
+            latency_ms, 'ok'
+        )
+        print(f"LLM {purpose} answered by {model} in {latency_ms}ms")
+        return completion, model
+
+    raise last_error or LLMValidationError(f"No model produced a valid response for {purpose}")
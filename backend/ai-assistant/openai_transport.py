@@ -0,0 +1,212 @@
+import hashlib
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+import httpx
+
+# Kept identical in every function directory that calls OpenAI
+#
+# OPENAI_TRANSPORT=record  - call the real API and save every response to OPENAI_FIXTURES_DIR
+# OPENAI_TRANSPORT=replay  - serve saved responses without network access
+# OPENAI_REPLAY_MATCH      - 'exact' (same request body) or 'model' (any fixture for the same path and model)
+# OPENAI_REPLAY_LATENCY    - 'recorded', 'none', 'fixed:MS', 'uniform:MIN_MS:MAX_MS' or 'lognormal:MEDIAN_MS:SIGMA'
+# OPENAI_REPLAY_SEED       - seed for latency sampling and fixture rotation
+
+_DROPPED_RESPONSE_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+def request_key(method: str, path: str, body: bytes) -> str:
+    """Stable fixture key for a request"""
+    try:
+        canonical = json.dumps(json.loads(body or b'{}'), sort_keys=True, ensure_ascii=False)
+    except ValueError:
+        canonical = body.decode('utf-8', errors='replace')
+    return hashlib.sha256(f"{method} {path}\n{canonical}".encode('utf-8')).hexdigest()[:32]
+
+
+def request_model(body: bytes) -> str:
+    try:
+        return json.loads(body or b'{}').get('model', '')
+    except (ValueError, AttributeError):
+        return ''
+
+
+class LatencyModel:
+    """Sample artificial response latency from a spec string"""
+
+    def __init__(self, spec: str = 'recorded', seed: Optional[int] = None):
+        self.kind, *params = (spec or 'recorded').split(':')
+        self.params = [float(p) for p in params]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self, recorded_ms: float) -> float:
+        with self._lock:
+            if self.kind == 'none':
+                return 0.0
+            if self.kind == 'fixed':
+                return self.params[0]
+            if self.kind == 'uniform':
+                return self._random.uniform(self.params[0], self.params[1])
+            if self.kind == 'lognormal':
+                median_ms, sigma = self.params
+                return self._random.lognormvariate(0.0, sigma) * median_ms
+            return recorded_ms
+
+
+class FixtureStore:
+    """Recorded responses on disk, one JSON file per request key"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._by_model: Dict[str, List[Dict[str, Any]]] = {}
+        self._rotation: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def save(self, fixture: Dict[str, Any]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{fixture['key']}.json"
+        path.write_text(json.dumps(fixture, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.directory / f"{key}.json"
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def next_for(self, path: str, model: str) -> Optional[Dict[str, Any]]:
+        """Round-robin over fixtures recorded for the same path and model"""
+        with self._lock:
+            if not self._by_model:
+                for file in sorted(self.directory.glob('*.json')):
+                    fixture = json.loads(file.read_text(encoding='utf-8'))
+                    group = f"{fixture['path']} {fixture.get('model', '')}"
+                    self._by_model.setdefault(group, []).append(fixture)
+            group = f"{path} {model}"
+            fixtures = self._by_model.get(group)
+            if not fixtures:
+                return None
+            if group not in self._rotation:
+                self._rotation[group] = itertools.cycle(fixtures)
+            return next(self._rotation[group])
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Forward requests to the real API and save each response as a fixture"""
+
+    def __init__(self, store: FixtureStore, inner: httpx.BaseTransport):
+        self.store = store
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        started = time.perf_counter()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        latency_ms = (time.perf_counter() - started) * 1000
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROPPED_RESPONSE_HEADERS}
+
+        self.store.save({
+            'key': request_key(request.method, request.url.path, body),
+            'method': request.method,
+            'path': request.url.path,
+            'model': request_model(body),
+            'status_code': response.status_code,
+            'headers': headers,
+            'body': content.decode('utf-8', errors='replace'),
+            'latency_ms': round(latency_ms, 1),
+        })
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+def replay_response(store: FixtureStore, latency: LatencyModel, match: str,
+                    method: str, path: str, body: bytes) -> Dict[str, Any]:
+    """Find the fixture for a request and sleep for its sampled latency"""
+    fixture = store.get(request_key(method, path, body))
+    if fixture is None and match == 'model':
+        fixture = store.next_for(path, request_model(body))
+    if fixture is None:
+        return {
+            'status_code': 404,
+            'headers': {'content-type': 'application/json'},
+            'body': json.dumps({'error': {'message': f'No recorded fixture for {method} {path}',
+                                          'type': 'replay_miss'}}),
+        }
+
+    delay_ms = latency.sample_ms(fixture.get('latency_ms', 0.0))
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+    return fixture
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """Serve recorded fixtures with a configurable latency distribution"""
+
+    def __init__(self, store: FixtureStore, latency: LatencyModel, match: str = 'exact'):
+        self.store = store
+        self.latency = latency
+        self.match = match
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        fixture = replay_response(self.store, self.latency, self.match,
+                                  request.method, request.url.path, request.read())
+        return httpx.Response(
+            fixture['status_code'],
+            headers=fixture['headers'],
+            content=fixture['body'].encode('utf-8'),
+            request=request,
+        )
+
+
+# One client per configuration and process, so the replay latency sequence,
+# fixture rotation and parsed fixtures carry over between requests
+_clients: Dict[tuple, Optional[httpx.Client]] = {}
+_clients_lock = threading.Lock()
+
+
+def build_http_client() -> Optional[httpx.Client]:
+    """httpx client for OpenAI: proxy, record or replay depending on env; shared per process"""
+    config = tuple(os.environ.get(name, '') for name in (
+        'OPENAI_HTTP_PROXY', 'OPENAI_TRANSPORT', 'OPENAI_FIXTURES_DIR',
+        'OPENAI_REPLAY_LATENCY', 'OPENAI_REPLAY_MATCH', 'OPENAI_REPLAY_SEED'
+    ))
+    with _clients_lock:
+        if config not in _clients:
+            _clients[config] = create_http_client()
+        return _clients[config]
+
+
+def create_http_client() -> Optional[httpx.Client]:
+    proxy_url = os.environ.get('OPENAI_HTTP_PROXY', '')
+    mode = os.environ.get('OPENAI_TRANSPORT', '')
+    fixtures_dir = os.environ.get('OPENAI_FIXTURES_DIR', 'openai_fixtures')
+
+    if mode == 'replay':
+        seed = os.environ.get('OPENAI_REPLAY_SEED')
+        latency = LatencyModel(os.environ.get('OPENAI_REPLAY_LATENCY', 'recorded'),
+                               int(seed) if seed else None)
+        print(f"Replaying OpenAI responses from {fixtures_dir}")
+        return httpx.Client(transport=ReplayTransport(
+            FixtureStore(fixtures_dir), latency, os.environ.get('OPENAI_REPLAY_MATCH', 'exact')
+        ))
+
+    if mode == 'record':
+        inner = httpx.HTTPTransport(proxy=httpx.Proxy(proxy_url) if proxy_url else None)
+        print(f"Recording OpenAI responses to {fixtures_dir}")
+        return httpx.Client(transport=RecordingTransport(FixtureStore(fixtures_dir), inner))
+
+    if proxy_url:
+        print(f"Using proxy: {proxy_url}")
+        return httpx.Client(proxies=proxy_url)
+
+    print("WARNING: No proxy configured, OpenAI might be blocked")
+    return None
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+_WORD_RE = re.compile(r"[0-9a-zа-я]+")
+
+# Common Russian inflection endings, longest first, stripped by light_stem
+_RU_ENDINGS = (
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ией", "ов", "ев", "ей", "ой", "ий", "ый", "ая", "яя", "ое", "ее",
+    "ые", "ие", "ом", "ем", "ам", "ям", "ах", "ях", "ую", "юю", "ию",
+    "а", "я", "ы", "и", "у", "ю", "е", "о", "ь",
+)
+
+
+def light_stem(word: str) -> str:
+    """Strip a common Russian ending so inflected forms share one key"""
+    if len(word) <= 4:
+        return word
+    for ending in _RU_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    return word
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text: case, ё/е, punctuation and word endings"""
+    text = text.casefold().replace("ё", "е")
+    return " ".join(light_stem(word) for word in _WORD_RE.findall(text))
+
+
+def get_data_version(entrepreneurs: List[Dict[str, Any]]) -> str:
+    """Fingerprint of the entrepreneurs data the answer was built from"""
+    digest = hashlib.sha1()
+    for e in entrepreneurs:
+        digest.update(f"{e['id']}:{e.get('updated_at') or ''};".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class QueryCache:
+    """Thread-safe LRU cache with TTL for single-turn assistant answers"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """Return cached value or None, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple[str, str], value: Dict[str, Any]) -> None:
+        """Store value, evicting least recently used entries over the limit"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for logging"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+query_cache = QueryCache(
+    max_entries=int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", "256")),
+    ttl_seconds=float(os.environ.get("QUERY_CACHE_TTL_SECONDS", "3600")),
+)
@@ -1,8 +1,22 @@
 import os
-import psycopg2
-from openai import OpenAI
-from typing import Dict, List, Any, Optional, Tuple
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from pydantic import BaseModel, Field
+from lazy_imports import lazy_module
+from query_cache import query_cache, normalize_query, get_data_version
+from tracing import span, bind_context
+from llm_usage import call_with_routing, choose_assistant_models, LLMValidationError
+from advisory_locks import LLMOverloaded, llm_slot
+
+# Core of the assistant shared by the web chat and the Telegram webhook.
+# index.py imports this module only when a request needs it, so OPTIONS
+# preflights never pay for pydantic, psycopg2 or openai.
+psycopg2 = lazy_module('psycopg2')
+openai = lazy_module('openai')
 
 class AssistantResponse(BaseModel):
     """Structured response from AI assistant"""
@@ -14,38 +28,283 @@ class ChatMessage(BaseModel):
     role: str = Field(pattern="^(user|assistant)$")
     content: str
 
+class TelegramMessage(BaseModel):
+    """Telegram message structure"""
+    message_id: int
+    text: Optional[str] = None
+    chat: Dict[str, Any]
+    from_user: Optional[Dict[str, Any]] = Field(None, alias="from")
+
+class TelegramUpdate(BaseModel):
+    """Telegram webhook update"""
+    update_id: int
+    message: Optional[TelegramMessage] = None
+
+# Connections are reused across requests in a warm container and shared by
+# the concurrent reads below; DB_POOL_SIZE caps them per container. A request
+# holds at most two at once, only for short queries (long-held locks use
+# open_lock_connection), and borrowers queue for up to DB_POOL_TIMEOUT
+# seconds instead of failing when all of them are in use.
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+_pool: Dict[str, Any] = {'pool': None}
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(DB_POOL_SIZE)
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within DB_POOL_TIMEOUT"""
+
+def get_db_pool():
+    """Per-container connection pool, created on first use"""
+    with _pool_lock:
+        if _pool['pool'] is None:
+            from psycopg2.pool import ThreadedConnectionPool
+            with span('db.connect'):
+                _pool['pool'] = ThreadedConnectionPool(1, DB_POOL_SIZE, os.environ['DATABASE_URL'])
+        return _pool['pool']
+
+@contextmanager
+def pooled_connection() -> Iterator[Any]:
+    """Borrow a pooled connection, waiting for a free one; it goes back clean, or closed if it broke"""
+    with span('db.pool_wait'):
+        if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise PoolTimeout(f"No DB connection free after {DB_POOL_TIMEOUT:.0f}s")
+    try:
+        with borrowed_connection() as conn:
+            yield conn
+    finally:
+        _pool_slots.release()
+
+@contextmanager
+def borrowed_connection() -> Iterator[Any]:
+    pool = get_db_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except psycopg2.Error:
+        broken = True
+        raise
+    finally:
+        if not conn.closed and not broken:
+            conn.rollback()
+        pool.putconn(conn, close=broken or bool(conn.closed))
+
+# The SQL statements are module constants so tools/bench/query_plans.py can
+# EXPLAIN exactly what runs here
+ENTREPRENEURS_SQL = """
+    SELECT 
+        e.id,
+        e.name,
+        e.description,
+        e.goal,
+        e.post_url,
+        e.updated_at
+    FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs e
+    ORDER BY e.id
+"""
+
 def get_all_entrepreneurs() -> List[Dict[str, Any]]:
     """Load all entrepreneurs from database"""
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor()
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.entrepreneurs'):
+            cur.execute(ENTREPRENEURS_SQL)
+            rows = cur.fetchall()
     
-    try:
-        cur.execute("""
-            SELECT 
-                e.id,
-                e.name,
-                e.description,
-                e.goal,
-                e.post_url
-            FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs e
-            ORDER BY e.id
-        """)
-        
-        entrepreneurs = []
-        for row in cur.fetchall():
-            entrepreneurs.append({
-                "id": row[0],
-                "name": row[1],
-                "description": row[2] or "",
-                "goal": row[3] or "",
-                "post_url": row[4] or ""
-            })
-        
-        return entrepreneurs
-        
-    finally:
-        cur.close()
-        conn.close()
+    entrepreneurs = []
+    for row in rows:
+        entrepreneurs.append({
+            "id": row[0],
+            "name": row[1],
+            "description": row[2] or "",
+            "goal": row[3] or "",
+            "post_url": row[4] or "",
+            "updated_at": row[5].isoformat() if row[5] else None
+        })
+    
+    return entrepreneurs
+
+# telegram_messages is partitioned by month (V0029) and has no unique key on
+# (chat_id, message_id); webhook retries arrive within minutes, so duplicates
+# are checked against this many recent days only
+TELEGRAM_DEDUP_DAYS = 2
+TELEGRAM_HISTORY_DAYS = int(os.environ.get('TELEGRAM_HISTORY_DAYS', '30'))
+# Unanswered user messages older than this are not merged into a new turn
+TELEGRAM_PENDING_MINUTES = int(os.environ.get('TELEGRAM_PENDING_MINUTES', '10'))
+
+# Rows keep their order through the serial id, which breaks created_at ties
+SAVE_MESSAGES_SQL = f"""
+    INSERT INTO t_p95295728_unicorn_lab_visualiz.telegram_messages 
+    (chat_id, message_id, user_id, role, content, answered)
+    SELECT v.chat_id, v.message_id, v.user_id, v.role, v.content, v.answered
+    FROM (VALUES %s) AS v(position, chat_id, message_id, user_id, role, content, answered)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM t_p95295728_unicorn_lab_visualiz.telegram_messages m
+        WHERE m.chat_id = v.chat_id AND m.message_id = v.message_id
+          AND m.created_at >= CURRENT_TIMESTAMP - INTERVAL '{TELEGRAM_DEDUP_DAYS} days'
+    )
+    ORDER BY v.position
+"""
+SAVE_MESSAGES_TEMPLATE = "(%s, %s::bigint, %s::bigint, %s::bigint, %s, %s, %s::boolean)"
+
+PENDING_SQL = """
+    SELECT message_id, content
+    FROM t_p95295728_unicorn_lab_visualiz.telegram_messages
+    WHERE chat_id = %s AND NOT answered AND role = 'user'
+      AND created_at >= CURRENT_TIMESTAMP - make_interval(mins => %s)
+    ORDER BY created_at, id
+"""
+
+MARK_ANSWERED_SQL = """
+    UPDATE t_p95295728_unicorn_lab_visualiz.telegram_messages
+    SET answered = TRUE
+    WHERE chat_id = %s AND message_id = ANY(%s) AND NOT answered
+      AND created_at >= CURRENT_TIMESTAMP - make_interval(days => %s)
+"""
+
+HISTORY_SQL = """
+    SELECT role, content
+    FROM t_p95295728_unicorn_lab_visualiz.telegram_messages
+    WHERE chat_id = %s AND answered
+      AND created_at >= CURRENT_TIMESTAMP - make_interval(days => %s)
+    ORDER BY created_at DESC, id DESC
+    LIMIT %s
+"""
+
+def insert_telegram_messages(cur, rows: List[Tuple[int, int, Optional[int], str, str]], answered: bool) -> int:
+    """Insert (chat_id, message_id, user_id, role, content) rows skipping retries; returns rows inserted"""
+    from psycopg2.extras import execute_values
+    
+    execute_values(cur, SAVE_MESSAGES_SQL, [(i,) + tuple(row) + (answered,) for i, row in enumerate(rows)],
+                   template=SAVE_MESSAGES_TEMPLATE)
+    return cur.rowcount
+
+def save_pending_message(chat_id: int, message_id: int, user_id: Optional[int], content: str) -> bool:
+    """Store an incoming user message as unanswered; False when it is a webhook retry"""
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.save_messages'):
+            inserted = insert_telegram_messages(cur, [(chat_id, message_id, user_id, 'user', content)], answered=False)
+            conn.commit()
+    return inserted > 0
+
+def get_pending_messages(chat_id: int) -> List[Tuple[int, str]]:
+    """(message_id, content) of recent unanswered user messages, oldest first"""
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.pending'):
+            cur.execute(PENDING_SQL, (chat_id, TELEGRAM_PENDING_MINUTES))
+            return [(row[0], row[1]) for row in cur.fetchall()]
+
+def complete_telegram_turn(chat_id: int, answered_ids: List[int], reply_message_id: int, reply: str) -> None:
+    """Save the reply and mark the user messages it covers as answered, in one transaction"""
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.save_messages'):
+            cur.execute(MARK_ANSWERED_SQL, (chat_id, answered_ids, TELEGRAM_DEDUP_DAYS))
+            insert_telegram_messages(cur, [(chat_id, reply_message_id, None, 'assistant', reply)], answered=True)
+            conn.commit()
+
+def open_lock_connection():
+    """Dedicated connection for a long-held session lock; closing it releases the lock"""
+    with span('db.connect'):
+        return psycopg2.connect(os.environ['DATABASE_URL'])
+
+def get_telegram_history(chat_id: int, limit: int = 20) -> List[ChatMessage]:
+    """Load recent chat history; only the last TELEGRAM_HISTORY_DAYS partitions are read"""
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.history'):
+            cur.execute(HISTORY_SQL, (chat_id, TELEGRAM_HISTORY_DAYS, limit))
+            rows = cur.fetchall()
+    
+    messages = []
+    for row in reversed(rows):
+        messages.append(ChatMessage(role=row[0], content=row[1]))
+    
+    return messages
+
+def load_telegram_context(chat_id: int, limit: int = 20) -> Tuple[List[ChatMessage], List[Dict[str, Any]]]:
+    """Chat history and all entrepreneurs, read concurrently on two pooled connections"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        history = executor.submit(bind_context(get_telegram_history), chat_id, limit)
+        entrepreneurs = executor.submit(bind_context(get_all_entrepreneurs))
+        return history.result(), entrepreneurs.result()
+
+# Web chat sessions (V0031). History is cached per container and topped up
+# with only the rows added since, because consecutive turns of a session may
+# land on different containers.
+WEB_CHAT_HISTORY_LIMIT = 20
+WEB_CHAT_CACHE_SESSIONS = int(os.environ.get('WEB_CHAT_CACHE_SESSIONS', '256'))
+WEB_CHAT_MAX_MESSAGE_LENGTH = 4000
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+WEB_HISTORY_SQL = """
+    SELECT id, role, content
+    FROM t_p95295728_unicorn_lab_visualiz.web_chat_messages
+    WHERE session_id = %s AND id > %s
+    ORDER BY id DESC
+    LIMIT %s
+"""
+
+WEB_SESSION_SQL = """
+    INSERT INTO t_p95295728_unicorn_lab_visualiz.web_chat_sessions (id) VALUES (%s)
+    ON CONFLICT (id) DO UPDATE SET last_active_at = CURRENT_TIMESTAMP
+"""
+
+WEB_SAVE_TURN_SQL = """
+    INSERT INTO t_p95295728_unicorn_lab_visualiz.web_chat_messages (session_id, role, content)
+    VALUES (%s, 'user', %s), (%s, 'assistant', %s)
+    RETURNING id
+"""
+
+_web_history: 'OrderedDict[str, Tuple[int, List[ChatMessage]]]' = OrderedDict()
+_web_history_lock = threading.Lock()
+
+def is_valid_session_id(session_id: Any) -> bool:
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+def get_web_chat_history(session_id: str) -> List[ChatMessage]:
+    """Last WEB_CHAT_HISTORY_LIMIT messages of a session, from cache plus newer rows"""
+    with _web_history_lock:
+        last_id, cached = _web_history.get(session_id, (0, []))
+    
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.web_history'):
+            cur.execute(WEB_HISTORY_SQL, (session_id, last_id, WEB_CHAT_HISTORY_LIMIT))
+            rows = cur.fetchall()
+    
+    # Rows come from our own inserts; skip re-validating them
+    newer = [ChatMessage.model_construct(role=row[1], content=row[2]) for row in reversed(rows)]
+    history = (cached + newer)[-WEB_CHAT_HISTORY_LIMIT:]
+    if rows:
+        remember_web_chat_history(session_id, rows[0][0], history)
+    return history
+
+def remember_web_chat_history(session_id: str, last_id: int, history: List[ChatMessage]) -> None:
+    with _web_history_lock:
+        _web_history[session_id] = (last_id, history[-WEB_CHAT_HISTORY_LIMIT:])
+        _web_history.move_to_end(session_id)
+        while len(_web_history) > WEB_CHAT_CACHE_SESSIONS:
+            _web_history.popitem(last=False)
+
+def load_web_chat_context(session_id: str) -> Tuple[List[ChatMessage], List[Dict[str, Any]]]:
+    """Session history and all entrepreneurs, read concurrently on two pooled connections"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        history = executor.submit(bind_context(get_web_chat_history), session_id)
+        entrepreneurs = executor.submit(bind_context(get_all_entrepreneurs))
+        return history.result(), entrepreneurs.result()
+
+def save_web_chat_turn(session_id: str, history: List[ChatMessage], user_message: str, reply: str) -> None:
+    """Create or touch the session and append both messages in one transaction"""
+    with pooled_connection() as conn, conn.cursor() as cur:
+        with span('db.save_messages'):
+            cur.execute(WEB_SESSION_SQL, (session_id,))
+            cur.execute(WEB_SAVE_TURN_SQL, (session_id, user_message, session_id, reply))
+            last_id = max(row[0] for row in cur.fetchall())
+            conn.commit()
+    
+    remember_web_chat_history(session_id, last_id, history + [
+        ChatMessage.model_construct(role='user', content=user_message),
+        ChatMessage.model_construct(role='assistant', content=reply)
+    ])
 
 def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
     """Create system prompt with all entrepreneurs data"""
@@ -54,7 +313,6 @@ def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
 БАЗА ДАННЫХ УЧАСТНИКОВ:
 """
     
-    # Add each entrepreneur
     for e in entrepreneurs:
         base_prompt += f"\nID: {str(e['id'])}\nИмя: {e['name']}\nОписание: {e['description']}\nЦель: {e['goal']}\n---"
     
@@ -72,6 +330,8 @@ def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
 - Объясняй, почему именно эти люди подходят под запрос
 - Можешь предлагать неочевидные связи и синергии
 - Структурируй ответ: сначала кратко, потом детали про каждого
+- НЕ используй Markdown форматирование (жирный шрифт, звездочки, заголовки)
+- Пиши обычным текстом с простыми переносами строк
 
 ТЕХНИЧЕСКИЕ ПРАВИЛА (не для текста):
 - В поле related_users_ids возвращай ID найденных участников для системы
@@ -81,11 +341,11 @@ def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
 ПРИМЕРЫ ХОРОШИХ ОТВЕТОВ:
 "Нашел 3 отличных кандидата для вашего AI проекта:
 
-**Иван Сидоров** - разработчик с опытом в машинном обучении, ищет команду для стартапа.
+Иван Сидоров - разработчик с опытом в машинном обучении, ищет команду для стартапа.
 
-**Елена Козлова** - продакт-менеджер в сфере AI, может помочь с продуктовой стратегией.
+Елена Козлова - продакт-менеджер в сфере AI, может помочь с продуктовой стратегией.
 
-**Петр Николаев** - инвестор, активно вкладывается в AI проекты на ранних стадиях."
+Петр Николаев - инвестор, активно вкладывается в AI проекты на ранних стадиях."
 
 ФОРМАТ ОТВЕТА:
 {
@@ -95,104 +355,79 @@ def create_system_prompt(entrepreneurs: List[Dict[str, Any]]) -> str:
     
     return base_prompt
 
-def get_openai_client() -> OpenAI:
-    """Initialize OpenAI client with proxy if needed"""
+def get_openai_client() -> 'openai.OpenAI':
+    """Initialize OpenAI client with proxy, record or replay transport"""
+    from openai_transport import build_http_client
     api_key = os.environ.get('OPENAI_API_KEY')
-    proxy_url = os.environ.get('OPENAI_HTTP_PROXY')
-    
-    http_client = None
-    if proxy_url:
-        import httpx
-        http_client = httpx.Client(proxies=proxy_url)
-        print(f"Using proxy: {proxy_url}")
-    else:
-        print("WARNING: No proxy configured, OpenAI might be blocked")
-    
-    return OpenAI(api_key=api_key, http_client=http_client)
+    return openai.OpenAI(api_key=api_key, http_client=build_http_client())
 
-def process_ai_request(messages: List[ChatMessage]) -> Tuple[str, List[str], List[Dict[str, Any]]]:
-    """
-    Core AI processing logic - works for both web chat and Telegram
-    
-    Args:
-        messages: List of chat messages
-        
-    Returns:
-        Tuple of (completion_text, related_users_ids, entrepreneurs_data)
+def is_single_turn(messages: List[ChatMessage]) -> bool:
+    """True when the conversation is just one user question (cacheable)
+
+    Any earlier turn, even the same question repeated, can change the answer.
     """
-    # Get all entrepreneurs
-    entrepreneurs = get_all_entrepreneurs()
+    turns = [msg for msg in messages if msg.role != 'system']
+    return len(turns) == 1 and turns[0].role == 'user'
+
+def process_ai_request(messages: List[ChatMessage],
+                       entrepreneurs: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, List[str], List[Dict[str, Any]]]:
+    """Core AI processing logic; pass entrepreneurs when they were already loaded"""
+    if entrepreneurs is None:
+        entrepreneurs = get_all_entrepreneurs()
     if not entrepreneurs:
         raise Exception("No entrepreneurs found in database")
     
-    # Create system prompt
-    system_prompt = create_system_prompt(entrepreneurs)
+    cache_key = None
+    if is_single_turn(messages):
+        cache_key = (normalize_query(messages[-1].content), get_data_version(entrepreneurs))
+        cached = query_cache.get(cache_key)
+        print(f"Query cache {'hit' if cached else 'miss'}: {query_cache.stats()}")
+        if cached:
+            return (cached['completion_text'], cached['related_users_ids'], entrepreneurs)
     
-    # Initialize OpenAI client
+    with span('compute.system_prompt'):
+        system_prompt = create_system_prompt(entrepreneurs)
     client = get_openai_client()
     
-    # Prepare messages for OpenAI
     openai_messages = [{"role": "system", "content": system_prompt}]
-    
-    # Add chat history (last 20 messages)
     for msg in messages[-20:]:
-        openai_messages.append({
-            "role": msg.role,
-            "content": msg.content
-        })
+        openai_messages.append({"role": msg.role, "content": msg.content})
     
-    # Get completion with structured output
-    completion = client.beta.chat.completions.parse(
-        model="gpt-5",
-        messages=openai_messages,
-        response_format=AssistantResponse
-    )
+    known_ids = {str(e['id']) for e in entrepreneurs}
     
-    # Parse response
-    assistant_response = completion.choices[0].message.parsed
+    def request(model: str) -> Any:
+        return client.beta.chat.completions.parse(
+            model=model,
+            messages=openai_messages,
+            response_format=AssistantResponse
+        )
     
-    return (
-        assistant_response.completion_text,
-        assistant_response.related_users_ids,
-        entrepreneurs
-    )
-
-def format_response_for_telegram(
-    completion_text: str, 
-    related_users_ids: List[str],
-    entrepreneurs: List[Dict[str, Any]]
-) -> str:
-    """
-    Format response for Telegram with hyperlinks to user profiles
-    
-    Args:
-        completion_text: AI response text
-        related_users_ids: IDs of related entrepreneurs
-        entrepreneurs: Full list of entrepreneurs data
-        
-    Returns:
-        Formatted text with Telegram markdown hyperlinks
-    """
-    # Create mapping of entrepreneurs by ID
-    entrepreneurs_map = {str(e['id']): e for e in entrepreneurs}
-    
-    # Replace entrepreneur names with hyperlinks
-    formatted_text = completion_text
-    
-    for user_id in related_users_ids:
-        entrepreneur = entrepreneurs_map.get(user_id)
-        if entrepreneur and entrepreneur.get('post_url'):
-            name = entrepreneur['name']
-            post_url = entrepreneur['post_url']
-            
-            # Replace name with markdown hyperlink [name](url)
-            formatted_text = formatted_text.replace(
-                f"**{name}**",
-                f"[{name}]({post_url})"
-            )
-            formatted_text = formatted_text.replace(
-                name,
-                f"[{name}]({post_url})"
+    def validate(completion: Any) -> None:
+        parsed = completion.choices[0].message.parsed
+        if parsed is None:
+            raise LLMValidationError("Empty or refused structured response")
+        unknown = [user_id for user_id in parsed.related_users_ids if str(user_id) not in known_ids]
+        if unknown:
+            raise LLMValidationError(f"Unknown related_users_ids: {unknown[:5]}")
+    
+    # Global cap on concurrent LLM calls across containers; raises LLMOverloaded.
+    # The slot is a session lock held for the whole call, so it lives on its
+    # own connection rather than keeping a pooled one idle for seconds.
+    slot_conn = open_lock_connection()
+    try:
+        with llm_slot(slot_conn):
+            completion, _ = call_with_routing(
+                'ai-assistant', 'assistant_reply', choose_assistant_models(messages), request, validate,
+                connection=pooled_connection
             )
+    finally:
+        slot_conn.close()
+    assistant_response = completion.choices[0].message.parsed
+    
+    if cache_key:
+        query_cache.put(cache_key, {
+            'completion_text': assistant_response.completion_text,
+            'related_users_ids': list(assistant_response.related_users_ids)
+        })
     
-    return formatted_text
\ No newline at end of file
+    return (assistant_response.completion_text, assistant_response.related_users_ids, entrepreneurs)
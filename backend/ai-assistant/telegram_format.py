@@ -0,0 +1,114 @@
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Tuple
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+# Characters with meaning in Telegram legacy Markdown outside of entities
+_MARKDOWN_SPECIAL_RE = re.compile(r"([_*`\[])")
+
+# [name](url) entities written by format_response_for_telegram; unescaped "["
+_LINK_RE = re.compile(r"(?<!\\)\[[^\]\n]*\]\([^)\n]*\)")
+
+
+def escape_markdown(text: str) -> str:
+    """Escape Telegram Markdown control characters in plain text"""
+    return _MARKDOWN_SPECIAL_RE.sub(r"\\\1", text)
+
+
+@lru_cache(maxsize=64)
+def _compile_name_matcher(names: Tuple[str, ...]) -> "re.Pattern[str]":
+    """One alternation over all names, longest first, optionally wrapped in **"""
+    alternation = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+    return re.compile(rf"\*\*({alternation})\*\*|(?<!\w)({alternation})(?!\w)")
+
+
+def format_response_for_telegram(
+    completion_text: str,
+    related_users_ids: List[str],
+    entrepreneurs: List[Dict[str, Any]]
+) -> str:
+    """Format response for Telegram with hyperlinks in a single pass over the text"""
+    entrepreneurs_map = {str(e['id']): e for e in entrepreneurs}
+
+    links: Dict[str, str] = {}
+    for user_id in related_users_ids:
+        entrepreneur = entrepreneurs_map.get(str(user_id))
+        if entrepreneur and entrepreneur.get('name') and entrepreneur.get('post_url'):
+            links.setdefault(entrepreneur['name'], entrepreneur['post_url'])
+
+    if not links:
+        return escape_markdown(completion_text)
+
+    matcher = _compile_name_matcher(tuple(sorted(links)))
+    parts = []
+    position = 0
+
+    for match in matcher.finditer(completion_text):
+        name = match.group(1) or match.group(2)
+        link_text = name.replace('[', '(').replace(']', ')')
+        link_url = links[name].replace(')', '%29')
+        parts.append(escape_markdown(completion_text[position:match.start()]))
+        parts.append(f"[{link_text}]({link_url})")
+        position = match.end()
+
+    parts.append(escape_markdown(completion_text[position:]))
+    return "".join(parts)
+
+
+def _hard_split(text: str, limit: int) -> List[str]:
+    """Cut text into limit-sized pieces without splitting an escape sequence or a link
+
+    Telegram rejects a message with a half [name](url) entity, so a cut that
+    lands inside a link moves to just before it.
+    """
+    pieces = []
+    while len(text) > limit:
+        cut = limit
+        for link in _LINK_RE.finditer(text):
+            if link.start() >= cut:
+                break
+            if cut < link.end() and link.start() > 0:
+                cut = link.start()
+        if text[cut - 1] == '\\':
+            cut -= 1
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Split text into Telegram-sized messages on paragraph, then line boundaries"""
+    if len(text) <= limit:
+        return [text]
+
+    # (separator before piece, piece): paragraphs first, oversized ones by line
+    pieces: List[Tuple[str, str]] = []
+    for paragraph in text.split("\n\n"):
+        if len(paragraph) <= limit:
+            pieces.append(("\n\n", paragraph))
+            continue
+        for index, line in enumerate(paragraph.split("\n")):
+            for cut_index, cut in enumerate(_hard_split(line, limit) or [""]):
+                if cut_index:
+                    separator = ""
+                else:
+                    separator = "\n\n" if index == 0 else "\n"
+                pieces.append((separator, cut))
+
+    chunks: List[str] = []
+    current = ""
+    for separator, piece in pieces:
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if len(candidate) <= limit:
+            current = candidate
+        else:
+            if current:
+                chunks.append(current)
+            current = piece
+
+    if current:
+        chunks.append(current)
+    return chunks
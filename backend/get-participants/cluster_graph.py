@@ -0,0 +1,70 @@
+from collections import Counter
+from typing import Dict, List, Any
+
+TOP_TAGS_PER_CLUSTER = 5
+UNCLUSTERED_NAME = 'Без кластера'
+
+
+def build_cluster_graph(
+    participants: List[Dict[str, Any]],
+    connections: List[Dict[str, Any]],
+    clusters: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Collapse participants into one super-node per cluster with aggregated edges"""
+    cluster_of = {p['id']: p['cluster_id'] for p in participants}
+
+    members: Dict[Any, int] = Counter(cluster_of.values())
+    tag_counts: Dict[Any, Counter] = {}
+    for p in participants:
+        tag_counts.setdefault(p['cluster_id'], Counter()).update(p['tags'])
+
+    internal: Dict[Any, int] = Counter()
+    edges: Dict[tuple, Dict[str, Any]] = {}
+    for c in connections:
+        source = cluster_of.get(c['source'])
+        target = cluster_of.get(c['target'])
+        if source == target:
+            internal[source] += 1
+            continue
+        # Undirected: keep one edge per cluster pair
+        key = (source, target) if str(source) < str(target) else (target, source)
+        edge = edges.setdefault(key, {'source': key[0], 'target': key[1], 'weight': 0.0, 'connections': 0})
+        edge['weight'] += c['strength']
+        edge['connections'] += 1
+
+    nodes = []
+    known = set()
+    for cluster in clusters:
+        known.add(cluster['id'])
+        if not members.get(cluster['id']):
+            continue
+        nodes.append(_cluster_node(cluster['id'], cluster['name'], cluster['color'],
+                                   members, tag_counts, internal))
+    if members.get(None):
+        nodes.append(_cluster_node(None, UNCLUSTERED_NAME, None, members, tag_counts, internal))
+    for cluster_id in members:
+        if cluster_id is not None and cluster_id not in known:
+            nodes.append(_cluster_node(cluster_id, str(cluster_id), None, members, tag_counts, internal))
+
+    cluster_edges = sorted(edges.values(), key=lambda e: e['weight'], reverse=True)
+    for edge in cluster_edges:
+        edge['weight'] = round(edge['weight'], 2)
+
+    return {
+        'clusters': nodes,
+        'edges': cluster_edges,
+        'total': len(participants)
+    }
+
+
+def _cluster_node(cluster_id: Any, name: str, color: Any, members: Dict[Any, int],
+                  tag_counts: Dict[Any, Counter], internal: Dict[Any, int]) -> Dict[str, Any]:
+    return {
+        'id': cluster_id,
+        'name': name,
+        'color': color,
+        'count': members.get(cluster_id, 0),
+        'top_tags': [{'name': tag, 'count': count}
+                     for tag, count in tag_counts.get(cluster_id, Counter()).most_common(TOP_TAGS_PER_CLUSTER)],
+        'internal_connections': internal.get(cluster_id, 0)
+    }
@@ -0,0 +1,174 @@
+import os
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from lazy_imports import lazy_module
+from tracing import span
+
+psycopg2 = lazy_module('psycopg2')
+
+# Delta sync for get-participants?since=<version> (tables from V0026).
+# Tokens are snapshot xmins, row versions are writer txids: a row is newer
+# than a token when its version >= token. Deltas may repeat a few rows around
+# the boundary; clients apply them as upserts.
+
+SCHEMA = 't_p95295728_unicorn_lab_visualiz'
+GRAPH_EDGES_LOCK = 7340101
+GRAPH_EDGE_RETENTION_DAYS = int(os.environ.get('GRAPH_EDGE_RETENTION_DAYS', '30'))
+
+
+def get_sync_token(cur) -> int:
+    """Version token to hand out; take it before reading the data it covers"""
+    cur.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+    return int(cur.fetchone()[0])
+
+
+def requires_full_sync(cur, since: int) -> bool:
+    """True when a delta from this token cannot be answered"""
+    try:
+        cur.execute(f"SELECT changed_txid FROM {SCHEMA}.data_versions WHERE name = 'taxonomy'")
+        row = cur.fetchone()
+        cur.execute(f"SELECT pruned_version FROM {SCHEMA}.graph_edge_state WHERE id = 1")
+        state = cur.fetchone()
+    except psycopg2.Error as e:
+        print(f"Warning: delta sync unavailable: {str(e)}")
+        cur.connection.rollback()
+        return True
+    if row is None or state is None:
+        return True
+    # Tag or cluster renames change participants without touching their rows
+    return row[0] >= since or state[0] >= since
+
+
+def edge_key(edge: Dict[str, Any]) -> Tuple[int, int, str]:
+    """Undirected identity of a connection"""
+    source, target = edge['source'], edge['target']
+    return (min(source, target), max(source, target), edge['type'])
+
+
+def materialize_edges(conn, source_key: str, compute: Callable[[], List[Dict[str, Any]]]) -> None:
+    """Bring graph_edges up to date with the current data versions
+
+    Edges that disappeared or changed strength get removed_version, new or
+    changed ones are inserted with the current txid. Runs under an advisory
+    lock so concurrent containers do not materialize twice.
+    """
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (GRAPH_EDGES_LOCK,))
+        cur.execute(f"SELECT source_key FROM {SCHEMA}.graph_edge_state WHERE id = 1")
+        row = cur.fetchone()
+        if row and row[0] == source_key:
+            conn.commit()
+            return
+
+        edges = compute()
+        wanted = {edge_key(e): e['strength'] for e in edges}
+
+        with span('db.graph_edges'):
+            cur.execute(f"""
+                SELECT id, source_id, target_id, type, strength
+                FROM {SCHEMA}.graph_edges
+                WHERE removed_version IS NULL
+            """)
+            active = {(r[1], r[2], r[3]): (r[0], float(r[4])) for r in cur.fetchall()}
+
+        removed_ids = [edge_id for key, (edge_id, strength) in active.items()
+                       if key not in wanted or abs(wanted[key] - strength) > 1e-6]
+        added = [(key[0], key[1], key[2], strength) for key, strength in wanted.items()
+                 if key not in active or abs(active[key][1] - strength) > 1e-6]
+
+        with span('db.materialize_edges'):
+            if removed_ids:
+                cur.execute(f"""
+                    UPDATE {SCHEMA}.graph_edges
+                    SET removed_version = txid_current(), removed_at = CURRENT_TIMESTAMP
+                    WHERE id = ANY(%s)
+                """, (removed_ids,))
+            if added:
+                execute_values(cur, f"""
+                    INSERT INTO {SCHEMA}.graph_edges (source_id, target_id, type, strength, added_version)
+                    VALUES %s
+                """, added, template="(%s, %s, %s, %s, txid_current())", page_size=1000)
+
+            # Old removals are only needed by clients that synced before them
+            cur.execute(f"""
+                WITH pruned AS (
+                    DELETE FROM {SCHEMA}.graph_edges
+                    WHERE removed_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+                    RETURNING removed_version
+                )
+                UPDATE {SCHEMA}.graph_edge_state
+                SET source_key = %s,
+                    pruned_version = GREATEST(pruned_version, COALESCE((SELECT MAX(removed_version) FROM pruned), 0)),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = 1
+            """, (GRAPH_EDGE_RETENTION_DAYS, source_key))
+        conn.commit()
+        print(f"Materialized graph edges for {source_key}: +{len(added)} -{len(removed_ids)}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def load_active_edges(cur) -> List[Dict[str, Any]]:
+    """Current materialized edges; full responses serve these so deltas can remove them later"""
+    with span('db.graph_edges'):
+        cur.execute(f"""
+            SELECT source_id, target_id, type, strength
+            FROM {SCHEMA}.graph_edges
+            WHERE removed_version IS NULL
+            ORDER BY id
+        """)
+        return [{'source': r[0], 'target': r[1], 'type': r[2], 'strength': round(float(r[3]), 2)}
+                for r in cur.fetchall()]
+
+
+def load_edge_delta(cur, since: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(added or changed edges, removed edges) since the token"""
+    with span('db.edge_delta'):
+        cur.execute(f"""
+            SELECT source_id, target_id, type, strength
+            FROM {SCHEMA}.graph_edges
+            WHERE removed_version IS NULL AND added_version >= %s
+        """, (since,))
+        added = [{'source': r[0], 'target': r[1], 'type': r[2], 'strength': round(float(r[3]), 2)}
+                 for r in cur.fetchall()]
+
+        cur.execute(f"""
+            SELECT DISTINCT g.source_id, g.target_id, g.type
+            FROM {SCHEMA}.graph_edges g
+            WHERE g.removed_version >= %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM {SCHEMA}.graph_edges a
+                  WHERE a.removed_version IS NULL
+                    AND a.source_id = g.source_id AND a.target_id = g.target_id AND a.type = g.type
+              )
+        """, (since,))
+        removed = [{'source': r[0], 'target': r[1], 'type': r[2]} for r in cur.fetchall()]
+    return added, removed
+
+
+def load_tombstones(cur, since: int) -> List[int]:
+    """Ids of participants deleted since the token"""
+    with span('db.tombstones'):
+        cur.execute(f"""
+            SELECT entrepreneur_id
+            FROM {SCHEMA}.entrepreneur_tombstones
+            WHERE deleted_version >= %s
+            ORDER BY entrepreneur_id
+        """, (since,))
+        return [r[0] for r in cur.fetchall()]
+
+
+def parse_since(value: Optional[str]) -> Optional[int]:
+    """since query parameter as an int; ValueError when malformed"""
+    if value in (None, ''):
+        return None
+    since = int(value)
+    if since < 0:
+        raise ValueError("since must be non-negative")
+    return since
@@ -0,0 +1,119 @@
+from typing import Dict, List, Any, Iterable, Optional
+
+# Faceted filtering over Python int bitmaps: bit i is the i-th participant of
+# the index. One bitmap per tag and per cluster, built once per data version;
+# a filter is a handful of AND/OR operations and every facet count is one
+# popcount, independent of how many participants there are.
+
+UNCLUSTERED_NAME = 'Без кластера'
+TAG_MODES = ('or', 'and')
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(bits: int) -> int:
+        return bin(bits).count('1')
+
+
+class FacetIndex:
+    """Per-tag and per-cluster participant bitmaps for one data version"""
+
+    def __init__(self, participants: List[Dict[str, Any]]):
+        self.ids = [p['id'] for p in participants]
+        self.positions = {pid: i for i, pid in enumerate(self.ids)}
+        self.all = (1 << len(self.ids)) - 1
+        self.tags: Dict[str, int] = {}
+        self.clusters: Dict[str, int] = {}
+
+        for i, p in enumerate(participants):
+            bit = 1 << i
+            for tag in p['tags'] or []:
+                self.tags[tag] = self.tags.get(tag, 0) | bit
+            cluster = p['cluster'] or UNCLUSTERED_NAME
+            self.clusters[cluster] = self.clusters.get(cluster, 0) | bit
+
+    def mask_of(self, ids: Iterable[int]) -> int:
+        """Bitmap of the given participant ids (unknown ids are ignored)"""
+        bits = 0
+        for pid in ids:
+            position = self.positions.get(pid)
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def tag_mask(self, tags: List[str], mode: str) -> int:
+        if not tags:
+            return self.all
+        if mode == 'and':
+            bits = self.all
+            for tag in tags:
+                bits &= self.tags.get(tag, 0)
+            return bits
+        bits = 0
+        for tag in tags:
+            bits |= self.tags.get(tag, 0)
+        return bits
+
+    def cluster_mask(self, clusters: List[str]) -> int:
+        if not clusters:
+            return self.all
+        bits = 0
+        for cluster in clusters:
+            bits |= self.clusters.get(cluster, 0)
+        return bits
+
+    def members(self, bits: int) -> List[int]:
+        """Participant ids whose bits are set, in index order"""
+        result = []
+        raw = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(raw):
+            if not byte:
+                continue
+            base = byte_index * 8
+            for offset in range(8):
+                if byte >> offset & 1:
+                    result.append(self.ids[base + offset])
+        return result
+
+    def counts(self, facets: Dict[str, int], base: int) -> Dict[str, int]:
+        result = {}
+        for name, bits in facets.items():
+            count = popcount(bits & base)
+            if count:
+                result[name] = count
+        return result
+
+    def select(self, tags: List[str], mode: str, clusters: List[str],
+               within: Optional[int] = None) -> Dict[str, Any]:
+        """Matching bitmap plus counts for every facet value
+
+        Counts follow the usual disjunctive-facet rule: cluster counts ignore
+        the cluster selection (they are alternatives to it), and so do tag
+        counts in OR mode; in AND mode a tag count is the size of the result
+        after also requiring that tag.
+        """
+        base = self.all if within is None else within
+        by_tags = self.tag_mask(tags, mode) & base
+        by_clusters = self.cluster_mask(clusters) & base
+        matched = by_tags & by_clusters
+
+        tag_base = matched if mode == 'and' else by_clusters
+        return {
+            'bits': matched,
+            'facets': {
+                'tags': self.counts(self.tags, tag_base),
+                'clusters': self.counts(self.clusters, by_tags)
+            }
+        }
+
+
+def parse_list(value: Optional[str]) -> List[str]:
+    """Comma-separated query parameter -> unique non-empty values in order"""
+    if not value:
+        return []
+    seen: List[str] = []
+    for item in value.split(','):
+        item = item.strip()
+        if item and item not in seen:
+            seen.append(item)
+    return seen
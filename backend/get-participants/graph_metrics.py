@@ -0,0 +1,236 @@
+import os
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from lazy_imports import lazy_module
+from tracing import span
+
+psycopg2 = lazy_module('psycopg2')
+nx = lazy_module('networkx')
+
+# Communities and centrality of the served connection graph (tables from
+# V0033). The handler only reads them: load_participants joins the stored
+# rows and load_ranked_ids walks their indexes. refresh_graph_metrics runs
+# from tools/jobs/graph_metrics.py, off the request path, once per
+# participants/taxonomy version; networkx is a tools/requirements.txt
+# dependency and is not deployed with the function.
+#
+# A full refresh runs Louvain; when only a small share of participants
+# changed their connections, existing communities are kept and the changed
+# participants join the community they are most strongly tied to, so ids
+# stay stable between imports. Degrees are exact and betweenness is sampled
+# (bounded cost), both recomputed on every refresh.
+
+SCHEMA = 't_p95295728_unicorn_lab_visualiz'
+GRAPH_METRICS_LOCK = 7340103
+GRAPH_METRICS_REBUILD_SHARE = float(os.environ.get('GRAPH_METRICS_REBUILD_SHARE', '0.2'))
+GRAPH_METRICS_BETWEENNESS_SAMPLES = int(os.environ.get('GRAPH_METRICS_BETWEENNESS_SAMPLES', '100'))
+GRAPH_METRICS_SEED = 42
+
+RANK_METRICS = ('weighted_degree', 'betweenness')
+
+
+def build_graph(node_ids: List[int], connections: List[Dict[str, Any]]) -> 'nx.Graph':
+    """Undirected graph; parallel edges of different types keep the strongest"""
+    graph = nx.Graph()
+    graph.add_nodes_from(node_ids)
+    for edge in connections:
+        source, target, strength = edge['source'], edge['target'], float(edge['strength'])
+        if source == target or source not in graph or target not in graph or strength <= 0:
+            continue
+        if graph.has_edge(source, target) and graph[source][target]['weight'] >= strength:
+            continue
+        graph.add_edge(source, target, weight=strength, distance=1.0 / strength)
+    return graph
+
+
+def stable_ids(communities: List[Set[int]], previous: Dict[int, Optional[int]]) -> Dict[int, int]:
+    """node -> community id, reusing the previous id that overlaps each community most"""
+    assigned: Dict[int, int] = {}
+    used: Set[int] = set()
+    next_id = max((c for c in previous.values() if c is not None), default=-1) + 1
+    for members in sorted(communities, key=len, reverse=True):
+        overlap = Counter(previous[n] for n in members if previous.get(n) is not None)
+        community = next((c for c, _ in overlap.most_common() if c not in used), None)
+        if community is None:
+            community, next_id = next_id, next_id + 1
+        used.add(community)
+        for node in members:
+            assigned[node] = community
+    return assigned
+
+
+def extend_communities(graph: 'nx.Graph', previous: Dict[int, Optional[int]], changed: Set[int]) -> Dict[int, int]:
+    """Keep communities; changed and new nodes join their most strongly connected one"""
+    assigned = {n: previous[n] for n in graph if n not in changed and previous.get(n) is not None}
+    next_id = max((c for c in previous.values() if c is not None), default=-1) + 1
+    pending = [n for n in graph if n not in assigned]
+    # A few passes so chains of new participants settle too
+    for _ in range(3):
+        for node in pending:
+            pull: Counter = Counter()
+            for neighbour, data in graph[node].items():
+                if neighbour in assigned:
+                    pull[assigned[neighbour]] += data['weight']
+            if pull:
+                assigned[node] = pull.most_common(1)[0][0]
+    for node in pending:
+        if node not in assigned:
+            if previous.get(node) is not None:
+                assigned[node] = previous[node]
+            else:
+                assigned[node], next_id = next_id, next_id + 1
+    return assigned
+
+
+def compute_metrics(graph: 'nx.Graph', stored: Dict[int, Dict[str, Any]],
+                    full: bool) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, Any]]:
+    """(metrics per node, summary) for the graph, reusing stored communities when possible"""
+    degrees = dict(graph.degree())
+    weighted = dict(graph.degree(weight='weight'))
+    changed = {n for n in graph if n not in stored
+               or stored[n]['degree'] != degrees[n]
+               or abs(stored[n]['weighted_degree'] - weighted[n]) > 1e-3}
+    rebuild = full or not stored or len(changed) > GRAPH_METRICS_REBUILD_SHARE * max(len(graph), 1)
+
+    # Participants without connections belong to no community
+    connected = graph.subgraph([n for n in graph if degrees[n] > 0])
+    previous = {n: m['community'] for n, m in stored.items()}
+    if connected.number_of_edges() == 0:
+        assigned: Dict[int, int] = {}
+    elif rebuild:
+        communities = nx.community.louvain_communities(connected, weight='weight', seed=GRAPH_METRICS_SEED)
+        assigned = stable_ids(communities, previous)
+    else:
+        assigned = extend_communities(connected, previous, changed)
+
+    groups: Dict[int, Set[int]] = defaultdict(set)
+    for node, community in assigned.items():
+        groups[community].add(node)
+
+    betweenness: Dict[int, float] = {}
+    modularity = None
+    if connected.number_of_edges():
+        samples = GRAPH_METRICS_BETWEENNESS_SAMPLES
+        betweenness = nx.betweenness_centrality(
+            connected, k=samples if samples < len(connected) else None,
+            weight='distance', normalized=True, seed=GRAPH_METRICS_SEED
+        )
+        modularity = nx.community.modularity(connected, list(groups.values()), weight='weight')
+
+    metrics = {}
+    for node in graph:
+        community = assigned.get(node)
+        metrics[node] = {
+            'community': community,
+            'community_size': len(groups[community]) if community is not None else 1,
+            'degree': degrees[node],
+            'weighted_degree': round(weighted[node], 3),
+            'betweenness': round(betweenness.get(node, 0.0), 6),
+        }
+    summary = {
+        'method': 'louvain' if rebuild else 'louvain+incremental',
+        'communities': len(groups),
+        'modularity': round(modularity, 4) if modularity is not None else None,
+        'changed': len(changed),
+    }
+    return metrics, summary
+
+
+def load_metrics(cur) -> Dict[int, Dict[str, Any]]:
+    cur.execute(f"""
+        SELECT entrepreneur_id, community, community_size, degree, weighted_degree, betweenness
+        FROM {SCHEMA}.entrepreneur_graph_metrics
+    """)
+    return {r[0]: {'community': r[1], 'community_size': r[2], 'degree': r[3],
+                   'weighted_degree': float(r[4]), 'betweenness': float(r[5])}
+            for r in cur.fetchall()}
+
+
+def differs(current: Dict[str, Any], stored: Optional[Dict[str, Any]]) -> bool:
+    if stored is None:
+        return True
+    return (current['community'] != stored['community']
+            or current['community_size'] != stored['community_size']
+            or current['degree'] != stored['degree']
+            or abs(current['weighted_degree'] - stored['weighted_degree']) > 1e-3
+            or abs(current['betweenness'] - stored['betweenness']) > 1e-5)
+
+
+def refresh_graph_metrics(conn, source_key: str,
+                          graph_inputs: Callable[[], Tuple[List[int], List[Dict[str, Any]]]],
+                          full: bool = False) -> Optional[Dict[str, Any]]:
+    """Refresh summary for the data versions in source_key, or None when another refresh holds the lock
+
+    graph_inputs returns (participant ids, connections) and is only called
+    when the stored metrics are for older versions. Rows that changed get
+    a new metrics_version, so delta sync sends those participants again,
+    and writing them bumps the 'graph_metrics' data version (V0035) so
+    cached payloads pick the new values up.
+    """
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (GRAPH_METRICS_LOCK,))
+        if not cur.fetchone()[0]:
+            conn.rollback()
+            return None
+        cur.execute(f"SELECT source_key FROM {SCHEMA}.graph_metrics_state WHERE id = 1")
+        state = cur.fetchone()
+        if state and state[0] == source_key and not full:
+            conn.commit()
+            return {'method': 'unchanged', 'updated': 0}
+
+        with span('db.graph_metrics'):
+            stored = load_metrics(cur)
+
+        node_ids, connections = graph_inputs()
+        with span('compute.graph_metrics'):
+            metrics, summary = compute_metrics(build_graph(node_ids, connections), stored, full)
+
+        rows = [(node, m['community'], m['community_size'], m['degree'], m['weighted_degree'], m['betweenness'])
+                for node, m in metrics.items() if differs(m, stored.get(node))]
+        with span('db.save_graph_metrics'):
+            if rows:
+                execute_values(cur, f"""
+                    INSERT INTO {SCHEMA}.entrepreneur_graph_metrics
+                        (entrepreneur_id, community, community_size, degree, weighted_degree, betweenness,
+                         metrics_version)
+                    VALUES %s
+                    ON CONFLICT (entrepreneur_id) DO UPDATE
+                    SET community = EXCLUDED.community, community_size = EXCLUDED.community_size,
+                        degree = EXCLUDED.degree, weighted_degree = EXCLUDED.weighted_degree,
+                        betweenness = EXCLUDED.betweenness, metrics_version = EXCLUDED.metrics_version,
+                        updated_at = CURRENT_TIMESTAMP
+                """, rows, template="(%s, %s, %s, %s, %s, %s, txid_current())", page_size=1000)
+            cur.execute(f"""
+                UPDATE {SCHEMA}.graph_metrics_state
+                SET source_key = %s, method = %s, communities = %s, modularity = %s,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = 1
+            """, (source_key, summary['method'], summary['communities'], summary['modularity']))
+        conn.commit()
+        print(f"Graph metrics for {source_key}: {summary}, {len(rows)} rows updated")
+        return dict(summary, participants=len(metrics), updated=len(rows))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def load_ranked_ids(cur, metric: str, limit: int, community: Optional[int] = None) -> List[int]:
+    """Participant ids with the highest metric, read through its index"""
+    if metric not in RANK_METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(RANK_METRICS)}")
+    query = f"SELECT entrepreneur_id FROM {SCHEMA}.entrepreneur_graph_metrics"
+    params: List[Any] = []
+    if community is not None:
+        query += " WHERE community = %s"
+        params.append(community)
+    query += f" ORDER BY {metric} DESC, entrepreneur_id LIMIT %s"
+    params.append(limit)
+    with span('db.ranked'):
+        cur.execute(query, params)
+        return [r[0] for r in cur.fetchall()]
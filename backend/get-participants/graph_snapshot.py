@@ -0,0 +1,51 @@
+from typing import Optional
+
+from lazy_imports import lazy_module
+from tracing import span
+
+psycopg2 = lazy_module('psycopg2')
+
+# Precompressed unfiltered response per data version (graph_snapshots, V0028).
+# The first container that computes a version writes it through; every other
+# cold container reads it back with a single primary-key lookup.
+
+SCHEMA = 't_p95295728_unicorn_lab_visualiz'
+SNAPSHOTS_TO_KEEP = 3
+
+
+def load_snapshot(cur, version: str) -> Optional[bytes]:
+    """gzip payload stored for this data version, or None"""
+    try:
+        with span('db.graph_snapshot'):
+            cur.execute(f"SELECT payload FROM {SCHEMA}.graph_snapshots WHERE version = %s", (version,))
+            row = cur.fetchone()
+    except psycopg2.Error as e:
+        print(f"Warning: could not load graph snapshot: {str(e)}")
+        cur.connection.rollback()
+        return None
+    return bytes(row[0]) if row else None
+
+
+def save_snapshot(conn, version: str, payload: bytes, participant_count: int, connection_count: int) -> None:
+    """Store the payload for this version and drop old ones; failures are only logged"""
+    cur = conn.cursor()
+    try:
+        with span('db.save_graph_snapshot'):
+            cur.execute(f"""
+                INSERT INTO {SCHEMA}.graph_snapshots (version, participant_count, connection_count, payload)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (version) DO NOTHING
+            """, (version, participant_count, connection_count, psycopg2.Binary(payload)))
+            cur.execute(f"""
+                DELETE FROM {SCHEMA}.graph_snapshots
+                WHERE version NOT IN (
+                    SELECT version FROM {SCHEMA}.graph_snapshots ORDER BY created_at DESC LIMIT %s
+                )
+            """, (SNAPSHOTS_TO_KEEP,))
+        conn.commit()
+        print(f"Saved graph snapshot {version} ({len(payload)} bytes)")
+    except psycopg2.Error as e:
+        print(f"Warning: could not save graph snapshot: {str(e)}")
+        conn.rollback()
+    finally:
+        cur.close()
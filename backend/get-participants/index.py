@@ -1,8 +1,24 @@
+import base64
+import gzip
 import json
 import os
-import psycopg2
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from collections import defaultdict
+from lazy_imports import lazy_module
+from tracing import traced, span
+from profiling import profiled
+from data_versions import get_data_versions, version_key
+from cluster_graph import build_cluster_graph
+from taxonomy_cache import get_taxonomy, get_affinity, Taxonomy
+from graph_snapshot import load_snapshot, save_snapshot
+from facets import FacetIndex, TAG_MODES, parse_list
+from graph_metrics import load_ranked_ids, RANK_METRICS
+from delta_sync import (get_sync_token, requires_full_sync, materialize_edges,
+                        load_active_edges, load_edge_delta, load_tombstones, parse_since)
+
+psycopg2 = lazy_module('psycopg2')
+
+MAX_RANK_LIMIT = 200
 
 def calculate_connection_strength(tags1: List[str], tags2: List[str], tag_connections: Dict[Tuple[str, str], float]) -> float:
     """Calculate connection strength between two participants based on their tags"""
@@ -31,10 +47,343 @@ def calculate_connection_strength(tags1: List[str], tags2: List[str], tag_connec
     # Average weight of all connections
     return total_weight / connection_count if connection_count > 0 else 0.0
 
+def build_connections(participants: List[Dict[str, Any]], tag_connections: Dict[Tuple[Any, Any], float], tags_field: str = 'tags') -> List[Dict[str, Any]]:
+    """Calculate top connections for each participant from their tags (names or ids)"""
+    connections = []
+    min_strength = 0.3  # Minimum connection strength to include
+
+    # For each participant, calculate connections to others
+    for i, p1 in enumerate(participants):
+        p1_tags = p1[tags_field]
+        if not p1_tags:
+            continue
+
+        # Store connections for this participant
+        participant_connections = []
+
+        for j, p2 in enumerate(participants):
+            if i >= j:  # Avoid duplicates and self-connections
+                continue
+
+            p2_tags = p2[tags_field]
+            if not p2_tags:
+                continue
+
+            # Calculate connection strength
+            strength = calculate_connection_strength(p1_tags, p2_tags, tag_connections)
+
+            if strength >= min_strength:
+                participant_connections.append({
+                    'target_id': p2['id'],
+                    'strength': strength
+                })
+
+        # Sort by strength and take top connections
+        participant_connections.sort(key=lambda x: x['strength'], reverse=True)
+
+        # Add to global connections list (limit to top 10 per participant)
+        for pc in participant_connections[:10]:
+            connections.append({
+                'source': p1['id'],
+                'target': pc['target_id'],
+                'type': 'common_interests',
+                'strength': round(pc['strength'], 2)
+            })
+    
+    return connections
+
+def load_participants(cur, search_query: str = '', cluster_filter: str = '', since: Optional[int] = None,
+                      ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Load participants with their tag names and graph metrics, optionally filtered or changed since a sync token"""
+    # Build query with full schema names
+    query = """
+        SELECT e.id, e.telegram_id, e.username, e.name, e.role, c.name as cluster_name, e.cluster_id,
+               e.description, e.post_url, e.goal, e.emoji, e.created_at, e.updated_at,
+               COALESCE(array_agg(t.name) FILTER (WHERE t.name IS NOT NULL), '{}') as tags,
+               COALESCE(array_agg(t.id) FILTER (WHERE t.id IS NOT NULL), '{}') as tag_ids,
+               m.community, m.community_size, m.weighted_degree, m.betweenness
+        FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs e
+        LEFT JOIN t_p95295728_unicorn_lab_visualiz.clusters c ON e.cluster_id = c.id
+        LEFT JOIN t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics m ON m.entrepreneur_id = e.id
+        LEFT JOIN t_p95295728_unicorn_lab_visualiz.entrepreneur_tags et ON e.id = et.entrepreneur_id
+        LEFT JOIN t_p95295728_unicorn_lab_visualiz.tags t ON et.tag_id = t.id
+        WHERE 1=1
+    """
+    query_params = []
+    
+    if search_query:
+        query += """ AND (LOWER(e.name) LIKE LOWER(%s) OR EXISTS (
+            SELECT 1 FROM t_p95295728_unicorn_lab_visualiz.entrepreneur_tags et2
+            JOIN t_p95295728_unicorn_lab_visualiz.tags t2 ON et2.tag_id = t2.id
+            WHERE et2.entrepreneur_id = e.id AND LOWER(t2.name) = LOWER(%s)
+        ))"""
+        query_params.extend([f'%{search_query}%', search_query])
+    
+    if cluster_filter and cluster_filter != 'Все':
+        query += " AND c.name = %s"
+        query_params.append(cluster_filter)
+    
+    if since is not None:
+        query += " AND (e.row_version >= %s OR m.metrics_version >= %s)"
+        query_params.extend([since, since])
+    
+    if ids is not None:
+        query += " AND e.id = ANY(%s)"
+        query_params.append(ids)
+    
+    query += " GROUP BY e.id, e.telegram_id, e.username, e.name, e.role, c.name, e.cluster_id, e.description, e.post_url, e.goal, e.emoji, e.created_at, e.updated_at,"
+    query += " m.community, m.community_size, m.weighted_degree, m.betweenness"
+    query += " ORDER BY e.name"
+    
+    # Execute query
+    with span('db.participants'):
+        cur.execute(query, query_params)
+        rows = cur.fetchall()
+    
+    # Format results
+    participants = []
+    for row in rows:
+        participants.append({
+            'id': row[0],
+            'telegram_id': row[1],
+            'username': row[2],
+            'name': row[3],
+            'role': row[4],
+            'cluster': row[5],
+            'cluster_id': row[6],
+            'description': row[7],
+            'tags': row[13] if row[13] != '{}' else [],
+            'tag_ids': row[14] if row[14] != '{}' else [],
+            'post_url': row[8],
+            'goal': row[9],
+            'emoji': row[10] or '😊',
+            'created_at': row[11].isoformat() if row[11] else None,
+            'updated_at': row[12].isoformat() if row[12] else None,
+            'community': row[15],
+            'community_size': row[16],
+            'weighted_degree': float(row[17]) if row[17] is not None else None,
+            'betweenness': float(row[18]) if row[18] is not None else None
+        })
+    
+    return participants
+
+def load_similar_goals(cur) -> List[Dict[str, Any]]:
+    """Text-similarity connections kept up to date by import-with-clustering"""
+    try:
+        with span('db.text_similarity'):
+            cur.execute("""
+                SELECT source_id, target_id, strength
+                FROM t_p95295728_unicorn_lab_visualiz.text_similarity_edges
+            """)
+            rows = cur.fetchall()
+    except psycopg2.Error as e:
+        print(f"Warning: text similarity edges unavailable: {str(e)}")
+        cur.connection.rollback()
+        return []
+    return [{'source': r[0], 'target': r[1], 'type': 'similar_goals', 'strength': round(float(r[2]), 2)}
+            for r in rows]
+
+def compute_connections(cur, participants: List[Dict[str, Any]], taxonomy: Taxonomy) -> List[Dict[str, Any]]:
+    """Tag connections (published affinity matrix, or tag_connections by name) plus similar goals"""
+    affinity = get_affinity(cur, taxonomy)
+    with span('compute.connections'):
+        if affinity is not None:
+            connections = build_connections(participants, affinity, 'tag_ids')
+        else:
+            connections = build_connections(participants, taxonomy.connections_by_name)
+    
+    # Similar texts only add links between people the tags left unconnected
+    present = {p['id'] for p in participants}
+    linked = {(min(c['source'], c['target']), max(c['source'], c['target'])) for c in connections}
+    for edge in load_similar_goals(cur):
+        if edge['source'] in present and edge['target'] in present and (edge['source'], edge['target']) not in linked:
+            connections.append(edge)
+    return connections
+
+def payload_key(versions: Dict[str, int]) -> Optional[Tuple[int, ...]]:
+    """Cache key for responses that carry graph metrics: participants, taxonomy and the last metrics refresh"""
+    key = version_key(versions, 'participants', 'taxonomy')
+    if key is None:
+        return None
+    return key + (versions.get('graph_metrics', 0),)
+
+def sync_graph_edges(conn, cur, key: Tuple[int, ...]) -> None:
+    """Materialize graph_edges for these participants/taxonomy versions; full and delta responses read them"""
+    materialize_edges(conn, '.'.join(str(v) for v in key),
+                      lambda: compute_connections(cur, load_participants(cur), get_taxonomy(cur)))
+
+def build_delta(conn, cur, since: int) -> Optional[Dict[str, Any]]:
+    """Participants and edges changed since the token, or None when a full sync is needed"""
+    with span('db.data_versions'):
+        versions = get_data_versions(cur)
+    key = version_key(versions, 'participants', 'taxonomy')
+    if key is None or requires_full_sync(cur, since):
+        return None
+    
+    token = get_sync_token(cur)
+    sync_graph_edges(conn, cur, key)
+    
+    participants = load_participants(cur, since=since)
+    deleted = load_tombstones(cur, since)
+    added, removed = load_edge_delta(cur, since)
+    
+    return {
+        'participants': participants,
+        'deleted': deleted,
+        'connections': added,
+        'removed_connections': removed,
+        'version': token,
+        'full': False
+    }
+
+# Per-container caches keyed by data version. Each holds one (key, value)
+# tuple that is replaced by a single assignment, so threads of the
+# long-running server (tools/serve) never see a key with another version's
+# value.
+
+# Cluster overview cached per container until participants or taxonomy change
+_cluster_graph_cache: Dict[str, Any] = {'entry': None}
+
+def get_cluster_graph(cur) -> Dict[str, Any]:
+    """Cluster super-nodes and inter-cluster edges for the zoomed-out view"""
+    with span('db.data_versions'):
+        versions = get_data_versions(cur)
+    key = version_key(versions, 'participants', 'taxonomy')
+    
+    cached = _cluster_graph_cache['entry']
+    if key is not None and cached is not None and cached[0] == key:
+        print(f"Cluster graph cache hit for versions {key}")
+        return cached[1]
+    
+    participants = load_participants(cur)
+    taxonomy = get_taxonomy(cur)
+    connections = compute_connections(cur, participants, taxonomy)
+    
+    with span('compute.cluster_graph'):
+        graph = build_cluster_graph(participants, connections, taxonomy.clusters)
+    graph['version'] = '.'.join(str(v) for v in key) if key else None
+    
+    if key is not None:
+        _cluster_graph_cache['entry'] = (key, graph)
+    
+    return graph
+
+# Unfiltered response per data version, kept compressed; decompressed on demand
+_payload_cache: Dict[str, Any] = {'entry': None}
+
+def get_full_payload(conn, cur) -> Dict[str, Any]:
+    """Unfiltered response from memory, then the stored snapshot, then live computation"""
+    with span('db.data_versions'):
+        versions = get_data_versions(cur)
+    key = payload_key(versions)
+    snapshot_version = '.'.join(str(v) for v in key) if key else None
+    
+    cached = _payload_cache['entry']
+    if key is not None and cached is not None and cached[0] == key:
+        print(f"Payload cache hit for versions {key}")
+        return cached[1]
+    
+    compressed = load_snapshot(cur, snapshot_version) if snapshot_version else None
+    body = None
+    if compressed is None:
+        # Token first: anything committed after it shows up in the next delta.
+        # Connections come from graph_edges, so every edge a client receives
+        # here has a row that a later delta can report as removed.
+        version = get_sync_token(cur)
+        edges_key = version_key(versions, 'participants', 'taxonomy')
+        if edges_key is not None:
+            sync_graph_edges(conn, cur, edges_key)
+            participants = load_participants(cur)
+            connections = load_active_edges(cur)
+        else:
+            participants = load_participants(cur)
+            connections = compute_connections(cur, participants, get_taxonomy(cur))
+        
+        with span('serialize'):
+            body = json.dumps({
+                'participants': participants,
+                'connections': connections,
+                'total': len(participants),
+                'version': version,
+                'full': True
+            })
+        with span('compress'):
+            compressed = gzip.compress(body.encode('utf-8'), compresslevel=6)
+        if snapshot_version:
+            save_snapshot(conn, snapshot_version, compressed, len(participants), len(connections))
+    else:
+        print(f"Loaded graph snapshot {snapshot_version}")
+    
+    # body is filled in on first use; it is always decoded from this gzip
+    payload = {'key': key, 'gzip': compressed, 'body': body}
+    if key is not None:
+        _payload_cache['entry'] = (key, payload)
+    return payload
+
+def accepts_gzip(event: Dict[str, Any]) -> bool:
+    headers = event.get('headers') or {}
+    for name, value in headers.items():
+        if name.lower() == 'accept-encoding':
+            return 'gzip' in (value or '').lower()
+    return False
+
+# Full participant list, connections and facet bitmaps per data version
+_facet_cache: Dict[str, Any] = {'entry': None}
+
+def get_facet_index(cur) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], FacetIndex]:
+    """Participants, their connections and the facet index for the current versions"""
+    with span('db.data_versions'):
+        versions = get_data_versions(cur)
+    key = payload_key(versions)
+    
+    cached = _facet_cache['entry']
+    if key is not None and cached is not None and cached[0] == key:
+        print(f"Facet index cache hit for versions {key}")
+        return cached[1]
+    
+    participants = load_participants(cur)
+    connections = compute_connections(cur, participants, get_taxonomy(cur))
+    with span('compute.facet_index'):
+        index = FacetIndex(participants)
+    
+    if key is not None:
+        _facet_cache['entry'] = (key, (participants, connections, index))
+    
+    return participants, connections, index
+
+def filter_by_facets(cur, search_query: str, tags: List[str], tag_mode: str,
+                     clusters: List[str]) -> Dict[str, Any]:
+    """Participants matching every facet, their connections and counts per facet value"""
+    participants, connections, index = get_facet_index(cur)
+    
+    within = None
+    if search_query:
+        within = index.mask_of(p['id'] for p in load_participants(cur, search_query))
+    
+    with span('compute.facets'):
+        selection = index.select(tags, tag_mode, clusters, within)
+        selected = set(index.members(selection['bits']))
+    
+    matched = [p for p in participants if p['id'] in selected]
+    return {
+        'participants': matched,
+        'connections': [c for c in connections if c['source'] in selected and c['target'] in selected],
+        'total': len(matched),
+        'facets': selection['facets']
+    }
+
+@traced('get-participants')
+@profiled('get-participants')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Get all participants with dynamically calculated connections
-    Args: event with optional query parameters for filtering
+    Args: event with optional query parameters for filtering (search, cluster),
+          view=clusters for cluster super-nodes with aggregated edges,
+          since=<version> for only the participants and edges changed after that token,
+          tags/clusters (comma-separated) with tag_mode=or|and for faceted filtering
+          with counts per tag and cluster,
+          rank=weighted_degree|betweenness with optional limit and community for the
+          top participants by precomputed graph metrics
     Returns: HTTP response with participants and their connections
     '''
     method: str = event.get('httpMethod', 'GET')
@@ -67,137 +416,195 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         params = event.get('queryStringParameters', {}) or {}
         search_query = params.get('search', '')
         cluster_filter = params.get('cluster', '')
+        try:
+            since = parse_since(params.get('since'))
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'since must be a version token'})
+            }
+        tags = parse_list(params.get('tags'))
+        clusters = parse_list(params.get('clusters'))
+        if cluster_filter and cluster_filter != 'Все' and cluster_filter not in clusters:
+            clusters.append(cluster_filter)
+        tag_mode = (params.get('tag_mode') or 'or').lower()
+        faceted = bool(tags or params.get('clusters') or params.get('tag_mode') or params.get('facets'))
+        if tag_mode not in TAG_MODES:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'tag_mode must be or or and'})
+            }
+        rank = params.get('rank', '')
+        if rank and rank not in RANK_METRICS:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': f"rank must be one of: {', '.join(RANK_METRICS)}"})
+            }
+        try:
+            limit = int(params.get('limit') or 20)
+            community = int(params['community']) if params.get('community') else None
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'limit and community must be integers'})
+            }
+        limit = max(1, min(limit, MAX_RANK_LIMIT))
+        if since is not None and (search_query or clusters or faceted or rank):
+            return {
+                'statusCode': 400,
+                'headers': {'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'since cannot be combined with filters'})
+            }
         
         # Connect to database
-        conn = psycopg2.connect(os.environ['DATABASE_URL'])
-        cur = conn.cursor()
+        with span('db.connect'):
+            conn = psycopg2.connect(os.environ['DATABASE_URL'])
+            cur = conn.cursor()
         
         # Debug: check current schema
-        cur.execute("SELECT current_schema()")
-        print(f"Current schema: {cur.fetchone()[0]}")
-        
-        # Build query with full schema names
-        query = """
-            SELECT e.id, e.telegram_id, e.username, e.name, e.role, c.name as cluster_name, e.cluster_id,
-                   e.description, e.post_url, e.goal, e.emoji, e.created_at, e.updated_at,
-                   COALESCE(array_agg(t.name) FILTER (WHERE t.name IS NOT NULL), '{}') as tags
-            FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs e
-            LEFT JOIN t_p95295728_unicorn_lab_visualiz.clusters c ON e.cluster_id = c.id
-            LEFT JOIN t_p95295728_unicorn_lab_visualiz.entrepreneur_tags et ON e.id = et.entrepreneur_id
-            LEFT JOIN t_p95295728_unicorn_lab_visualiz.tags t ON et.tag_id = t.id
-            WHERE 1=1
-        """
-        query_params = []
+        with span('db.current_schema'):
+            cur.execute("SELECT current_schema()")
+            print(f"Current schema: {cur.fetchone()[0]}")
         
-        if search_query:
-            query += """ AND (LOWER(e.name) LIKE LOWER(%s) OR EXISTS (
-                SELECT 1 FROM t_p95295728_unicorn_lab_visualiz.entrepreneur_tags et2
-                JOIN t_p95295728_unicorn_lab_visualiz.tags t2 ON et2.tag_id = t2.id
-                WHERE et2.entrepreneur_id = e.id AND LOWER(t2.name) = LOWER(%s)
-            ))"""
-            query_params.extend([f'%{search_query}%', search_query])
-        
-        if cluster_filter and cluster_filter != 'Все':
-            query += " AND c.name = %s"
-            query_params.append(cluster_filter)
-        
-        query += " GROUP BY e.id, e.telegram_id, e.username, e.name, e.role, c.name, e.cluster_id, e.description, e.post_url, e.goal, e.emoji, e.created_at, e.updated_at"
-        query += " ORDER BY e.name"
-        
-        # Execute query
-        cur.execute(query, query_params)
-        rows = cur.fetchall()
+        if params.get('view') == 'clusters':
+            graph = get_cluster_graph(cur)
+            cur.close()
+            conn.close()
+            
+            with span('serialize'):
+                body = json.dumps(graph)
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': body
+            }
         
-        # Format results
-        participants = []
-        for row in rows:
-            participants.append({
-                'id': row[0],
-                'telegram_id': row[1],
-                'username': row[2],
-                'name': row[3],
-                'role': row[4],
-                'cluster': row[5],
-                'cluster_id': row[6],
-                'description': row[7],
-                'tags': row[13] if row[13] != '{}' else [],
-                'post_url': row[8],
-                'goal': row[9],
-                'emoji': row[10] or '😊',
-                'created_at': row[11].isoformat() if row[11] else None,
-                'updated_at': row[12].isoformat() if row[12] else None
-            })
+        if rank:
+            ranked_ids = load_ranked_ids(cur, rank, limit, community)
+            by_id = {p['id']: p for p in load_participants(cur, ids=ranked_ids)}
+            ranked = [by_id[i] for i in ranked_ids if i in by_id]
+            cur.close()
+            conn.close()
+            
+            with span('serialize'):
+                body = json.dumps({
+                    'participants': ranked,
+                    'total': len(ranked),
+                    'rank': rank,
+                    'version': None
+                })
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': body
+            }
         
-        # Load tag connections for dynamic calculation
-        cur.execute("""
-            SELECT t1.name, t2.name, tc.strength
-            FROM t_p95295728_unicorn_lab_visualiz.tag_connections tc
-            JOIN t_p95295728_unicorn_lab_visualiz.tags t1 ON tc.tag1_id = t1.id
-            JOIN t_p95295728_unicorn_lab_visualiz.tags t2 ON tc.tag2_id = t2.id
-            WHERE tc.strength > 0
-        """)
-        tag_connections = {}
-        for row in cur.fetchall():
-            tag_connections[(row[0], row[1])] = float(row[2])
+        if since is not None:
+            delta = build_delta(conn, cur, since)
+            if delta is not None:
+                cur.close()
+                conn.close()
+                
+                with span('serialize'):
+                    body = json.dumps(delta)
+                
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': body
+                }
         
-        # Calculate connections dynamically
-        connections = []
-        min_strength = 0.3  # Minimum connection strength to include
+        if faceted:
+            result = filter_by_facets(cur, search_query, tags, tag_mode, clusters)
+            cur.close()
+            conn.close()
+            
+            with span('serialize'):
+                body = json.dumps(result)
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': body
+            }
         
-        # For each participant, calculate connections to others
-        for i, p1 in enumerate(participants):
-            p1_tags = p1['tags']
-            if not p1_tags:
-                continue
-                
-            # Store connections for this participant
-            participant_connections = []
+        if not (search_query or clusters):
+            payload = get_full_payload(conn, cur)
+            cur.close()
+            conn.close()
             
-            for j, p2 in enumerate(participants):
-                if i >= j:  # Avoid duplicates and self-connections
-                    continue
-                    
-                p2_tags = p2['tags']
-                if not p2_tags:
-                    continue
-                
-                # Calculate connection strength
-                strength = calculate_connection_strength(p1_tags, p2_tags, tag_connections)
-                
-                if strength >= min_strength:
-                    participant_connections.append({
-                        'target_id': p2['id'],
-                        'strength': strength
-                    })
+            if accepts_gzip(event):
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Content-Type': 'application/json',
+                        'Content-Encoding': 'gzip',
+                        'Access-Control-Allow-Origin': '*'
+                    },
+                    'body': base64.b64encode(payload['gzip']).decode('ascii'),
+                    'isBase64Encoded': True
+                }
             
-            # Sort by strength and take top connections
-            participant_connections.sort(key=lambda x: x['strength'], reverse=True)
+            body = payload['body']
+            if body is None:
+                with span('decompress'):
+                    body = gzip.decompress(payload['gzip']).decode('utf-8')
+                payload['body'] = body
             
-            # Add to global connections list (limit to top 10 per participant)
-            for pc in participant_connections[:10]:
-                connections.append({
-                    'source': p1['id'],
-                    'target': pc['target_id'],
-                    'type': 'common_interests',
-                    'strength': round(pc['strength'], 2)
-                })
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': body
+            }
+        
+        # Filtered lists are not a base a delta can be applied to, so no version token
+        participants = load_participants(cur, search_query, cluster_filter)
+        
+        # Calculate connections dynamically
+        connections = compute_connections(cur, participants, get_taxonomy(cur))
         
         if cur:
             cur.close()
         if conn:
             conn.close()
         
+        with span('serialize'):
+            body = json.dumps({
+                'participants': participants,
+                'connections': connections,
+                'total': len(participants),
+                'version': None,
+                'full': True
+            })
+        
         return {
             'statusCode': 200,
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps({
-                'participants': participants,
-                'connections': connections,
-                'total': len(participants)
-            })
+            'body': body
         }
         
     except Exception as e:
@@ -0,0 +1,178 @@
+import gzip
+import json
+import os
+import threading
+from typing import Dict, List, Any, Optional, Tuple
+
+from lazy_imports import lazy_module
+from tracing import span
+from data_versions import get_data_versions
+
+psycopg2 = lazy_module('psycopg2')
+
+# Kept identical in every function directory that reads tags or clusters
+#
+# Tags, clusters, tag connections and the published affinity matrix stay in
+# memory for the life of the container. The affinity matrix is only read by
+# get-participants, so it is decoded on the first get_affinity call instead
+# of with the rest of the taxonomy. TAXONOMY_INVALIDATION selects how a
+# change is noticed:
+#   version - compare data_versions.taxonomy on each call (one tiny query)
+#   notify  - LISTEN data_versions on a long-lived connection; no query at all
+#             until a NOTIFY arrives (falls back to reloading if the listener breaks)
+
+SCHEMA = 't_p95295728_unicorn_lab_visualiz'
+
+# Taxonomy.affinity before get_affinity has read the tag_affinity table
+NOT_LOADED: Any = object()
+
+
+class Taxonomy:
+    """Snapshot of tags, clusters and tag links at one taxonomy version"""
+
+    def __init__(self, version: Optional[int], clusters: List[Dict[str, Any]],
+                 categories: List[Dict[str, Any]], tags: List[Dict[str, Any]],
+                 tag_connections: List[Dict[str, Any]]):
+        self.version = version
+        self.clusters = clusters
+        self.categories = categories
+        self.tags = tags
+        self.tag_connections = tag_connections
+        self.affinity = NOT_LOADED
+        self.cluster_ids = {c['name']: c['id'] for c in clusters}
+        self.tag_ids = {t['name']: t['id'] for t in tags}
+        self.connections_by_name = {(c['tag1'], c['tag2']): c['strength'] for c in tag_connections}
+
+
+def decode_affinity(payload: bytes) -> Dict[Tuple[int, int], float]:
+    """tag_affinity payload -> strength keyed by (tag_id, tag_id) in both orders"""
+    data = json.loads(gzip.decompress(payload))
+    pairs: Dict[Tuple[int, int], float] = {}
+    for tag1, tag2, strength in data['pairs']:
+        pairs[(tag1, tag2)] = strength
+        pairs[(tag2, tag1)] = strength
+    return pairs
+
+
+def load_affinity(cur) -> Optional[Dict[Tuple[int, int], float]]:
+    """Latest published affinity matrix, or None when there is none"""
+    try:
+        with span('db.tag_affinity'):
+            cur.execute(f"SELECT payload FROM {SCHEMA}.tag_affinity ORDER BY id DESC LIMIT 1")
+            row = cur.fetchone()
+    except psycopg2.Error as e:
+        print(f"Warning: could not load tag affinity: {str(e)}")
+        cur.connection.rollback()
+        return None
+    if not row:
+        return None
+    with span('compute.decode_affinity'):
+        return decode_affinity(bytes(row[0]))
+
+
+def load_taxonomy(cur, version: Optional[int]) -> Taxonomy:
+    """Read the whole taxonomy from the database"""
+    with span('db.clusters'):
+        cur.execute(f"""
+            SELECT id, name, color, display_order
+            FROM {SCHEMA}.clusters
+            ORDER BY display_order, name
+        """)
+        clusters = [{'id': r[0], 'name': r[1], 'color': r[2], 'display_order': r[3]}
+                    for r in cur.fetchall()]
+
+    with span('db.tag_categories'):
+        cur.execute(f"""
+            SELECT id, key, name
+            FROM {SCHEMA}.tag_categories
+            ORDER BY display_order
+        """)
+        categories = [{'id': r[0], 'key': r[1], 'name': r[2]} for r in cur.fetchall()]
+
+    with span('db.tags'):
+        cur.execute(f"""
+            SELECT t.id, t.name, t.category_id, tc.key, tc.name
+            FROM {SCHEMA}.tags t
+            LEFT JOIN {SCHEMA}.tag_categories tc ON t.category_id = tc.id
+            ORDER BY t.category_id, t.display_order, t.name
+        """)
+        tags = [{'id': r[0], 'name': r[1], 'category_id': r[2], 'category_key': r[3], 'category_name': r[4]}
+                for r in cur.fetchall()]
+
+    with span('db.tag_connections'):
+        cur.execute(f"""
+            SELECT tc.tag1_id, tc.tag2_id, t1.name, t2.name, tc.strength, tc.connection_type
+            FROM {SCHEMA}.tag_connections tc
+            JOIN {SCHEMA}.tags t1 ON tc.tag1_id = t1.id
+            JOIN {SCHEMA}.tags t2 ON tc.tag2_id = t2.id
+            WHERE tc.strength > 0
+            ORDER BY tc.strength DESC
+        """)
+        tag_connections = [{'tag1_id': r[0], 'tag2_id': r[1], 'tag1': r[2], 'tag2': r[3],
+                            'strength': float(r[4]), 'type': r[5]}
+                           for r in cur.fetchall()]
+
+    print(f"Loaded taxonomy v{version}: {len(tags)} tags, {len(clusters)} clusters, "
+          f"{len(tag_connections)} connections")
+    return Taxonomy(version, clusters, categories, tags, tag_connections)
+
+
+_cache: Dict[str, Any] = {'taxonomy': None}
+_lock = threading.Lock()
+_listener: Dict[str, Any] = {'conn': None}
+
+
+def _notified_change() -> bool:
+    """Drain NOTIFYs on the listener; True when the taxonomy may have changed"""
+    conn = _listener['conn']
+    try:
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(os.environ['DATABASE_URL'])
+            conn.autocommit = True
+            conn.cursor().execute("LISTEN data_versions")
+            _listener['conn'] = conn
+            # Anything could have changed while nobody was listening
+            return True
+        conn.poll()
+        changed = any(n.payload.startswith('taxonomy:') for n in conn.notifies)
+        del conn.notifies[:]
+        return changed
+    except psycopg2.Error as e:
+        print(f"Warning: taxonomy listener failed, reloading: {str(e)}")
+        if conn is not None and not conn.closed:
+            conn.close()
+        _listener['conn'] = None
+        return True
+
+
+def get_taxonomy(cur) -> Taxonomy:
+    """Cached taxonomy, reloaded only when it changed"""
+    with _lock:
+        cached = _cache['taxonomy']
+        if os.environ.get('TAXONOMY_INVALIDATION', 'version') == 'notify':
+            # Start listening before the first load, so it is not repeated
+            # when the listener connects on the next call
+            if not _notified_change() and cached is not None:
+                return cached
+            with span('db.data_versions'):
+                version = get_data_versions(cur).get('taxonomy')
+        else:
+            with span('db.data_versions'):
+                version = get_data_versions(cur).get('taxonomy')
+            if cached is not None and version is not None and cached.version == version:
+                return cached
+
+        taxonomy = load_taxonomy(cur, version)
+        # Without data_versions there is nothing to validate against: do not cache
+        _cache['taxonomy'] = taxonomy if version is not None else None
+        return taxonomy
+
+
+def get_affinity(cur, taxonomy: Taxonomy) -> Optional[Dict[Tuple[int, int], float]]:
+    """Published affinity matrix for this taxonomy, read on first use"""
+    with _lock:
+        if taxonomy.affinity is NOT_LOADED:
+            taxonomy.affinity = load_affinity(cur)
+            print(f"Loaded tag affinity for taxonomy v{taxonomy.version}: "
+                  f"{'yes' if taxonomy.affinity else 'no'}")
+        return taxonomy.affinity
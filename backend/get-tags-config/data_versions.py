@@ -0,0 +1,29 @@
+from typing import Dict, Optional, Tuple
+
+from lazy_imports import lazy_module
+
+psycopg2 = lazy_module('psycopg2')
+
+# Kept identical in every function directory that caches derived data
+#
+# data_versions rows are bumped by triggers (V0023): 'participants' on
+# entrepreneurs/entrepreneur_tags, 'taxonomy' on tags/clusters/tag_connections/tag_categories,
+# 'graph_metrics' on entrepreneur_graph_metrics (V0035)
+
+
+def get_data_versions(cur) -> Dict[str, int]:
+    """Current data versions; empty before the data_versions migration is applied"""
+    try:
+        cur.execute("SELECT name, version FROM t_p95295728_unicorn_lab_visualiz.data_versions")
+        return {name: int(version) for name, version in cur.fetchall()}
+    except psycopg2.Error as e:
+        print(f"Warning: could not read data versions: {str(e)}")
+        cur.connection.rollback()
+        return {}
+
+
+def version_key(versions: Dict[str, int], *names: str) -> Optional[Tuple[int, ...]]:
+    """Cache key from the named versions, or None when any is unknown (no caching)"""
+    if not all(name in versions for name in names):
+        return None
+    return tuple(versions[name] for name in names)
@@ -1,8 +1,15 @@
 import json
 import os
-import psycopg2
 from typing import Dict, Any, List
+from lazy_imports import lazy_module
+from tracing import traced, span
+from profiling import profiled
+from taxonomy_cache import get_taxonomy
 
+psycopg2 = lazy_module('psycopg2')
+
+@traced('get-tags-config')
+@profiled('get-tags-config')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Get tags, clusters and connections configuration from database
@@ -24,84 +31,56 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     if method == 'GET':
         try:
-            conn = psycopg2.connect(os.environ['DATABASE_URL'])
-            cur = conn.cursor()
+            with span('db.connect'):
+                conn = psycopg2.connect(os.environ['DATABASE_URL'])
+                cur = conn.cursor()
             
-            # Получаем кластеры
-            cur.execute("""
-                SELECT name, color 
-                FROM t_p95295728_unicorn_lab_visualiz.clusters 
-                ORDER BY display_order, name
-            """)
-            clusters = []
-            cluster_colors = {}
-            for row in cur.fetchall():
-                clusters.append(row[0])
-                if row[1]:
-                    cluster_colors[row[0]] = row[1]
+            taxonomy = get_taxonomy(cur)
             
-            # Получаем категории тегов
-            cur.execute("""
-                SELECT id, key, name 
-                FROM t_p95295728_unicorn_lab_visualiz.tag_categories 
-                ORDER BY display_order
-            """)
-            categories = {row[0]: {'key': row[1], 'name': row[2]} for row in cur.fetchall()}
+            clusters = [c['name'] for c in taxonomy.clusters]
+            cluster_colors = {c['name']: c['color'] for c in taxonomy.clusters if c['color']}
+            categories = [{'key': c['key'], 'name': c['name']} for c in taxonomy.categories]
             
-            # Получаем теги с их категориями
-            cur.execute("""
-                SELECT t.name, t.category_id, tc.key
-                FROM t_p95295728_unicorn_lab_visualiz.tags t
-                JOIN t_p95295728_unicorn_lab_visualiz.tag_categories tc ON t.category_id = tc.id
-                ORDER BY t.category_id, t.display_order, t.name
-            """)
+            # Теги только из существующих категорий, в порядке категорий
             tags_by_category = {}
             all_tags = []
-            for tag_name, cat_id, cat_key in cur.fetchall():
-                if cat_key not in tags_by_category:
-                    tags_by_category[cat_key] = []
-                tags_by_category[cat_key].append(tag_name)
-                all_tags.append(tag_name)
+            for tag in taxonomy.tags:
+                if tag['category_key'] is None:
+                    continue
+                tags_by_category.setdefault(tag['category_key'], []).append(tag['name'])
+                all_tags.append(tag['name'])
             
-            # Получаем связи между тегами
-            cur.execute("""
-                SELECT 
-                    t1.name as tag1,
-                    t2.name as tag2,
-                    tc.strength,
-                    tc.connection_type
-                FROM t_p95295728_unicorn_lab_visualiz.tag_connections tc
-                JOIN t_p95295728_unicorn_lab_visualiz.tags t1 ON tc.tag1_id = t1.id
-                JOIN t_p95295728_unicorn_lab_visualiz.tags t2 ON tc.tag2_id = t2.id
-                WHERE tc.strength >= 0.5
-                ORDER BY tc.strength DESC
-            """)
-            connections = []
-            for row in cur.fetchall():
-                connections.append({
-                    'tag1': row[0],
-                    'tag2': row[1],
-                    'strength': float(row[2]),
-                    'type': row[3]
-                })
+            # Связи между тегами
+            connections = [
+                {
+                    'tag1': c['tag1'],
+                    'tag2': c['tag2'],
+                    'strength': c['strength'],
+                    'type': c['type']
+                }
+                for c in taxonomy.tag_connections if c['strength'] >= 0.5
+            ]
             
             cur.close()
             conn.close()
             
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps({
+            with span('serialize'):
+                body = json.dumps({
                     'clusters': clusters,
                     'clusterColors': cluster_colors,
-                    'categories': list(categories.values()),
+                    'categories': categories,
                     'tagsByCategory': tags_by_category,
                     'allTags': all_tags,
                     'connections': connections
                 })
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Content-Type': 'application/json',
+                    'Access-Control-Allow-Origin': '*'
+                },
+                'body': body
             }
             
         except Exception as e:
@@ -0,0 +1,203 @@
+import hashlib
+import hmac
+import io
+import json
+import os
+import random
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+# Kept identical in every function directory: each function is deployed on its own
+
+# Opt-in cProfile + tracemalloc around a handler. An invocation is profiled
+# when PROFILE_HANDLERS is on and it wins the PROFILE_SAMPLE_RATE draw, or
+# when it carries a valid X-Profile header signed with PROFILE_SECRET.
+# Either way at most PROFILE_MAX_PER_MINUTE invocations per container are
+# profiled, and only one at a time (the profilers are process-wide).
+# cProfile sees the handler's own thread only; worker threads show up as
+# time spent waiting on their futures.
+
+PROFILE_HEADER = 'x-profile'
+PROFILE_SIGNATURE_TTL = 300
+
+
+def _enabled() -> bool:
+    return os.environ.get('PROFILE_HANDLERS', '').lower() in ('1', 'true', 'yes')
+
+
+def _sample_rate() -> float:
+    return float(os.environ.get('PROFILE_SAMPLE_RATE', '0.01'))
+
+
+def _max_per_minute() -> int:
+    return int(os.environ.get('PROFILE_MAX_PER_MINUTE', '6'))
+
+
+def _top_n() -> int:
+    return int(os.environ.get('PROFILE_TOP_N', '15'))
+
+
+def sign(function_name: str, secret: str, timestamp: Optional[int] = None) -> str:
+    """X-Profile header value: '<unix time>:<hex HMAC-SHA256 of name:time>'"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode('utf-8'), f"{function_name}:{timestamp}".encode('utf-8'),
+                      hashlib.sha256).hexdigest()
+    return f"{timestamp}:{digest}"
+
+
+def signature_valid(function_name: str, value: str) -> bool:
+    """True for a fresh header signed with PROFILE_SECRET for this function"""
+    secret = os.environ.get('PROFILE_SECRET', '')
+    if not secret or not isinstance(value, str) or ':' not in value:
+        return False
+    timestamp, _ = value.split(':', 1)
+    try:
+        age = abs(time.time() - int(timestamp))
+    except (ValueError, OverflowError):
+        return False
+    if age > PROFILE_SIGNATURE_TTL:
+        return False
+    # Bytes, because compare_digest raises TypeError on non-ASCII str
+    return hmac.compare_digest(sign(function_name, secret, int(timestamp)).encode('utf-8'),
+                               value.encode('utf-8', errors='replace'))
+
+
+class RateLimit:
+    """At most limit acquisitions per sliding minute"""
+
+    def __init__(self):
+        self.recent: List[float] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, limit: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self.recent = [t for t in self.recent if now - t < 60.0]
+            if len(self.recent) >= limit:
+                return False
+            self.recent.append(now)
+            return True
+
+
+_rate_limit = RateLimit()
+_profiler_lock = threading.Lock()
+
+
+def profile_reason(function_name: str, event: Dict[str, Any]) -> Optional[str]:
+    """'header' or 'sampled' when this invocation should be profiled; never raises"""
+    try:
+        headers = event.get('headers') or {}
+        for name, value in headers.items():
+            if str(name).lower() == PROFILE_HEADER and value:
+                if signature_valid(function_name, value):
+                    return 'header'
+                print(f"Ignoring invalid {PROFILE_HEADER} header")
+                break
+        if _enabled() and random.random() < _sample_rate():
+            return 'sampled'
+    except Exception as e:
+        print(f"Warning: could not decide on profiling: {str(e)}")
+    return None
+
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace('\\', '/').split('/')
+    return '/'.join(parts[-2:])
+
+
+def top_functions(profiler, limit: int) -> List[str]:
+    """Compact 'cum self calls location' lines, slowest cumulative first"""
+    import pstats
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        rows.append((cumulative, self_time, calls, f"{_short_path(filename)}:{line}({function})"))
+    rows.sort(reverse=True)
+    return [f"{cum * 1000:.1f}ms cum {own * 1000:.1f}ms self {calls}x {where}"
+            for cum, own, calls, where in rows[:limit]]
+
+
+def top_allocations(snapshot, limit: int) -> List[str]:
+    """Compact 'size count location' lines for the largest sites still held at the end"""
+    lines = []
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:.1f}KiB {stat.count}x {_short_path(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def write_stats(profiler, function_name: str, directory: str) -> str:
+    """Dump pstats for offline analysis (python -m pstats <file>); returns the path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{function_name}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.pstats")
+    profiler.dump_stats(path)
+    return path
+
+
+def report(function_name: str, reason: str, profiler, snapshot, peak: Optional[int], total_ms: float) -> None:
+    """Print one structured log line for a profiled invocation"""
+    record: Dict[str, Any] = {
+        'profile': function_name,
+        'reason': reason,
+        'total_ms': round(total_ms, 2),
+    }
+    directory = os.environ.get('PROFILE_DIR')
+    if directory:
+        record['pstats'] = write_stats(profiler, function_name, directory)
+    else:
+        record['top'] = top_functions(profiler, _top_n())
+    if snapshot is not None:
+        record['peak_kib'] = round(peak / 1024, 1)
+        record['allocations'] = top_allocations(snapshot, _top_n())
+    print(json.dumps(record, ensure_ascii=False))
+
+
+def profiled(function_name: str) -> Callable:
+    """Decorate a cloud function handler with on-demand profiling"""
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            reason = profile_reason(function_name, event)
+            if reason is None or not _rate_limit.acquire(_max_per_minute()):
+                return handler(event, context)
+            if not _profiler_lock.acquire(blocking=False):
+                return handler(event, context)
+
+            import cProfile
+            import tracemalloc
+
+            try:
+                trace_memory = not tracemalloc.is_tracing()
+                if trace_memory:
+                    tracemalloc.start()
+                profiler = cProfile.Profile()
+                started = time.perf_counter()
+                try:
+                    profiler.enable()
+                except ValueError as e:
+                    # Another profiler (a debugger, coverage) already owns the hooks
+                    print(f"Warning: profiling unavailable: {str(e)}")
+                    if trace_memory:
+                        tracemalloc.stop()
+                    return handler(event, context)
+                try:
+                    return handler(event, context)
+                finally:
+                    profiler.disable()
+                    total_ms = (time.perf_counter() - started) * 1000
+                    snapshot, peak = None, None
+                    if trace_memory:
+                        snapshot = tracemalloc.take_snapshot()
+                        peak = tracemalloc.get_traced_memory()[1]
+                        tracemalloc.stop()
+                    try:
+                        report(function_name, reason, profiler, snapshot, peak, total_ms)
+                    except Exception as e:
+                        print(f"Warning: could not report profile: {str(e)}")
+            finally:
+                _profiler_lock.release()
+        return wrapper
+    return decorator
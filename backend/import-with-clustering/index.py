@@ -1,16 +1,24 @@
 import json
 import os
-import psycopg2
-import httpx
-from openai import OpenAI
 from typing import Dict, List, Any, Optional, Literal, Tuple
 from datetime import datetime
-from pydantic import BaseModel, Field, ValidationError, validator
+from lazy_imports import lazy_module
+from tracing import traced, span
+from profiling import profiled
+from taxonomy_cache import get_taxonomy
+from normalizer import get_name_index
+from text_similarity import update_text_similarity
+from llm_usage import call_with_routing, choose_import_models, LLMValidationError
+
+# Heavy dependencies load on first use so OPTIONS preflights stay cheap
+psycopg2 = lazy_module('psycopg2')
+openai = lazy_module('openai')
 
 def filter_new_participants(participants: List[Dict]) -> List[Dict]:
     """Filter out participants that already exist in database by post_url"""
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor()
+    with span('db.connect'):
+        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        cur = conn.cursor()
     
     try:
         # Get all existing post_urls
@@ -21,12 +29,13 @@ def filter_new_participants(participants: List[Dict]) -> List[Dict]:
             return participants
         
         # Check which post_urls already exist
-        cur.execute("""
-            SELECT post_url FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs 
-            WHERE post_url = ANY(%s::text[])
-        """, (post_urls,))
-        
-        existing_urls = {row[0] for row in cur.fetchall()}
+        with span('db.existing_urls'):
+            cur.execute("""
+                SELECT post_url FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs 
+                WHERE post_url = ANY(%s::text[])
+            """, (post_urls,))
+            
+            existing_urls = {row[0] for row in cur.fetchall()}
         
         # Filter out participants with existing post_urls
         new_participants = []
@@ -43,34 +52,19 @@ def filter_new_participants(participants: List[Dict]) -> List[Dict]:
 
 
 def get_tags_and_clusters_from_db() -> Tuple[List[str], Dict[str, int]]:
-    """Load tags and clusters from database"""
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor()
+    """Load tags and clusters from the taxonomy cache"""
+    with span('db.connect'):
+        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        cur = conn.cursor()
     
     try:
-        # Try to get current schema
-        cur.execute("SELECT current_schema()")
-        current_schema = cur.fetchone()[0]
-        print(f"Current schema: {current_schema}")
+        taxonomy = get_taxonomy(cur)
         
-        # Get all non-cluster tags
-        cur.execute("""
-            SELECT t.name 
-            FROM t_p95295728_unicorn_lab_visualiz.tags t
-            LEFT JOIN t_p95295728_unicorn_lab_visualiz.tag_categories tc ON t.category_id = tc.id
-            WHERE tc.name != 'cluster' OR tc.name IS NULL
-            ORDER BY t.name
-        """)
-        tags = [row[0] for row in cur.fetchall()]
+        # All non-cluster tags
+        tags = sorted(t['name'] for t in taxonomy.tags if t['category_name'] != 'cluster')
         
-        # Get clusters from clusters table
-        cur.execute("""
-            SELECT id, name 
-            FROM t_p95295728_unicorn_lab_visualiz.clusters
-            ORDER BY display_order, name
-        """)
-        cluster_rows = cur.fetchall()
-        clusters_dict = {name: id for id, name in cluster_rows}
+        # Clusters in display order
+        clusters_dict = dict(taxonomy.cluster_ids)
         
         print(f"Loaded {len(tags)} tags and {len(clusters_dict)} clusters from DB")
         
@@ -98,6 +92,46 @@ def get_tags_and_clusters_from_db() -> Tuple[List[str], Dict[str, int]]:
         conn.close()
 
 
+def refresh_text_similarity() -> None:
+    """Update text vectors and similarity edges for the participants just saved
+
+    Failures are logged only: the import itself is already committed and the
+    next import (or tools/jobs/build_text_similarity.py) catches up.
+    """
+    try:
+        with span('db.connect'):
+            conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        try:
+            stats = update_text_similarity(conn)
+        finally:
+            conn.close()
+        print(f"Text similarity: {stats}")
+    except Exception as e:
+        print(f"Warning: could not refresh text similarity: {str(e)}")
+
+
+def warm_graph_snapshot() -> None:
+    """Ask get-participants to build the snapshot for the data just committed
+
+    The first request for a new data version computes the graph and stores a
+    compressed snapshot; doing it here keeps that cost off the next visitor.
+    """
+    url = os.environ.get('GET_PARTICIPANTS_URL')
+    if not url:
+        return
+    import urllib.request
+    try:
+        with span('warm_graph_snapshot'):
+            request = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip'})
+            with urllib.request.urlopen(request, timeout=float(os.environ.get('WARM_SNAPSHOT_TIMEOUT', '10'))) as response:
+                response.read()
+        print("Warmed get-participants snapshot")
+    except Exception as e:
+        print(f"Warning: could not warm get-participants snapshot: {str(e)}")
+
+
+@traced('import-with-clustering')
+@profiled('import-with-clustering')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     '''
     Business: Import and cluster Telegram participants using OpenAI with tags from DB
@@ -175,6 +209,12 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Save to database
         result = save_to_database(clustered_participants, participants, allowed_tags, clusters_dict)
+        if result['imported'] or result['updated']:
+            refresh_text_similarity()
+            warm_graph_snapshot()
+        
+        with span('serialize'):
+            body = json.dumps(result)
         
         return {
             'statusCode': 200,
@@ -182,7 +222,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps(result),
+            'body': body,
             'isBase64Encoded': False
         }
         
@@ -198,59 +238,9 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         }
 
 
-def process_with_structured_output(participants: List[Dict], allowed_tags: List[str], clusters_dict: Dict[str, int]) -> List[Dict]:
-    """Process participants using OpenAI structured output with DB tags and clusters"""
-    api_key = os.environ.get('OPENAI_API_KEY', '')
-    if not api_key:
-        raise Exception("OPENAI_API_KEY not configured")
-    
-    # Define Pydantic models
-    clusters = list(clusters_dict.keys())
-    
-    class Participant(BaseModel):
-        name: str
-        telegram_id: str
-        cluster: str = Field(..., description=f"Must be one of: {', '.join(clusters)}")
-        summary: str
-        goal: str
-        emoji: str = Field(min_length=1, max_length=2)
-        tags: List[str] = Field(min_items=3, max_items=10)
-        
-        @validator('cluster')
-        def validate_cluster(cls, v):
-            if v not in clusters:
-                raise ValueError(f'cluster must be one of: {", ".join(clusters)}')
-            return v
-    
-    class ParticipantBatch(BaseModel):
-        participants: List[Participant]
-    
-    # Prepare batch text
-    batch_text = ""
-    for i, p in enumerate(participants):
-        batch_text += f"Participant {i+1}:\n"
-        batch_text += f"Name: {p.get('author', 'Unknown')}\n"
-        batch_text += f"ID: {p.get('authorId', '')}\n"
-        batch_text += f"Text: {p.get('text', '')}\n\n"
-    
-    # Setup proxy if needed
-    proxy_url = os.environ.get('OPENAI_HTTP_PROXY', '')
-    http_client = None
-    if proxy_url:
-        http_client = httpx.Client(proxies=proxy_url)
-        print(f"Using proxy: {proxy_url} with GPT-5-mini")
-    else:
-        print("WARNING: No proxy configured, OpenAI might be blocked")
-    
-    try:
-        client = OpenAI(api_key=api_key, http_client=http_client)
-        
-        completion = client.beta.chat.completions.parse(
-            model="gpt-5-nano",
-            messages=[
-                {
-                    'role': 'system',
-                    'content': f'''You are analyzing Russian text about entrepreneurs and business professionals.
+def build_system_prompt(clusters: List[str], allowed_tags: List[str]) -> str:
+    """System prompt for participant classification with DB tags and clusters"""
+    return f'''You are analyzing Russian text about entrepreneurs and business professionals.
 
 TASK:
 1. Extract participant NAME in Russian
@@ -304,13 +294,64 @@ NAME EXTRACTION EXAMPLES:
 - "@ivan_petrov Иван, основатель..." → name: "Иван"
 - "...С уважением, Елена Сидорова" → name: "Елена Сидорова"
 - No name in text, metadata shows "Alice Cooper 🚀" → name: "Элис Купер"'''
-                },
-                {
-                    'role': 'user',
-                    'content': batch_text
-                }
-            ],
-            response_format=ParticipantBatch
+
+
+def get_openai_client(api_key: str) -> 'openai.OpenAI':
+    """Initialize OpenAI client with proxy, record or replay transport"""
+    from openai_transport import build_http_client
+    return openai.OpenAI(api_key=api_key, http_client=build_http_client())
+
+
+def process_with_structured_output(participants: List[Dict], allowed_tags: List[str], clusters_dict: Dict[str, int]) -> List[Dict]:
+    """Process participants using OpenAI structured output with DB tags and clusters"""
+    api_key = os.environ.get('OPENAI_API_KEY', '')
+    if not api_key:
+        raise Exception("OPENAI_API_KEY not configured")
+    
+    clusters = list(clusters_dict.keys())
+    
+    from schemas import get_participant_schema
+    ParticipantBatch = get_participant_schema(clusters)
+    
+    # Prepare batch text
+    batch_text = ""
+    for i, p in enumerate(participants):
+        batch_text += f"Participant {i+1}:\n"
+        batch_text += f"Name: {p.get('author', 'Unknown')}\n"
+        batch_text += f"ID: {p.get('authorId', '')}\n"
+        batch_text += f"Text: {p.get('text', '')}\n\n"
+    
+    try:
+        client = get_openai_client(api_key)
+        
+        def request(model: str) -> Any:
+            return client.beta.chat.completions.parse(
+                model=model,
+                messages=[
+                    {
+                        'role': 'system',
+                        'content': build_system_prompt(clusters, allowed_tags)
+                    },
+                    {
+                        'role': 'user',
+                        'content': batch_text
+                    }
+                ],
+                response_format=ParticipantBatch
+            )
+        
+        def validate(completion: Any) -> None:
+            parsed = completion.choices[0].message.parsed
+            if parsed is None:
+                raise LLMValidationError("Empty or refused structured response")
+            if len(parsed.participants) < len(participants):
+                raise LLMValidationError(
+                    f"Got {len(parsed.participants)} of {len(participants)} participants"
+                )
+        
+        completion, _ = call_with_routing(
+            'import-with-clustering', 'classify_batch',
+            choose_import_models(len(participants)), request, validate
         )
         
         # Get parsed result
@@ -331,8 +372,9 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
         parsed: List of participants processed by AI
         all_participants: All participants from original request (including skipped ones)
     """
-    conn = psycopg2.connect(os.environ['DATABASE_URL'])
-    cur = conn.cursor()
+    with span('db.connect'):
+        conn = psycopg2.connect(os.environ['DATABASE_URL'])
+        cur = conn.cursor()
     
     imported_count = 0
     updated_count = 0
@@ -342,11 +384,13 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
     
     # Get tag IDs mapping
     try:
-        cur.execute("SELECT id, name FROM t_p95295728_unicorn_lab_visualiz.tags")
-        tag_id_map = {name: id for id, name in cur.fetchall()}
-    except:
+        tag_id_map = get_taxonomy(cur).tag_ids
+    except Exception:
         print("Warning: Could not load tags mapping from DB")
+        conn.rollback()
         tag_id_map = {}
+    tag_index = get_name_index(list(tag_id_map))
+    cluster_index = get_name_index(list(clusters_dict))
     
     # Create lookup for parsed data
     parsed_lookup = {p['telegram_id']: p for p in parsed}
@@ -356,11 +400,12 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
     try:
         post_urls = [p.get('messageLink', '') for p in all_participants if p.get('messageLink')]
         if post_urls:
-            cur.execute("""
-                SELECT post_url FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs 
-                WHERE post_url = ANY(%s::text[])
-            """, (post_urls,))
-            existing_post_urls = {row[0] for row in cur.fetchall()}
+            with span('db.existing_urls'):
+                cur.execute("""
+                    SELECT post_url FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs 
+                    WHERE post_url = ANY(%s::text[])
+                """, (post_urls,))
+                existing_post_urls = {row[0] for row in cur.fetchall()}
     except Exception as e:
         print(f"Error checking existing URLs: {e}")
     
@@ -379,12 +424,14 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
             # Get parsed data
             parsed_data = parsed_lookup.get(telegram_id)
             if parsed_data:
-                cluster_name = parsed_data['cluster']
-                cluster_id = clusters_dict.get(cluster_name)
+                cluster_name = cluster_index.resolve(parsed_data['cluster'])
+                cluster_id = clusters_dict.get(cluster_name) if cluster_name else None
                 if not cluster_id:
-                    print(f"Warning: Unknown cluster '{cluster_name}', skipping")
+                    print(f"Warning: Unknown cluster '{parsed_data['cluster']}', skipping")
                     continue
-                tags = parsed_data['tags']
+                tags, unknown_tags = tag_index.resolve_all(parsed_data['tags'])
+                for tag_name in unknown_tags:
+                    print(f"Warning: Tag '{tag_name}' not found in database")
                 summary = parsed_data['summary']
                 goal = parsed_data['goal']
                 emoji = parsed_data.get('emoji', '😊')
@@ -395,42 +442,19 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
             # Count clusters
             clusters_count[cluster_name] = clusters_count.get(cluster_name, 0) + 1
             
-            # Check if exists by telegram_id
-            cur.execute("""
-                SELECT id FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs 
-                WHERE telegram_id = %s
-            """, (telegram_id,))
-            existing = cur.fetchone()
-            
-            if existing:
-                entrepreneur_id = existing[0]
-                # Update existing
-                cur.execute("""
-                    UPDATE t_p95295728_unicorn_lab_visualiz.entrepreneurs 
-                    SET name = %s, description = %s, post_url = %s, 
-                        cluster = %s, cluster_id = %s, goal = %s, emoji = %s, updated_at = CURRENT_TIMESTAMP
-                    WHERE telegram_id = %s
-                    RETURNING id
-                """, (
-                    parsed_data.get('name', participant.get('author', 'Unknown')),  # Use AI-extracted name
-                    summary,  # Use AI-generated summary
-                    participant.get('messageLink', ''),
-                    cluster_name,
-                    cluster_id,
-                    goal,
-                    emoji,
-                    telegram_id
-                ))
-                updated_count += 1
-            else:
-                # Insert new
+            with span('db.save_participant'):
+                # Insert or update by telegram_id in one round trip; xmax = 0 only for fresh rows
                 cur.execute("""
                     INSERT INTO t_p95295728_unicorn_lab_visualiz.entrepreneurs (
                         telegram_id, name, description, post_url, 
                         cluster, cluster_id, goal, emoji, created_at, updated_at
                     ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s,
                             CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                    RETURNING id
+                    ON CONFLICT (telegram_id) DO UPDATE
+                    SET name = EXCLUDED.name, description = EXCLUDED.description, post_url = EXCLUDED.post_url,
+                        cluster = EXCLUDED.cluster, cluster_id = EXCLUDED.cluster_id, goal = EXCLUDED.goal,
+                        emoji = EXCLUDED.emoji, updated_at = CURRENT_TIMESTAMP
+                    RETURNING id, (xmax = 0) AS inserted
                 """, (
                     telegram_id,
                     parsed_data.get('name', participant.get('author', 'Unknown')),  # Use AI-extracted name
@@ -441,35 +465,34 @@ def save_to_database(parsed: List[Dict], all_participants: List[Dict], allowed_t
                     goal,
                     emoji
                 ))
-                entrepreneur_id = cur.fetchone()[0]
-                imported_count += 1
+                entrepreneur_id, inserted = cur.fetchone()
+                if inserted:
+                    imported_count += 1
+                else:
+                    updated_count += 1
             
-            # Clear existing tags for this entrepreneur
-            try:
-                cur.execute("DELETE FROM t_p95295728_unicorn_lab_visualiz.entrepreneur_tags WHERE entrepreneur_id = %s", (entrepreneur_id,))
-            except:
-                print(f"Warning: Could not clear tags for entrepreneur {entrepreneur_id}")
+                # Clear existing tags for this entrepreneur
+                try:
+                    cur.execute("DELETE FROM t_p95295728_unicorn_lab_visualiz.entrepreneur_tags WHERE entrepreneur_id = %s", (entrepreneur_id,))
+                except:
+                    print(f"Warning: Could not clear tags for entrepreneur {entrepreneur_id}")
             
-            # Insert new tag relations
-            for tag_name in tags:
-                tag_id = tag_id_map.get(tag_name)
-                if tag_id:
-                    try:
-                        cur.execute("""
-                            INSERT INTO t_p95295728_unicorn_lab_visualiz.entrepreneur_tags (entrepreneur_id, tag_id)
-                            VALUES (%s, %s)
-                            ON CONFLICT (entrepreneur_id, tag_id) DO NOTHING
-                        """, (entrepreneur_id, tag_id))
-                    except:
-                        print(f"Warning: Could not insert tag relation for {tag_name}")
-                else:
-                    print(f"Warning: Tag '{tag_name}' not found in database")
+                # Insert new tag relations in one statement, so the tag
+                # triggers fire once per participant instead of once per tag
+                tag_ids = sorted({tag_id_map[t] for t in tags if tag_id_map.get(t)})
+                if tag_ids:
+                    cur.execute("""
+                        INSERT INTO t_p95295728_unicorn_lab_visualiz.entrepreneur_tags (entrepreneur_id, tag_id)
+                        SELECT %s, unnest(%s::int[])
+                        ON CONFLICT (entrepreneur_id, tag_id) DO NOTHING
+                    """, (entrepreneur_id, tag_ids))
                 
         except Exception as e:
             errors.append(f"Error processing {participant.get('author', 'Unknown')}: {str(e)}")
             print(f"Error: {str(e)}")
     
-    conn.commit()
+    with span('db.commit'):
+        conn.commit()
     cur.close()
     conn.close()
     
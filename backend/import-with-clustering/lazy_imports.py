@@ -0,0 +1,33 @@
+import importlib
+import threading
+from types import ModuleType
+
+# Kept identical in every function directory: each function is deployed on its own
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        # Always delegate so patches on the real module stay visible
+        return getattr(self._load(), attr)
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Defer importing a heavy dependency until it is actually used"""
+    return LazyModule(name)
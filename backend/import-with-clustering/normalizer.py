@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Maps LLM spellings of tags and clusters onto the names in the database.
+# Exact matches after folding (case, ё/е, punctuation, spacing) are free;
+# anything else is matched against trigram candidates by edit distance and
+# accepted only above a similarity threshold with a single clear winner.
+
+MIN_SIMILARITY = float(os.environ.get('NAME_MATCH_MIN_SIMILARITY', '0.8'))
+MAX_CANDIDATES = 8
+MAX_CACHED_INDEXES = 8
+
+_punctuation = re.compile(r'[\s"\'«»“”„`.,;:!?()\[\]{}]+')
+_separators = re.compile(r'\s*([/&+-])\s*')
+
+
+def normalize_key(name: str) -> str:
+    """Comparison key: casefolded, ё -> е, quotes and spacing squeezed"""
+    key = name.casefold().replace('ё', 'е')
+    key = _separators.sub(r'\1', key)
+    return _punctuation.sub(' ', key).strip()
+
+
+def trigrams(key: str) -> Set[str]:
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """1 - Levenshtein distance / longer length"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+class NameIndex:
+    """Canonical names with a folded-key map and a trigram index"""
+
+    def __init__(self, names: List[str], min_similarity: float = MIN_SIMILARITY):
+        self.names = list(names)
+        self.known = set(self.names)
+        self.min_similarity = min_similarity
+        self.exact: Dict[str, str] = {}
+        self.keys: List[str] = []
+        self.by_trigram: Dict[str, List[int]] = {}
+        for position, name in enumerate(self.names):
+            key = normalize_key(name)
+            self.exact.setdefault(key, name)
+            self.keys.append(key)
+            for gram in trigrams(key):
+                self.by_trigram.setdefault(gram, []).append(position)
+
+    def resolve(self, value: str) -> Optional[str]:
+        """Canonical name for value, or None when nothing is close enough"""
+        if value in self.known:
+            return value
+        key = normalize_key(value)
+        if key in self.exact:
+            return self.exact[key]
+
+        shared: Dict[int, int] = {}
+        for gram in trigrams(key):
+            for position in self.by_trigram.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:MAX_CANDIDATES]
+
+        scored = sorted(((similarity(key, self.keys[p]), p) for p in candidates), reverse=True)
+        if not scored or scored[0][0] < self.min_similarity:
+            return None
+        best_score, best = scored[0]
+        # Two different names equally close: guessing would mislabel someone
+        if len(scored) > 1 and scored[1][0] == best_score and self.names[scored[1][1]] != self.names[best]:
+            return None
+        return self.names[best]
+
+    def resolve_all(self, values: List[str]) -> Tuple[List[str], List[str]]:
+        """(canonical names without duplicates, values that matched nothing)"""
+        resolved, unknown = [], []
+        for value in values:
+            name = self.resolve(value)
+            if name is None:
+                unknown.append(value)
+            elif name not in resolved:
+                resolved.append(name)
+        return resolved, unknown
+
+
+_indexes: 'OrderedDict[str, NameIndex]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_name_index(names: List[str]) -> NameIndex:
+    """Cached index for one list of names (rebuilt only when the list changes)"""
+    version = hashlib.sha1('\n'.join(names).encode('utf-8')).hexdigest()
+    with _indexes_lock:
+        index = _indexes.get(version)
+        if index is not None:
+            _indexes.move_to_end(version)
+            return index
+
+    index = NameIndex(names)
+    with _indexes_lock:
+        index = _indexes.setdefault(version, index)
+        _indexes.move_to_end(version)
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    return index
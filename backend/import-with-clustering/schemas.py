@@ -0,0 +1,67 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+from pydantic import BaseModel, Field, validator
+from normalizer import get_name_index
+
+# Structured-output schemas depend only on the cluster list, so they are built
+# once per cluster-set version instead of on every batch
+MAX_CACHED_SCHEMAS = 8
+
+_schemas: 'OrderedDict[str, type]' = OrderedDict()
+_schemas_lock = threading.Lock()
+
+
+def cluster_set_version(clusters: List[str]) -> str:
+    """Stable key for an ordered cluster list (order shows up in the prompt)"""
+    return hashlib.sha1('\n'.join(clusters).encode('utf-8')).hexdigest()
+
+
+def build_participant_schema(clusters: List[str]) -> type:
+    """Build the ParticipantBatch model for one list of clusters"""
+    clusters = list(clusters)
+    cluster_index = get_name_index(clusters)
+
+    class Participant(BaseModel):
+        name: str
+        telegram_id: str
+        cluster: str = Field(..., description=f"Must be one of: {', '.join(clusters)}")
+        summary: str
+        goal: str
+        emoji: str = Field(min_length=1, max_length=2)
+        tags: List[str] = Field(min_items=3, max_items=10)
+
+        @validator('cluster', pre=True)
+        def validate_cluster(cls, v):
+            # Repair near-misses ("Ed Tech", "ecommerce", "Маркетнг") instead of failing the whole batch
+            cluster = cluster_index.resolve(v) if isinstance(v, str) else None
+            if cluster is None:
+                raise ValueError(f'cluster must be one of: {", ".join(clusters)}')
+            if cluster != v:
+                print(f"Normalized cluster '{v}' -> '{cluster}'")
+            return cluster
+
+    class ParticipantBatch(BaseModel):
+        participants: List[Participant]
+
+    return ParticipantBatch
+
+
+def get_participant_schema(clusters: List[str]) -> type:
+    """Cached ParticipantBatch model for the current cluster set"""
+    version = cluster_set_version(clusters)
+    with _schemas_lock:
+        schema = _schemas.get(version)
+        if schema is not None:
+            _schemas.move_to_end(version)
+            return schema
+
+    schema = build_participant_schema(clusters)
+    with _schemas_lock:
+        schema = _schemas.setdefault(version, schema)
+        _schemas.move_to_end(version)
+        while len(_schemas) > MAX_CACHED_SCHEMAS:
+            _schemas.popitem(last=False)
+    return schema
+
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from lazy_imports import lazy_module
+from tracing import span
+
+psycopg2 = lazy_module('psycopg2')
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+# TF-IDF neighbours over description + goal (tables from V0032). Term counts
+# are stored per participant and only re-tokenized when the text hash
+# changes; after an import the neighbours of changed participants are
+# recomputed with one sparse product against everyone, together with those
+# of unchanged participants that lost an edge to them. Edges between two
+# unchanged participants keep their old weights, and lists that were not
+# touched are not re-ranked, so between full rebuilds a participant can end
+# up with fewer or more than TEXT_SIMILARITY_TOP_K neighbours. A full rebuild
+# (tools/jobs/build_text_similarity.py --full) re-weights everything with
+# fresh IDF and restores exact top-k lists.
+
+SCHEMA = 't_p95295728_unicorn_lab_visualiz'
+TEXT_SIMILARITY_LOCK = 7340102
+TEXT_SIMILARITY_TOP_K = int(os.environ.get('TEXT_SIMILARITY_TOP_K', '5'))
+TEXT_SIMILARITY_MIN = float(os.environ.get('TEXT_SIMILARITY_MIN', '0.35'))
+ROWS_PER_PRODUCT = 1000
+
+_word = re.compile(r'[0-9a-zа-я]+')
+
+STOP_WORDS = frozenset("""
+    а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до
+    его ее ей если есть еще же за здесь и из или им их к как какой когда кто ли либо между мне может
+    мой мы на над наш не него нее нет ни них но ну о об однако он она они оно от очень по под после
+    при про с со так также такой там те тем то того тоже той только том ты у уже хотя чем через что
+    чтобы эта эти это этот я
+    a an and are as at be by for from in is it of on or that the to with
+""".split())
+
+# Light Russian stemming: strip the longest inflection that leaves 4+ letters
+ENDINGS = tuple(sorted("""
+    иями ями ами иях ях ах ого его ому ему ыми ими ая яя ое ее ые ие ой ей ий ый ом ем ам ям ов ев
+    ую юю ешь ишь ет ут ют ит ат ят ться ть ся а я о е ы и у ю ь
+""".split(), key=len, reverse=True))
+
+
+def stem(word: str) -> str:
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 4:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """Stemmed term counts without stop words"""
+    words = _word.findall(text.casefold().replace('ё', 'е'))
+    return dict(Counter(stem(w) for w in words if len(w) > 2 and w not in STOP_WORDS))
+
+
+def text_hash(description: str, goal: str) -> str:
+    return hashlib.sha1(f"{description or ''}\n{goal or ''}".encode('utf-8')).hexdigest()
+
+
+def tfidf_matrix(vectors: List[Dict[str, int]]) -> 'sparse.csr_matrix':
+    """L2-normalized rows with sublinear tf and smoothed idf"""
+    vocabulary: Dict[str, int] = {}
+    indptr, indices, data = [0], [], []
+    for counts in vectors:
+        for term, count in counts.items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            data.append(count)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+        shape=(len(vectors), len(vocabulary))
+    )
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocabulary))
+    idf = np.log((1.0 + len(vectors)) / (1.0 + document_frequency)) + 1.0
+    matrix.data = (1.0 + np.log(matrix.data)) * idf[matrix.indices]
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+
+def top_neighbours(matrix: 'sparse.csr_matrix', rows: List[int], ids: List[int],
+                   top_k: int, min_similarity: float) -> Dict[Tuple[int, int], float]:
+    """{(smaller id, larger id): cosine} for the top_k neighbours of each row"""
+    edges: Dict[Tuple[int, int], float] = {}
+    transposed = matrix.T.tocsc()
+    for offset in range(0, len(rows), ROWS_PER_PRODUCT):
+        block = rows[offset:offset + ROWS_PER_PRODUCT]
+        scores = matrix[block].dot(transposed).tocsr()
+        for position, row in enumerate(block):
+            start, end = scores.indptr[position], scores.indptr[position + 1]
+            columns, values = scores.indices[start:end], scores.data[start:end]
+            keep = (columns != row) & (values >= min_similarity)
+            columns, values = columns[keep], values[keep]
+            if len(columns) > top_k:
+                best = np.argpartition(-values, top_k)[:top_k]
+                columns, values = columns[best], values[best]
+            for column, value in zip(columns.tolist(), values.tolist()):
+                key = (min(ids[row], ids[column]), max(ids[row], ids[column]))
+                edges[key] = max(edges.get(key, 0.0), round(min(value, 1.0), 3))
+    return edges
+
+
+def update_text_similarity(conn, full: bool = False) -> Dict[str, Any]:
+    """Refresh vectors of changed participants and their similarity edges
+
+    full recomputes every participant's neighbours (and so every weight)
+    instead of only the changed ones.
+    """
+    from psycopg2.extras import execute_values
+
+    cur = conn.cursor()
+    try:
+        # One refresher at a time; concurrent imports would race on the edges
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (TEXT_SIMILARITY_LOCK,))
+        with span('db.text_vectors'):
+            cur.execute(f"""
+                SELECT e.id, e.description, e.goal, v.text_hash, v.terms
+                FROM {SCHEMA}.entrepreneurs e
+                LEFT JOIN {SCHEMA}.entrepreneur_text_vectors v ON v.entrepreneur_id = e.id
+                ORDER BY e.id
+            """)
+            rows = cur.fetchall()
+
+        ids: List[int] = []
+        vectors: List[Dict[str, int]] = []
+        changed: List[int] = []
+        upserts = []
+        for row_id, description, goal, stored_hash, terms in rows:
+            current_hash = text_hash(description, goal)
+            if stored_hash != current_hash or terms is None:
+                terms = tokenize(f"{description or ''}\n{goal or ''}")
+                upserts.append((row_id, current_hash, json.dumps(terms, ensure_ascii=False)))
+                changed.append(len(ids))
+            ids.append(row_id)
+            vectors.append(terms)
+        if full:
+            changed = list(range(len(ids)))
+
+        with span('db.save_text_vectors'):
+            if upserts:
+                execute_values(cur, f"""
+                    INSERT INTO {SCHEMA}.entrepreneur_text_vectors (entrepreneur_id, text_hash, terms)
+                    VALUES %s
+                    ON CONFLICT (entrepreneur_id) DO UPDATE
+                    SET text_hash = EXCLUDED.text_hash, terms = EXCLUDED.terms, updated_at = CURRENT_TIMESTAMP
+                """, upserts, template="(%s, %s, %s::jsonb)", page_size=500)
+
+        edges: Dict[Tuple[int, int], float] = {}
+        if changed:
+            with span('db.save_text_similarity'):
+                if full:
+                    cur.execute(f"DELETE FROM {SCHEMA}.text_similarity_edges")
+                else:
+                    changed_ids = [ids[i] for i in changed]
+                    cur.execute(f"""
+                        DELETE FROM {SCHEMA}.text_similarity_edges
+                        WHERE source_id = ANY(%s) OR target_id = ANY(%s)
+                        RETURNING source_id, target_id
+                    """, (changed_ids, changed_ids))
+                    # Unchanged participants that lost a neighbour get their
+                    # own top-k recomputed, or they would keep the gap
+                    position = {row_id: i for i, row_id in enumerate(ids)}
+                    touched = {row_id for edge in cur.fetchall() for row_id in edge} - set(changed_ids)
+                    changed += sorted(position[row_id] for row_id in touched if row_id in position)
+
+            with span('compute.text_similarity'):
+                edges = top_neighbours(tfidf_matrix(vectors), changed, ids,
+                                       TEXT_SIMILARITY_TOP_K, TEXT_SIMILARITY_MIN)
+
+            with span('db.save_text_similarity'):
+                if edges:
+                    execute_values(cur, f"""
+                        INSERT INTO {SCHEMA}.text_similarity_edges (source_id, target_id, strength)
+                        VALUES %s
+                        ON CONFLICT (source_id, target_id) DO UPDATE SET strength = EXCLUDED.strength
+                    """, [(a, b, s) for (a, b), s in edges.items()], page_size=1000)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        'participants': len(ids),
+        'vectorized': len(upserts),
+        'refreshed': len(changed),
+        'edges': len(edges)
+    }
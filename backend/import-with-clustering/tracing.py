@@ -0,0 +1,138 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+# Kept identical in every function directory: each function is deployed on its own
+
+MAX_LOGGED_SPANS = 100
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('current_trace', default=None)
+
+
+class Trace:
+    """Spans collected during one handler invocation"""
+
+    def __init__(self, function_name: str):
+        self.function_name = function_name
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            record = {
+                'name': name,
+                'start_ms': round((started - self.started) * 1000, 2),
+                'dur_ms': round((time.perf_counter() - started) * 1000, 2),
+            }
+            if error:
+                record['error'] = error
+            with self._lock:
+                self.spans.append(record)
+
+    def totals(self) -> Dict[str, Dict[str, float]]:
+        """Duration and count per span name"""
+        totals: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for record in self.spans:
+                total = totals.setdefault(record['name'], {'dur_ms': 0.0, 'count': 0})
+                total['dur_ms'] += record['dur_ms']
+                total['count'] += 1
+        return totals
+
+    def server_timing(self, total_ms: float) -> str:
+        """Server-Timing header value, one metric per span name"""
+        metrics = []
+        for name, total in self.totals().items():
+            metric = f"{name};dur={total['dur_ms']:.1f}"
+            if total['count'] > 1:
+                metric += f';desc="x{total["count"]}"'
+            metrics.append(metric)
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
+
+    def emit(self, status_code: Optional[int], total_ms: float) -> None:
+        """Print one structured log line for the invocation"""
+        with self._lock:
+            spans = list(self.spans)
+        record = {
+            'trace': self.function_name,
+            'status': status_code,
+            'total_ms': round(total_ms, 2),
+            'totals': {name: {'dur_ms': round(t['dur_ms'], 2), 'count': t['count']}
+                       for name, t in self.totals().items()},
+            'spans': spans[:MAX_LOGGED_SPANS],
+        }
+        if len(spans) > MAX_LOGGED_SPANS:
+            record['spans_dropped'] = len(spans) - MAX_LOGGED_SPANS
+        print(json.dumps(record, ensure_ascii=False))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block inside the current invocation; no-op outside a traced handler"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def bind_context(target: Callable) -> Callable:
+    """Wrap a thread target so its spans land in the current invocation"""
+    context = contextvars.copy_context()
+
+    @wraps(target)
+    def run(*args, **kwargs):
+        return context.run(target, *args, **kwargs)
+
+    return run
+
+
+def expose_header(current: Optional[str], name: str) -> str:
+    """Access-Control-Expose-Headers value with name added to what the handler set"""
+    names = [h.strip() for h in (current or '').split(',') if h.strip()]
+    if name.lower() not in {h.lower() for h in names} and '*' not in names:
+        names.append(name)
+    return ', '.join(names)
+
+
+def traced(function_name: str) -> Callable:
+    """Decorate a cloud function handler with spans, a log line and Server-Timing"""
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            trace = Trace(function_name)
+            token = _current_trace.set(trace)
+            response = None
+            try:
+                response = handler(event, context)
+                return response
+            finally:
+                _current_trace.reset(token)
+                total_ms = (time.perf_counter() - trace.started) * 1000
+                if isinstance(response, dict):
+                    headers = response.get('headers')
+                    if headers is None:
+                        headers = response['headers'] = {}
+                    headers['Server-Timing'] = trace.server_timing(total_ms)
+                    headers['Timing-Allow-Origin'] = '*'
+                    headers['Access-Control-Expose-Headers'] = expose_header(
+                        headers.get('Access-Control-Expose-Headers'), 'Server-Timing'
+                    )
+                trace.emit(response.get('statusCode') if isinstance(response, dict) else None, total_ms)
+        return wrapper
+    return decorator
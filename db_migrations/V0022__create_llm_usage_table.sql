@@ -0,0 +1,23 @@
+-- Accounting of every OpenAI call made by the backend functions
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.llm_usage (
+    id BIGSERIAL PRIMARY KEY,
+    function_name VARCHAR(100) NOT NULL,
+    purpose VARCHAR(100),
+    model VARCHAR(100) NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    latency_ms INTEGER NOT NULL,
+    outcome VARCHAR(30) NOT NULL CHECK (outcome IN ('ok', 'validation_error', 'error', 'budget_exceeded')),
+    cost_usd NUMERIC(12, 6) NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Daily budget check sums cost_usd since midnight
+CREATE INDEX IF NOT EXISTS idx_llm_usage_created_at
+    ON t_p95295728_unicorn_lab_visualiz.llm_usage(created_at);
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.llm_usage IS 'One row per OpenAI request: model, tokens, latency and outcome';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.llm_usage.purpose IS 'What the call was for, e.g. assistant_reply or classify_batch';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.llm_usage.outcome IS 'ok, validation_error (escalated), error or budget_exceeded';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.llm_usage.cost_usd IS 'Estimated from list prices per 1M tokens';
@@ -0,0 +1,60 @@
+-- Monotonic data versions so functions can cache derived data (graphs, taxonomy)
+-- and invalidate it with one cheap lookup instead of rescanning tables
+CREATE SEQUENCE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.data_version_seq;
+
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.data_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p95295728_unicorn_lab_visualiz.data_versions (name, version)
+VALUES
+    ('participants', nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq')),
+    ('taxonomy', nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq'))
+ON CONFLICT (name) DO NOTHING;
+
+-- Bump the version named in TG_ARGV[0] once per statement and notify listeners
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE t_p95295728_unicorn_lab_visualiz.data_versions
+    SET version = nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq'),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE name = TG_ARGV[0]
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('data_versions', TG_ARGV[0] || ':' || new_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_entrepreneurs_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.entrepreneurs
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('participants');
+
+CREATE TRIGGER trg_entrepreneur_tags_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('participants');
+
+CREATE TRIGGER trg_clusters_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.clusters
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('taxonomy');
+
+CREATE TRIGGER trg_tag_categories_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.tag_categories
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('taxonomy');
+
+CREATE TRIGGER trg_tags_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.tags
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('taxonomy');
+
+CREATE TRIGGER trg_tag_connections_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.tag_connections
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('taxonomy');
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.data_versions IS 'Current version of each cached data set, bumped by triggers';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.data_versions.name IS 'participants (entrepreneurs, entrepreneur_tags) or taxonomy (tags, clusters, tag_connections, tag_categories)';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.data_versions.version IS 'Value from data_version_seq, grows on every change';
@@ -0,0 +1,19 @@
+-- Precomputed tag affinity matrix published by tools/jobs/build_tag_affinity.py
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.tag_affinity (
+    id SERIAL PRIMARY KEY,
+    method VARCHAR(50) NOT NULL,
+    tag_count INTEGER NOT NULL,
+    pair_count INTEGER NOT NULL,
+    participant_count INTEGER NOT NULL,
+    payload BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Publishing a new matrix invalidates taxonomy caches in running functions
+CREATE TRIGGER trg_tag_affinity_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.tag_affinity
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('taxonomy');
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.tag_affinity IS 'Published tag affinity matrices; the latest row is used';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.tag_affinity.method IS 'How affinities were computed, e.g. npmi+curated';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.tag_affinity.payload IS 'gzip JSON {"format": 1, "pairs": [[tag1_id, tag2_id, strength], ...]} with tag1_id < tag2_id';
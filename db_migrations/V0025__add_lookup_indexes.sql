@@ -0,0 +1,38 @@
+-- Indexes and constraints for the hot lookups:
+--   entrepreneurs.post_url = ANY(...)  (import: filter_new_participants, save_to_database)
+--   entrepreneurs.telegram_id = %s     (import upsert ON CONFLICT (telegram_id))
+--   clusters.name = %s                 (get-participants cluster filter)
+-- V0003 added post_url without the schema prefix, so its index may not exist here;
+-- every statement is guarded to be safe on databases where it does.
+
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_post_url
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneurs(post_url);
+
+DO $$
+BEGIN
+    -- ON CONFLICT (telegram_id) needs a unique index on exactly that column
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 't_p95295728_unicorn_lab_visualiz.entrepreneurs'::regclass
+          AND i.indisunique AND i.indnatts = 1 AND i.indpred IS NULL
+          AND a.attname = 'telegram_id'
+    ) THEN
+        ALTER TABLE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+            ADD CONSTRAINT entrepreneurs_telegram_id_key UNIQUE (telegram_id);
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 't_p95295728_unicorn_lab_visualiz.clusters'::regclass
+          AND i.indisunique AND i.indnatts = 1 AND i.indpred IS NULL
+          AND a.attname = 'name'
+    ) THEN
+        ALTER TABLE t_p95295728_unicorn_lab_visualiz.clusters
+            ADD CONSTRAINT clusters_name_key UNIQUE (name);
+    END IF;
+END $$;
+
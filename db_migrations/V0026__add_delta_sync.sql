@@ -0,0 +1,143 @@
+-- Delta sync for get-participants?since=<version>
+--
+-- Versions here are transaction ids (txid_current()). A client token is the
+-- xmin of the snapshot it was served from, so every row written by a
+-- transaction that was still running at that time has a version >= token and
+-- shows up in the next delta.
+
+-- Participant rows carry the txid of their last change (own columns or tags)
+ALTER TABLE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+ADD COLUMN IF NOT EXISTS row_version BIGINT;
+
+UPDATE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+SET row_version = txid_current()
+WHERE row_version IS NULL;
+
+ALTER TABLE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+ALTER COLUMN row_version SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_row_version
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneurs(row_version);
+
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_row_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.row_version := txid_current();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_entrepreneurs_row_version
+    BEFORE INSERT OR UPDATE ON t_p95295728_unicorn_lab_visualiz.entrepreneurs
+    FOR EACH ROW EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_row_version();
+
+-- Tag changes touch the participant once per transaction
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneur_from_tags()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_id INTEGER;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed_id := OLD.entrepreneur_id;
+    ELSE
+        changed_id := NEW.entrepreneur_id;
+    END IF;
+
+    UPDATE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+    SET row_version = txid_current()
+    WHERE id = changed_id AND row_version <> txid_current();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_entrepreneur_tags_touch
+    AFTER INSERT OR UPDATE OR DELETE ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags
+    FOR EACH ROW EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneur_from_tags();
+
+-- Deleted participants
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.entrepreneur_tombstones (
+    entrepreneur_id INTEGER PRIMARY KEY,
+    deleted_version BIGINT NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_entrepreneur_tombstones_version
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tombstones(deleted_version);
+
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.record_entrepreneur_tombstone()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO t_p95295728_unicorn_lab_visualiz.entrepreneur_tombstones (entrepreneur_id, deleted_version)
+    VALUES (OLD.id, txid_current())
+    ON CONFLICT (entrepreneur_id) DO UPDATE
+    SET deleted_version = EXCLUDED.deleted_version, deleted_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_entrepreneurs_tombstone
+    AFTER DELETE ON t_p95295728_unicorn_lab_visualiz.entrepreneurs
+    FOR EACH ROW EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.record_entrepreneur_tombstone();
+
+-- Materialized participant edges, versioned so removals can be sent as deltas
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.graph_edges (
+    id BIGSERIAL PRIMARY KEY,
+    source_id INTEGER NOT NULL,
+    target_id INTEGER NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    strength REAL NOT NULL,
+    added_version BIGINT NOT NULL,
+    removed_version BIGINT,
+    removed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_graph_edges_active
+    ON t_p95295728_unicorn_lab_visualiz.graph_edges(source_id, target_id, type)
+    WHERE removed_version IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_graph_edges_added
+    ON t_p95295728_unicorn_lab_visualiz.graph_edges(added_version)
+    WHERE removed_version IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_graph_edges_removed
+    ON t_p95295728_unicorn_lab_visualiz.graph_edges(removed_version)
+    WHERE removed_version IS NOT NULL;
+
+-- Which participants/taxonomy versions graph_edges reflects, and the oldest
+-- token still answerable after old removals were pruned
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.graph_edge_state (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    source_key VARCHAR(100),
+    pruned_version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p95295728_unicorn_lab_visualiz.graph_edge_state (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+-- Taxonomy changes rename tags inside participants: clients older than the
+-- last change need a full sync, so remember its txid too
+ALTER TABLE t_p95295728_unicorn_lab_visualiz.data_versions
+ADD COLUMN IF NOT EXISTS changed_txid BIGINT NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE t_p95295728_unicorn_lab_visualiz.data_versions
+    SET version = nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq'),
+        changed_txid = txid_current(),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE name = TG_ARGV[0]
+    RETURNING version INTO new_version;
+
+    PERFORM pg_notify('data_versions', TG_ARGV[0] || ':' || new_version);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.entrepreneurs.row_version IS 'txid of the last change to the row or its tags';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.entrepreneur_tombstones IS 'Deleted participants for delta sync';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.graph_edges IS 'Materialized participant connections with add/remove txids for delta sync';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.graph_edge_state IS 'Data versions graph_edges was built from';
@@ -0,0 +1,17 @@
+-- Progress of resumable backfill jobs (tools/jobs/reanalyze.py)
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.job_checkpoints (
+    job_name VARCHAR(100) PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    processed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Keyset scan over the rows still flagged by V0007
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_needs_reanalysis
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneurs(id)
+    WHERE needs_reanalysis;
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.job_checkpoints IS 'Last committed id and counters per backfill job';
@@ -0,0 +1,14 @@
+-- Precomputed full get-participants response per data version, so cold
+-- containers answer with one primary-key fetch instead of recomputing
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.graph_snapshots (
+    version VARCHAR(100) PRIMARY KEY,
+    participant_count INTEGER NOT NULL,
+    connection_count INTEGER NOT NULL,
+    payload BYTEA NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_graph_snapshots_created_at
+    ON t_p95295728_unicorn_lab_visualiz.graph_snapshots(created_at);
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.graph_snapshots IS 'gzip JSON of the unfiltered get-participants response, keyed by participants.taxonomy data versions';
@@ -0,0 +1,97 @@
+-- Monthly range partitions for telegram_messages
+--
+-- History reads only look at recent months and old months are archived and
+-- dropped whole by tools/jobs/telegram_retention.py, so neither inserts nor
+-- history queries slow down as the bot accumulates messages.
+--
+-- A unique (chat_id, message_id) constraint would have to include created_at
+-- on a partitioned table, which makes it useless; Telegram webhook retries
+-- are deduplicated on insert against a recent window instead.
+
+ALTER TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages
+    RENAME TO telegram_messages_unpartitioned;
+
+CREATE TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages (
+    id BIGSERIAL,
+    chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    user_id BIGINT,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX idx_telegram_messages_chat_history
+    ON t_p95295728_unicorn_lab_visualiz.telegram_messages(chat_id, created_at DESC, id DESC);
+
+CREATE INDEX idx_telegram_messages_chat_message
+    ON t_p95295728_unicorn_lab_visualiz.telegram_messages(chat_id, message_id);
+
+-- Rows outside every monthly partition land here until their month is created
+CREATE TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages_default
+    PARTITION OF t_p95295728_unicorn_lab_visualiz.telegram_messages DEFAULT;
+
+-- Create monthly partitions telegram_messages_yYYYYmMM from the month of
+-- from_date through months_ahead months after the current one. Rows already
+-- sitting in the default partition for a new month are moved into it.
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.ensure_telegram_message_partitions(
+    from_date DATE DEFAULT CURRENT_DATE,
+    months_ahead INTEGER DEFAULT 2
+) RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', from_date)::date;
+    last_month DATE := (date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead))::date;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        partition_name := 'telegram_messages_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+        IF to_regclass('t_p95295728_unicorn_lab_visualiz.' || partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE t_p95295728_unicorn_lab_visualiz.%I
+                     (LIKE t_p95295728_unicorn_lab_visualiz.telegram_messages INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                partition_name);
+            EXECUTE format(
+                'WITH moved AS (
+                     DELETE FROM t_p95295728_unicorn_lab_visualiz.telegram_messages_default
+                     WHERE created_at >= %L AND created_at < %L
+                     RETURNING *
+                 )
+                 INSERT INTO t_p95295728_unicorn_lab_visualiz.%I SELECT * FROM moved',
+                month_start, (month_start + INTERVAL '1 month')::date, partition_name);
+            EXECUTE format(
+                'ALTER TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages
+                     ATTACH PARTITION t_p95295728_unicorn_lab_visualiz.%I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, (month_start + INTERVAL '1 month')::date);
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT t_p95295728_unicorn_lab_visualiz.ensure_telegram_message_partitions(
+    LEAST(
+        COALESCE((SELECT MIN(created_at)::date FROM t_p95295728_unicorn_lab_visualiz.telegram_messages_unpartitioned), CURRENT_DATE),
+        (CURRENT_DATE - INTERVAL '1 month')::date
+    ),
+    2
+);
+
+INSERT INTO t_p95295728_unicorn_lab_visualiz.telegram_messages
+    (id, chat_id, message_id, user_id, role, content, created_at)
+SELECT id, chat_id, message_id, user_id, role, content, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM t_p95295728_unicorn_lab_visualiz.telegram_messages_unpartitioned;
+
+SELECT setval(
+    pg_get_serial_sequence('t_p95295728_unicorn_lab_visualiz.telegram_messages', 'id'),
+    COALESCE((SELECT MAX(id) FROM t_p95295728_unicorn_lab_visualiz.telegram_messages), 0) + 1,
+    false
+);
+
+DROP TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages_unpartitioned;
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages IS 'Telegram bot conversation history, partitioned by month of created_at';
+COMMENT ON FUNCTION t_p95295728_unicorn_lab_visualiz.ensure_telegram_message_partitions(DATE, INTEGER) IS 'Create missing monthly telegram_messages partitions; run by tools/jobs/telegram_retention.py';
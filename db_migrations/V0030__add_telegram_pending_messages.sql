@@ -0,0 +1,12 @@
+-- User messages waiting for a reply. A webhook stores its message unanswered,
+-- takes the per-chat advisory lock and answers every pending message of the
+-- chat in one LLM turn, so quick successive messages are merged instead of
+-- racing each other. Existing rows count as answered.
+ALTER TABLE t_p95295728_unicorn_lab_visualiz.telegram_messages
+ADD COLUMN IF NOT EXISTS answered BOOLEAN NOT NULL DEFAULT TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_telegram_messages_pending
+    ON t_p95295728_unicorn_lab_visualiz.telegram_messages(chat_id, created_at)
+    WHERE NOT answered;
+
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.telegram_messages.answered IS 'False for user messages no reply has covered yet';
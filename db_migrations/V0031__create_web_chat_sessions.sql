@@ -0,0 +1,24 @@
+-- Server-side web chat history: the site sends a session id and the new
+-- message instead of re-uploading the whole conversation every turn
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.web_chat_sessions (
+    id VARCHAR(64) PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    last_active_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.web_chat_messages (
+    id BIGSERIAL PRIMARY KEY,
+    session_id VARCHAR(64) NOT NULL REFERENCES t_p95295728_unicorn_lab_visualiz.web_chat_sessions(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_web_chat_messages_session
+    ON t_p95295728_unicorn_lab_visualiz.web_chat_messages(session_id, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_web_chat_sessions_last_active
+    ON t_p95295728_unicorn_lab_visualiz.web_chat_sessions(last_active_at);
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.web_chat_sessions IS 'Web chat conversations, keyed by a client-generated id';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.web_chat_messages IS 'Web chat history per session';
@@ -0,0 +1,35 @@
+-- Text-similarity edges between participants (TF-IDF over description + goal)
+--
+-- import-with-clustering keeps one term-count vector per participant and,
+-- after each import, recomputes the nearest neighbours of the participants
+-- whose text changed. get-participants only reads the finished edges.
+
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.entrepreneur_text_vectors (
+    entrepreneur_id INTEGER PRIMARY KEY
+        REFERENCES t_p95295728_unicorn_lab_visualiz.entrepreneurs(id) ON DELETE CASCADE,
+    text_hash CHAR(40) NOT NULL,
+    terms JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.text_similarity_edges (
+    source_id INTEGER NOT NULL
+        REFERENCES t_p95295728_unicorn_lab_visualiz.entrepreneurs(id) ON DELETE CASCADE,
+    target_id INTEGER NOT NULL
+        REFERENCES t_p95295728_unicorn_lab_visualiz.entrepreneurs(id) ON DELETE CASCADE,
+    strength REAL NOT NULL,
+    PRIMARY KEY (source_id, target_id),
+    CHECK (source_id < target_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_text_similarity_edges_target
+    ON t_p95295728_unicorn_lab_visualiz.text_similarity_edges(target_id);
+
+-- New similarity edges change the participant graph
+CREATE TRIGGER trg_text_similarity_edges_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.text_similarity_edges
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('participants');
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.entrepreneur_text_vectors IS 'Term counts of description + goal per participant, refreshed when the text hash changes';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.entrepreneur_text_vectors.terms IS 'JSON object {term: count} after tokenization and stemming';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.text_similarity_edges IS 'Top-k TF-IDF cosine neighbours, source_id < target_id; served as similar_goals connections';
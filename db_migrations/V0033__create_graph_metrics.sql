@@ -0,0 +1,53 @@
+-- Precomputed participant graph analytics (communities and centrality)
+--
+-- get-participants refreshes these once per participants/taxonomy version,
+-- when it first computes the connection graph, and serves them as
+-- participant fields. Ranking queries ("key connectors") read the indexes
+-- below instead of computing anything.
+--
+-- Metric writes deliberately do not bump data_versions: they are derived
+-- from the participants/taxonomy version they were computed for.
+-- metrics_version (a txid, like entrepreneurs.row_version) lets delta sync
+-- send participants whose metrics changed.
+
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics (
+    entrepreneur_id INTEGER PRIMARY KEY
+        REFERENCES t_p95295728_unicorn_lab_visualiz.entrepreneurs(id) ON DELETE CASCADE,
+    community INTEGER,
+    community_size INTEGER NOT NULL DEFAULT 1,
+    degree INTEGER NOT NULL DEFAULT 0,
+    weighted_degree REAL NOT NULL DEFAULT 0,
+    betweenness REAL NOT NULL DEFAULT 0,
+    metrics_version BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_graph_metrics_weighted_degree
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics(weighted_degree DESC);
+
+CREATE INDEX IF NOT EXISTS idx_graph_metrics_betweenness
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics(betweenness DESC);
+
+CREATE INDEX IF NOT EXISTS idx_graph_metrics_community
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics(community, weighted_degree DESC);
+
+CREATE INDEX IF NOT EXISTS idx_graph_metrics_version
+    ON t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics(metrics_version);
+
+-- Which participants/taxonomy versions the metrics reflect
+CREATE TABLE IF NOT EXISTS t_p95295728_unicorn_lab_visualiz.graph_metrics_state (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    source_key VARCHAR(100),
+    method VARCHAR(50),
+    communities INTEGER NOT NULL DEFAULT 0,
+    modularity REAL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO t_p95295728_unicorn_lab_visualiz.graph_metrics_state (id) VALUES (1)
+ON CONFLICT (id) DO NOTHING;
+
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics IS 'Louvain community and centrality per participant over the served connection graph';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics.betweenness IS 'Approximate (sampled) normalized betweenness with 1/strength as distance';
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics.metrics_version IS 'txid of the last change to the row, for delta sync';
+COMMENT ON TABLE t_p95295728_unicorn_lab_visualiz.graph_metrics_state IS 'Data versions and summary of the last graph metrics refresh';
@@ -0,0 +1,79 @@
+-- Fewer trigger round trips for tag writes
+--
+-- V0026 touched the participant from a row-level trigger on entrepreneur_tags.
+-- Each of those UPDATEs fired the statement-level data version trigger on
+-- entrepreneurs, so an import of 50 participants with ~10 tags each bumped
+-- data_versions and sent a notification ~500 times, all queued on the single
+-- data_versions row.
+--
+-- Tag changes now touch the affected participants with one UPDATE per
+-- statement, read from the transition tables, and only when a participant is
+-- not already at the current txid. bump_data_version bumps each name at most
+-- once per transaction: readers only see the new version after commit, so
+-- later bumps in the same transaction add nothing.
+
+DROP TRIGGER IF EXISTS trg_entrepreneur_tags_touch ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags;
+
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneurs_from_tags()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed_ids INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT entrepreneur_id) INTO changed_ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT entrepreneur_id) INTO changed_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT entrepreneur_id) INTO changed_ids
+        FROM (SELECT entrepreneur_id FROM new_rows UNION SELECT entrepreneur_id FROM old_rows) AS changed;
+    END IF;
+
+    -- Participants upserted earlier in the transaction already carry its txid
+    IF EXISTS (
+        SELECT 1 FROM t_p95295728_unicorn_lab_visualiz.entrepreneurs
+        WHERE id = ANY(changed_ids) AND row_version <> txid_current()
+    ) THEN
+        UPDATE t_p95295728_unicorn_lab_visualiz.entrepreneurs
+        SET row_version = txid_current()
+        WHERE id = ANY(changed_ids) AND row_version <> txid_current();
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A trigger with transition tables may only fire on one event
+CREATE TRIGGER trg_entrepreneur_tags_touch_insert
+    AFTER INSERT ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneurs_from_tags();
+
+CREATE TRIGGER trg_entrepreneur_tags_touch_update
+    AFTER UPDATE ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneurs_from_tags();
+
+CREATE TRIGGER trg_entrepreneur_tags_touch_delete
+    AFTER DELETE ON t_p95295728_unicorn_lab_visualiz.entrepreneur_tags
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.touch_entrepreneurs_from_tags();
+
+DROP FUNCTION IF EXISTS t_p95295728_unicorn_lab_visualiz.touch_entrepreneur_from_tags();
+
+CREATE OR REPLACE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE t_p95295728_unicorn_lab_visualiz.data_versions
+    SET version = nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq'),
+        changed_txid = txid_current(),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE name = TG_ARGV[0] AND changed_txid <> txid_current()
+    RETURNING version INTO new_version;
+
+    IF new_version IS NOT NULL THEN
+        PERFORM pg_notify('data_versions', TG_ARGV[0] || ':' || new_version);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,20 @@
+-- Graph metrics are computed by tools/jobs/graph_metrics.py, off the request
+-- path, some time after the participants/taxonomy version they describe. The
+-- cached get-participants payload therefore needs its own version to notice
+-- changed metrics. A refresh that rewrites no rows leaves it alone, and
+-- bump_data_version bumps it at most once per transaction (V0034).
+--
+-- This supersedes the header of V0033: get-participants no longer refreshes
+-- entrepreneur_graph_metrics (it only reads the table), and metric writes now
+-- bump the 'graph_metrics' data version. metrics_version still drives delta
+-- sync as described there.
+
+INSERT INTO t_p95295728_unicorn_lab_visualiz.data_versions (name, version)
+VALUES ('graph_metrics', nextval('t_p95295728_unicorn_lab_visualiz.data_version_seq'))
+ON CONFLICT (name) DO NOTHING;
+
+CREATE TRIGGER trg_graph_metrics_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON t_p95295728_unicorn_lab_visualiz.entrepreneur_graph_metrics
+    FOR EACH STATEMENT EXECUTE FUNCTION t_p95295728_unicorn_lab_visualiz.bump_data_version('graph_metrics');
+
+COMMENT ON COLUMN t_p95295728_unicorn_lab_visualiz.data_versions.name IS 'participants (entrepreneurs, entrepreneur_tags), taxonomy (tags, clusters, tag_connections, tag_categories) or graph_metrics (entrepreneur_graph_metrics)';
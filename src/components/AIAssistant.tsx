@@ -39,6 +39,22 @@ const loadingTexts = [
   "Формирую ответ...",
 ];
 
+const SESSION_KEY = "ai-assistant-session";
+
+// История диалога хранится на сервере под этим id; отправляем только новое сообщение
+const newSessionId = () =>
+  typeof crypto !== "undefined" && "randomUUID" in crypto
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
+const loadSessionId = () => {
+  const saved = localStorage.getItem(SESSION_KEY);
+  if (saved) return saved;
+  const created = newSessionId();
+  localStorage.setItem(SESSION_KEY, created);
+  return created;
+};
+
 const AIAssistant: React.FC<AIAssistantProps> = ({
   entrepreneurs,
   onSelectUsers,
@@ -52,6 +68,7 @@ const AIAssistant: React.FC<AIAssistantProps> = ({
   const [isLoading, setIsLoading] = useState(false);
   const [showDeleteDialog, setShowDeleteDialog] = useState(false);
   const [loadingTextIndex, setLoadingTextIndex] = useState(0);
+  const [sessionId, setSessionId] = useState(loadSessionId);
   const scrollRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLTextAreaElement>(null);
 
@@ -172,11 +189,19 @@ const AIAssistant: React.FC<AIAssistantProps> = ({
             "Content-Type": "application/json",
           },
           body: JSON.stringify({
-            messages: newMessages.slice(-20), // Send last 20 messages
+            session_id: sessionId,
+            message: userMessage,
           }),
         },
       );
 
+      // 503: сервер отклонил запрос из-за перегрузки LLM, можно повторить позже
+      if (response.status === 503) {
+        const busy = await response.json().catch(() => null);
+        toast.error(busy?.completion_text || "Сейчас слишком много запросов");
+        return;
+      }
+
       if (!response.ok) {
         throw new Error("Failed to get response from AI");
       }
@@ -368,6 +393,10 @@ const AIAssistant: React.FC<AIAssistantProps> = ({
               onClick={() => {
                 setMessages([]);
                 localStorage.removeItem("ai-assistant-messages");
+                // Новая сессия: старая история на сервере больше не подмешивается
+                const nextSessionId = newSessionId();
+                localStorage.setItem(SESSION_KEY, nextSessionId);
+                setSessionId(nextSessionId);
                 toast.success("История очищена");
                 setShowDeleteDialog(false);
               }}
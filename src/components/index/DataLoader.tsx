@@ -1,5 +1,5 @@
 import { useEffect } from 'react';
-import { ApiService } from '@/services/api';
+import { ApiService, ParticipantsResponse, ParticipantsDeltaResponse } from '@/services/api';
 import { TagsService, TagsConfig } from '@/services/tagsService';
 import { Entrepreneur, GraphEdge } from '@/types/entrepreneur';
 
@@ -14,6 +14,102 @@ interface DataLoaderProps {
   selectedTags: string[];
 }
 
+type Participant = ParticipantsResponse['participants'][number];
+type Connection = ParticipantsResponse['connections'][number];
+
+interface SyncState {
+  // null: сервер не выдал токен, синхронизировать нечем
+  version: number | null;
+  participants: Map<number, Participant>;
+  connections: Map<string, Connection>;
+}
+
+const CACHE_KEY = 'participants-cache';
+const SYNC_INTERVAL_MS = 60_000;
+
+const connectionKey = (c: { source: number; target: number; type: string }) =>
+  `${Math.min(c.source, c.target)}:${Math.max(c.source, c.target)}:${c.type}`;
+
+const fromFull = (data: ParticipantsResponse | ParticipantsDeltaResponse): SyncState => ({
+  version: data.version ?? null,
+  participants: new Map(data.participants.map(p => [p.id, p])),
+  connections: new Map(data.connections.map(c => [connectionKey(c), c]))
+});
+
+// Удаления применяем до добавлений: участник мог быть удалён и создан заново
+const applyDelta = (state: SyncState, delta: ParticipantsDeltaResponse): boolean => {
+  let changed = false;
+
+  const deleted = new Set(delta.deleted || []);
+  deleted.forEach(id => {
+    if (state.participants.delete(id)) changed = true;
+  });
+  if (deleted.size > 0) {
+    state.connections.forEach((c, key) => {
+      if (deleted.has(c.source) || deleted.has(c.target)) {
+        state.connections.delete(key);
+        changed = true;
+      }
+    });
+  }
+
+  (delta.removed_connections || []).forEach(c => {
+    if (state.connections.delete(connectionKey(c))) changed = true;
+  });
+
+  delta.participants.forEach(p => {
+    state.participants.set(p.id, p);
+    changed = true;
+  });
+  delta.connections.forEach(c => {
+    state.connections.set(connectionKey(c), c);
+    changed = true;
+  });
+
+  state.version = delta.version;
+  return changed;
+};
+
+const loadCache = (): SyncState | null => {
+  try {
+    const raw = localStorage.getItem(CACHE_KEY);
+    if (!raw) return null;
+    const cached = JSON.parse(raw);
+    return {
+      version: cached.version,
+      participants: new Map(cached.participants.map((p: Participant) => [p.id, p])),
+      connections: new Map(cached.connections.map((c: Connection) => [connectionKey(c), c]))
+    };
+  } catch (error) {
+    console.warn('Ignoring participants cache:', error);
+    return null;
+  }
+};
+
+const saveCache = (state: SyncState) => {
+  if (state.version === null) return;
+  try {
+    localStorage.setItem(CACHE_KEY, JSON.stringify({
+      version: state.version,
+      participants: Array.from(state.participants.values()),
+      connections: Array.from(state.connections.values())
+    }));
+  } catch (error) {
+    // Переполненное или недоступное хранилище — просто работаем без кэша
+    console.warn('Failed to save participants cache:', error);
+  }
+};
+
+const toResponse = (state: SyncState): ParticipantsResponse => {
+  const participants = Array.from(state.participants.values())
+    .sort((a, b) => (a.name || '').localeCompare(b.name || ''));
+  return {
+    participants,
+    connections: Array.from(state.connections.values()),
+    total: participants.length
+  };
+};
+
 export const useDataLoader = ({
   onDataLoaded,
   onLoadingChange,
@@ -21,28 +117,77 @@ export const useDataLoader = ({
   selectedTags
 }: DataLoaderProps) => {
   useEffect(() => {
+    let state: SyncState | null = null;
+    let tagsConfig: TagsConfig | null = null;
+    let syncing = false;
+    let cancelled = false;
+
+    const publish = () => {
+      if (!state || !tagsConfig || cancelled) return;
+      const { entrepreneurs: loadedEntrepreneurs, edges: loadedEdges } = ApiService.transformToEntrepreneurs(toResponse(state));
+
+      const validatedEntrepreneurs = loadedEntrepreneurs.map(entrepreneur => ({
+        ...entrepreneur,
+        tags: Array.isArray(entrepreneur.tags) ? entrepreneur.tags : [],
+        cluster: entrepreneur.cluster || 'Без кластера'
+      }));
+
+      onDataLoaded({
+        entrepreneurs: validatedEntrepreneurs,
+        edges: loadedEdges,
+        tagsConfig
+      });
+    };
+
+    const loadFull = async () => {
+      const [tagsConfigData, participantsData] = await Promise.all([
+        TagsService.getTagsConfig(),
+        ApiService.getParticipants()
+      ]);
+      tagsConfig = tagsConfigData;
+      state = fromFull(participantsData);
+      saveCache(state);
+      publish();
+    };
+
+    const sync = async () => {
+      if (!state || state.version === null || syncing || cancelled) return;
+      syncing = true;
+      try {
+        const delta = await ApiService.getParticipantsDelta(state.version);
+        if (delta.full) {
+          // Полный ответ приходит после смены таксономии — конфиг тегов тоже мог измениться
+          tagsConfig = await TagsService.getTagsConfig();
+          state = fromFull(delta);
+          saveCache(state);
+          publish();
+        } else {
+          const changed = applyDelta(state, delta);
+          // Токен сдвигается даже без изменений
+          saveCache(state);
+          if (changed) publish();
+        }
+      } catch (error) {
+        console.error('Failed to sync participants:', error);
+      } finally {
+        syncing = false;
+      }
+    };
+
     const loadData = async () => {
       try {
         onLoadingChange(true);
-        
-        const [tagsConfigData, participantsData] = await Promise.all([
-          TagsService.getTagsConfig(),
-          ApiService.getParticipants()
-        ]);
-        
-        const { entrepreneurs: loadedEntrepreneurs, edges: loadedEdges } = ApiService.transformToEntrepreneurs(participantsData);
-        
-        const validatedEntrepreneurs = loadedEntrepreneurs.map(entrepreneur => ({
-          ...entrepreneur,
-          tags: Array.isArray(entrepreneur.tags) ? entrepreneur.tags : [],
-          cluster: entrepreneur.cluster || 'Без кластера'
-        }));
-        
-        onDataLoaded({
-          entrepreneurs: validatedEntrepreneurs,
-          edges: loadedEdges,
-          tagsConfig: tagsConfigData
-        });
+
+        const cached = loadCache();
+        if (cached) {
+          state = cached;
+          tagsConfig = await TagsService.getTagsConfig();
+          publish();
+          onLoadingChange(false);
+          await sync();
+        } else {
+          await loadFull();
+        }
       } catch (error) {
         console.error('Failed to load data:', error);
       } finally {
@@ -50,6 +195,20 @@ export const useDataLoader = ({
       }
     };
 
+    const onVisibilityChange = () => {
+      if (document.visibilityState === 'visible') sync();
+    };
+
     loadData();
+    const interval = window.setInterval(() => {
+      if (document.visibilityState === 'visible') sync();
+    }, SYNC_INTERVAL_MS);
+    document.addEventListener('visibilitychange', onVisibilityChange);
+
+    return () => {
+      cancelled = true;
+      window.clearInterval(interval);
+      document.removeEventListener('visibilitychange', onVisibilityChange);
+    };
   }, []);
-};
\ No newline at end of file
+};
@@ -17,11 +17,17 @@ export interface ParticipantsResponse {
     cluster: string;
     description: string;
     tags: string[];
+    tag_ids?: number[];
     post_url: string | null;
     goal: string | null;
     emoji: string | null;
     created_at: string;
     updated_at: string;
+    // Сообщество (Louvain) и центральность в графе связей; null, пока не посчитаны
+    community?: number | null;
+    community_size?: number | null;
+    weighted_degree?: number | null;
+    betweenness?: number | null;
   }>;
   connections: Array<{
     source: number;
@@ -30,6 +36,71 @@ export interface ParticipantsResponse {
     strength: number;
   }>;
   total: number;
+  // Токен для следующего getParticipantsDelta; null для отфильтрованных списков
+  version?: number | null;
+  full?: boolean;
+}
+
+export interface FacetFilters {
+  search?: string;
+  tags?: string[];
+  tagMode?: "OR" | "AND";
+  clusters?: string[];
+}
+
+export interface FacetedParticipantsResponse extends ParticipantsResponse {
+  // Сколько участников дадут значения фильтров при текущем выборе
+  facets: {
+    tags: Record<string, number>;
+    clusters: Record<string, number>;
+  };
+}
+
+export type RankMetric = "weighted_degree" | "betweenness";
+
+export interface RankedParticipantsResponse {
+  participants: ParticipantsResponse["participants"];
+  total: number;
+  rank: RankMetric;
+}
+
+export interface ParticipantsDeltaResponse {
+  participants: ParticipantsResponse["participants"];
+  // id удалённых участников
+  deleted?: number[];
+  // Добавленные или изменённые связи
+  connections: ParticipantsResponse["connections"];
+  removed_connections?: Array<{
+    source: number;
+    target: number;
+    type: string;
+  }>;
+  version: number;
+  // true: сервер не смог ответить дельтой и прислал полный список
+  full: boolean;
+  total?: number;
+}
+
+export interface ClusterGraphResponse {
+  clusters: Array<{
+    id: number | null;
+    name: string;
+    color: string | null;
+    count: number;
+    top_tags: Array<{
+      name: string;
+      count: number;
+    }>;
+    internal_connections: number;
+  }>;
+  edges: Array<{
+    source: number | null;
+    target: number | null;
+    weight: number;
+    connections: number;
+  }>;
+  total: number;
+  version: string | null;
 }
 
 export interface ImportResponse {
@@ -58,6 +129,63 @@ export class ApiService {
     return response.json();
   }
 
+  // Фильтрация по тегам и кластерам на сервере, вместе со счётчиками фасетов
+  static async getFacetedParticipants(
+    filters: FacetFilters = {},
+  ): Promise<FacetedParticipantsResponse> {
+    const params = new URLSearchParams({
+      facets: "1",
+      tag_mode: (filters.tagMode || "OR").toLowerCase(),
+    });
+    if (filters.search) params.append("search", filters.search);
+    if (filters.tags?.length) params.append("tags", filters.tags.join(","));
+    const clusters = (filters.clusters || []).filter((c) => c !== "Все");
+    if (clusters.length) params.append("clusters", clusters.join(","));
+
+    const response = await fetch(`${API_URLS.getParticipants}?${params}`);
+    if (!response.ok) throw new Error("Failed to fetch faceted participants");
+
+    return response.json();
+  }
+
+  // Ключевые связующие участники: по сумме весов связей или по посредничеству
+  static async getTopConnectors(
+    rank: RankMetric = "betweenness",
+    limit = 20,
+    community?: number,
+  ): Promise<RankedParticipantsResponse> {
+    const params = new URLSearchParams({ rank, limit: limit.toString() });
+    if (community !== undefined) params.append("community", community.toString());
+
+    const response = await fetch(`${API_URLS.getParticipants}?${params}`);
+    if (!response.ok) throw new Error("Failed to fetch top connectors");
+
+    return response.json();
+  }
+
+  // Только изменения после токена version из предыдущего ответа
+  static async getParticipantsDelta(
+    since: number,
+  ): Promise<ParticipantsDeltaResponse> {
+    const params = new URLSearchParams({ since: since.toString() });
+
+    const response = await fetch(`${API_URLS.getParticipants}?${params}`);
+    if (!response.ok) throw new Error("Failed to fetch participants delta");
+
+    return response.json();
+  }
+
+  // Одна вершина на кластер для обзорного масштаба; участников кластера
+  // загружаем через getParticipants(undefined, cluster) при раскрытии
+  static async getClusterGraph(): Promise<ClusterGraphResponse> {
+    const params = new URLSearchParams({ view: "clusters" });
+
+    const response = await fetch(`${API_URLS.getParticipants}?${params}`);
+    if (!response.ok) throw new Error("Failed to fetch cluster graph");
+
+    return response.json();
+  }
+
   static async importParticipants(
     participants: any[],
   ): Promise<ImportResponse> {
@@ -0,0 +1,90 @@
+"""Run the backend hot-path benchmarks.
+
+    BENCH_DATABASE_URL=postgresql://localhost/unicorn_bench \
+        python -m tools.bench --sizes 100,1000,5000 --save bench_baseline.json
+
+    python -m tools.bench --sizes 100,1000,5000 --compare bench_baseline.json
+
+The benchmark database is dropped and re-seeded for every size, so
+BENCH_DATABASE_URL must point at a disposable local database.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+from tools.bench.runner import measure, save_baseline, compare_to_baseline
+from tools.bench.synthetic import SIZES, generate_dataset, seed_database
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backend hot-path benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES[:3]),
+                        help="comma-separated participant counts (100..50000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--only", default="", help="comma-separated benchmark names")
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="fail on regressions against this baseline file")
+    parser.add_argument("--max-slowdown", type=float, default=1.2)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("BENCH_DATABASE_URL")
+    if not database_url:
+        print("BENCH_DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    if database_url == os.environ.get("DATABASE_URL") and not os.environ.get("BENCH_ALLOW_DATABASE_URL"):
+        print("Refusing to re-seed DATABASE_URL; use a disposable database", file=sys.stderr)
+        return 2
+    # Handlers connect through DATABASE_URL
+    os.environ["DATABASE_URL"] = database_url
+
+    import psycopg2
+    from tools.bench.hot_paths import build_benchmarks
+
+    only = {name for name in args.only.split(",") if name}
+    results = {}
+
+    for size in (int(s) for s in args.sizes.split(",") if s):
+        dataset = generate_dataset(size, seed=args.seed)
+        conn = psycopg2.connect(database_url)
+        try:
+            seed_database(conn, dataset)
+        finally:
+            conn.close()
+
+        size_key = f"participants={size}"
+        results[size_key] = {}
+        for name, (func, setup) in build_benchmarks(dataset, seed=args.seed).items():
+            if only and name not in only:
+                continue
+            stats = measure(func, rounds=args.rounds, setup=setup)
+            results[size_key][name] = stats
+            print(f"{size_key:>20} {name:<32} median={stats['median_ms']:>10.2f}ms "
+                  f"p95={stats['p95_ms']:>10.2f}ms peak={stats['peak_kb']:>10.1f}KB")
+
+    meta = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "seed": args.seed,
+        "rounds": args.rounds,
+    }
+    if args.save:
+        save_baseline(args.save, results, meta)
+        print(f"Baseline saved to {args.save}")
+
+    if args.compare:
+        regressions = compare_to_baseline(args.compare, results, max_slowdown=args.max_slowdown)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(json.dumps({"regressions": 0}))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
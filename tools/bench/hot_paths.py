@@ -0,0 +1,137 @@
+"""Benchmarks for the backend hot paths against a seeded local Postgres."""
+import itertools
+import json
+import os
+import random
+import re
+from typing import Callable, Dict, Any, List, Tuple
+
+from tools.bench.synthetic import tag_names_by_entrepreneur, tag_connections_by_name
+from tools.functions import load_function
+
+IMPORT_BATCH_SIZE = 50
+TELEGRAM_MENTIONS = 10
+PAIR_SAMPLE = 20000
+LONG_LINE_MENTIONS = 200
+
+# What is left of a chunk after removing whole [name](url) links must not open one
+_LINK = re.compile(r"(?<!\\)\[[^\]\n]*\]\([^)\n]*\)")
+_OPEN_LINK = re.compile(r"(?<!\\)\[")
+
+
+def build_benchmarks(dataset: Dict[str, List[Dict[str, Any]]], seed: int = 42) -> Dict[str, Tuple[Callable, Callable]]:
+    """name -> (func, setup) for one seeded dataset"""
+    participants = load_function("get-participants")
+    importer = load_function("import-with-clustering")
+    assistant = load_function("ai-assistant", "shared_logic")
+    telegram_format = load_function("ai-assistant", "telegram_format")
+
+    rng = random.Random(seed)
+    tags_by_id = tag_names_by_entrepreneur(dataset)
+    tag_connections = tag_connections_by_name(dataset)
+    tag_lists = list(tags_by_id.values())
+    pairs = [(rng.choice(tag_lists), rng.choice(tag_lists)) for _ in range(PAIR_SAMPLE)]
+
+    entrepreneurs = [
+        {
+            "id": e["id"],
+            "name": e["name"],
+            "description": e["description"],
+            "goal": e["goal"],
+            "post_url": e["post_url"],
+            "updated_at": e["updated_at"].isoformat(),
+        }
+        for e in dataset["entrepreneurs"]
+    ]
+    mentioned = rng.sample(entrepreneurs, min(TELEGRAM_MENTIONS, len(entrepreneurs)))
+    completion_text = "Нашёл подходящих участников:\n\n" + "\n\n".join(
+        f"{e['name']} - {e['description']}" for e in mentioned
+    )
+    related_ids = [str(e["id"]) for e in mentioned]
+    # One paragraph without line breaks, longer than a Telegram message
+    long_mentioned = entrepreneurs[:LONG_LINE_MENTIONS]
+    long_line = " ".join(f"{e['name']} ({e['goal']});" for e in long_mentioned)
+    long_related_ids = [str(e["id"]) for e in long_mentioned]
+
+    allowed_tags = [t["name"] for t in dataset["tags"]]
+    clusters_dict = {c["name"]: c["id"] for c in dataset["clusters"]}
+    batch_counter = itertools.count(1)
+    import_batch: Dict[str, Any] = {}
+
+    def new_import_batch() -> None:
+        batch = next(batch_counter)
+        parsed, raw = [], []
+        for i in range(IMPORT_BATCH_SIZE):
+            telegram_id = f"import{batch}_{i}"
+            parsed.append({
+                "telegram_id": telegram_id,
+                "name": f"Новый участник {batch}-{i}",
+                "cluster": rng.choice(list(clusters_dict)),
+                "summary": "Развиваю сервис для малого бизнеса.",
+                "goal": "Ищу партнёров и клиентов.",
+                "emoji": "😊",
+                "tags": rng.sample(allowed_tags, rng.randint(3, 10)),
+            })
+            raw.append({
+                "authorId": telegram_id,
+                "author": f"Участник {batch}-{i}",
+                "messageLink": f"https://t.me/unicornlab/import/{batch}/{i}",
+            })
+        import_batch["parsed"] = parsed
+        import_batch["raw"] = raw
+
+    def run_get_participants() -> None:
+        response = participants.handler({"httpMethod": "GET", "queryStringParameters": {}}, None)
+        if response["statusCode"] != 200:
+            raise RuntimeError(f"get-participants failed: {response['body']}")
+        json.loads(response["body"])
+
+    def forget_payload() -> None:
+        participants._payload_cache["entry"] = None
+
+    def forget_snapshots() -> None:
+        # Measure the live computation, not the stored snapshot or the
+        # already materialized edges
+        import psycopg2
+
+        forget_payload()
+        conn = psycopg2.connect(os.environ["DATABASE_URL"])
+        try:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM t_p95295728_unicorn_lab_visualiz.graph_snapshots")
+                cur.execute("UPDATE t_p95295728_unicorn_lab_visualiz.graph_edge_state SET source_key = NULL")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def run_connection_strength() -> None:
+        for tags1, tags2 in pairs:
+            participants.calculate_connection_strength(tags1, tags2, tag_connections)
+
+    def run_save_to_database() -> None:
+        importer.save_to_database(import_batch["parsed"], import_batch["raw"], allowed_tags, clusters_dict)
+
+    def run_system_prompt() -> None:
+        assistant.create_system_prompt(entrepreneurs)
+
+    def run_format_for_telegram() -> None:
+        telegram_format.format_response_for_telegram(completion_text, related_ids, entrepreneurs)
+
+    def run_split_long_linked_line() -> None:
+        formatted = telegram_format.format_response_for_telegram(long_line, long_related_ids, entrepreneurs)
+        chunks = telegram_format.split_message(formatted)
+        for chunk in chunks:
+            if len(chunk) > telegram_format.TELEGRAM_MESSAGE_LIMIT or _OPEN_LINK.search(_LINK.sub("", chunk)):
+                raise RuntimeError(f"split_message broke a link: {chunk[-200:]!r}")
+        if "".join(chunks) != formatted:
+            raise RuntimeError("split_message lost text of a long line")
+
+    return {
+        "get_participants.handler": (run_get_participants, forget_snapshots),
+        "get_participants.handler.snapshot": (run_get_participants, forget_payload),
+        "calculate_connection_strength": (run_connection_strength, None),
+        "save_to_database": (run_save_to_database, new_import_batch),
+        "create_system_prompt": (run_system_prompt, None),
+        "format_response_for_telegram": (run_format_for_telegram, None),
+        "split_message.long_linked_line": (run_split_long_linked_line, None),
+    }
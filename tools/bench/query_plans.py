@@ -0,0 +1,391 @@
+"""Query-plan regression suite for the SQL the handlers run.
+
+Seeds a disposable Postgres at scale, runs EXPLAIN (ANALYZE, FORMAT JSON) on
+every handler query (writes roll back) and fails when a plan sequentially
+scans a large table it is not allowed to, or when its estimated cost grows
+past the saved baseline:
+
+    BENCH_DATABASE_URL=postgresql://localhost/unicorn_bench \
+        python -m tools.bench.query_plans --size 20000 --save plans_baseline.json
+
+    python -m tools.bench.query_plans --size 20000 --compare plans_baseline.json
+
+The ai-assistant and LLM accounting statements are imported from the
+function modules, so they always match what runs. The get-participants and
+import SQL below mirrors the handlers; update both together.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Set, Tuple
+
+from tools.bench.runner import save_baseline
+from tools.bench.synthetic import SCHEMA, generate_dataset, seed_database
+from tools.functions import load_function
+
+# Sequential scans are fine on tables smaller than this (taxonomy tables)
+SEQ_SCAN_MIN_ROWS = 1000
+TELEGRAM_MESSAGES = 50000
+TELEGRAM_CHATS = 500
+WEB_CHAT_MESSAGES = 50000
+WEB_CHAT_SESSIONS = 2000
+LLM_USAGE_ROWS = 50000
+
+PARTICIPANTS_QUERY = f"""
+    SELECT e.id, e.telegram_id, e.username, e.name, e.role, c.name as cluster_name, e.cluster_id,
+           e.description, e.post_url, e.goal, e.emoji, e.created_at, e.updated_at,
+           COALESCE(array_agg(t.name) FILTER (WHERE t.name IS NOT NULL), '{{}}') as tags,
+           COALESCE(array_agg(t.id) FILTER (WHERE t.id IS NOT NULL), '{{}}') as tag_ids,
+           m.community, m.community_size, m.weighted_degree, m.betweenness
+    FROM {SCHEMA}.entrepreneurs e
+    LEFT JOIN {SCHEMA}.clusters c ON e.cluster_id = c.id
+    LEFT JOIN {SCHEMA}.entrepreneur_graph_metrics m ON m.entrepreneur_id = e.id
+    LEFT JOIN {SCHEMA}.entrepreneur_tags et ON e.id = et.entrepreneur_id
+    LEFT JOIN {SCHEMA}.tags t ON et.tag_id = t.id
+    WHERE 1=1
+"""
+PARTICIPANTS_GROUP = (
+    " GROUP BY e.id, e.telegram_id, e.username, e.name, e.role, c.name, e.cluster_id, e.description,"
+    " e.post_url, e.goal, e.emoji, e.created_at, e.updated_at,"
+    " m.community, m.community_size, m.weighted_degree, m.betweenness ORDER BY e.name"
+)
+
+# name -> (sql, params(sample), tables allowed to be scanned sequentially)
+QUERIES: Dict[str, Tuple[str, Callable[[Dict[str, Any]], tuple], Set[str]]] = {
+    "get-participants/all": (
+        PARTICIPANTS_QUERY + PARTICIPANTS_GROUP,
+        lambda s: (),
+        {"entrepreneurs", "entrepreneur_tags", "entrepreneur_graph_metrics"},
+    ),
+    "get-participants/cluster": (
+        PARTICIPANTS_QUERY + " AND c.name = %s" + PARTICIPANTS_GROUP,
+        lambda s: (s["cluster_name"],),
+        # One cluster holds ~1/12 of the tags; hashing them beats that many index probes
+        {"entrepreneur_tags", "entrepreneur_graph_metrics"},
+    ),
+    "get-participants/search": (
+        PARTICIPANTS_QUERY + f""" AND (LOWER(e.name) LIKE LOWER(%s) OR EXISTS (
+            SELECT 1 FROM {SCHEMA}.entrepreneur_tags et2
+            JOIN {SCHEMA}.tags t2 ON et2.tag_id = t2.id
+            WHERE et2.entrepreneur_id = e.id AND LOWER(t2.name) = LOWER(%s)
+        ))""" + PARTICIPANTS_GROUP,
+        lambda s: (f"%{s['search']}%", s["search"]),
+        # Substring search over names cannot use a btree index
+        {"entrepreneurs", "entrepreneur_tags", "entrepreneur_graph_metrics"},
+    ),
+    "get-participants/ranked": (
+        f"""SELECT entrepreneur_id FROM {SCHEMA}.entrepreneur_graph_metrics
+            ORDER BY betweenness DESC, entrepreneur_id LIMIT %s""",
+        lambda s: (20,),
+        set(),
+    ),
+    "get-participants/ranked_ids": (
+        PARTICIPANTS_QUERY + " AND e.id = ANY(%s)" + PARTICIPANTS_GROUP,
+        lambda s: (s["ranked_ids"],),
+        set(),
+    ),
+    "get-participants/tag_connections": (
+        f"""SELECT t1.name, t2.name, tc.strength
+            FROM {SCHEMA}.tag_connections tc
+            JOIN {SCHEMA}.tags t1 ON tc.tag1_id = t1.id
+            JOIN {SCHEMA}.tags t2 ON tc.tag2_id = t2.id
+            WHERE tc.strength > 0""",
+        lambda s: (),
+        set(),
+    ),
+    "get-participants/data_versions": (
+        f"SELECT name, version FROM {SCHEMA}.data_versions",
+        lambda s: (),
+        set(),
+    ),
+    "get-participants/tag_affinity": (
+        f"SELECT payload FROM {SCHEMA}.tag_affinity ORDER BY id DESC LIMIT 1",
+        lambda s: (),
+        set(),
+    ),
+    "get-tags-config/tags": (
+        f"""SELECT t.name, t.category_id, tc.key
+            FROM {SCHEMA}.tags t
+            JOIN {SCHEMA}.tag_categories tc ON t.category_id = tc.id
+            ORDER BY t.category_id, t.display_order, t.name""",
+        lambda s: (),
+        set(),
+    ),
+    "import/existing_urls": (
+        f"SELECT post_url FROM {SCHEMA}.entrepreneurs WHERE post_url = ANY(%s::text[])",
+        lambda s: (s["post_urls"],),
+        set(),
+    ),
+    "import/tag_ids": (
+        f"SELECT id, name FROM {SCHEMA}.tags",
+        lambda s: (),
+        set(),
+    ),
+    "import/upsert_participant": (
+        f"""INSERT INTO {SCHEMA}.entrepreneurs (
+                telegram_id, name, description, post_url,
+                cluster, cluster_id, goal, emoji, created_at, updated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            ON CONFLICT (telegram_id) DO UPDATE
+            SET name = EXCLUDED.name, description = EXCLUDED.description, post_url = EXCLUDED.post_url,
+                cluster = EXCLUDED.cluster, cluster_id = EXCLUDED.cluster_id, goal = EXCLUDED.goal,
+                emoji = EXCLUDED.emoji, updated_at = CURRENT_TIMESTAMP
+            RETURNING id, (xmax = 0) AS inserted""",
+        lambda s: (s["telegram_id"], "План Тест", "summary", s["post_urls"][0],
+                   s["cluster_name"], s["cluster_id"], "goal", "😊"),
+        set(),
+    ),
+    "import/clear_tags": (
+        f"DELETE FROM {SCHEMA}.entrepreneur_tags WHERE entrepreneur_id = %s",
+        lambda s: (s["entrepreneur_id"],),
+        set(),
+    ),
+    "import/save_tags": (
+        f"""INSERT INTO {SCHEMA}.entrepreneur_tags (entrepreneur_id, tag_id)
+            SELECT %s, unnest(%s::int[])
+            ON CONFLICT (entrepreneur_id, tag_id) DO NOTHING""",
+        lambda s: (s["entrepreneur_id"], s["tag_ids"]),
+        set(),
+    ),
+}
+
+
+def handler_queries() -> Dict[str, Tuple[str, Callable[[Dict[str, Any]], tuple], Set[str]]]:
+    """Queries taken from the function modules themselves"""
+    assistant = load_function("ai-assistant", "shared_logic")
+    llm_usage = load_function("ai-assistant", "llm_usage")
+    # execute_values expands "VALUES %s" into one template per row
+    save_messages = assistant.SAVE_MESSAGES_SQL.replace("VALUES %s", f"VALUES {assistant.SAVE_MESSAGES_TEMPLATE}", 1)
+    return {
+        "ai-assistant/entrepreneurs": (
+            assistant.ENTREPRENEURS_SQL,
+            lambda s: (),
+            {"entrepreneurs"},
+        ),
+        "ai-assistant/history": (
+            assistant.HISTORY_SQL,
+            lambda s: (s["chat_id"], assistant.TELEGRAM_HISTORY_DAYS, 20),
+            set(),
+        ),
+        "ai-assistant/pending": (
+            assistant.PENDING_SQL,
+            lambda s: (s["chat_id"], assistant.TELEGRAM_PENDING_MINUTES),
+            set(),
+        ),
+        "ai-assistant/save_message": (
+            save_messages,
+            lambda s: (0, s["chat_id"], 999_999_999, s["chat_id"], "user", "plan", False),
+            set(),
+        ),
+        "ai-assistant/mark_answered": (
+            assistant.MARK_ANSWERED_SQL,
+            lambda s: (s["chat_id"], s["message_ids"], assistant.TELEGRAM_DEDUP_DAYS),
+            set(),
+        ),
+        "ai-assistant/web_history": (
+            assistant.WEB_HISTORY_SQL,
+            lambda s: (s["session_id"], 0, assistant.WEB_CHAT_HISTORY_LIMIT),
+            set(),
+        ),
+        "ai-assistant/web_session": (
+            assistant.WEB_SESSION_SQL,
+            lambda s: (s["session_id"],),
+            set(),
+        ),
+        "ai-assistant/web_save_turn": (
+            assistant.WEB_SAVE_TURN_SQL,
+            lambda s: (s["session_id"], "plan", s["session_id"], "plan"),
+            set(),
+        ),
+        "llm_usage/spent_today": (
+            llm_usage.SPENT_TODAY_SQL,
+            lambda s: (),
+            set(),
+        ),
+    }
+
+
+def seed_activity(conn) -> None:
+    """Fill the chat and LLM accounting tables so their plans are realistic"""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.telegram_messages (chat_id, message_id, user_id, role, content, answered, created_at)
+            SELECT 500000 + mod(g, %s), g, 500000 + mod(g, %s),
+                   CASE WHEN mod(g, 2) = 0 THEN 'user' ELSE 'assistant' END,
+                   'message ' || g, g > 100, now() - (g || ' seconds')::interval
+            FROM generate_series(1, %s) AS g
+        """, (TELEGRAM_CHATS, TELEGRAM_CHATS, TELEGRAM_MESSAGES))
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.web_chat_sessions (id, created_at, last_active_at)
+            SELECT 'plan-session-' || g, now() - interval '1 day', now() - (g || ' seconds')::interval
+            FROM generate_series(0, %s - 1) AS g
+        """, (WEB_CHAT_SESSIONS,))
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.web_chat_messages (session_id, role, content, created_at)
+            SELECT 'plan-session-' || mod(g, %s),
+                   CASE WHEN mod(g, 2) = 0 THEN 'user' ELSE 'assistant' END,
+                   'message ' || g, now() - (g || ' seconds')::interval
+            FROM generate_series(1, %s) AS g
+        """, (WEB_CHAT_SESSIONS, WEB_CHAT_MESSAGES))
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.llm_usage
+                (function_name, purpose, model, prompt_tokens, completion_tokens, latency_ms, outcome, cost_usd, created_at)
+            SELECT 'ai-assistant', 'assistant_reply', 'gpt-4.1', 1000, 100, 1500, 'ok', 0.003,
+                   now() - ((g * 60) || ' seconds')::interval
+            FROM generate_series(1, %s) AS g
+        """, (LLM_USAGE_ROWS,))
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.entrepreneur_graph_metrics
+                (entrepreneur_id, community, community_size, degree, weighted_degree, betweenness, metrics_version)
+            SELECT id, mod(id, 25), 40, mod(id, 15), mod(id, 15) * 0.6, mod(id * 7919, 1000) / 20000.0,
+                   txid_current()
+            FROM {SCHEMA}.entrepreneurs
+        """)
+        cur.execute("ANALYZE")
+    conn.commit()
+
+
+def build_sample(dataset: Dict[str, List[Dict[str, Any]]], seed: int) -> Dict[str, Any]:
+    """Realistic parameter values drawn from the seeded dataset"""
+    rng = random.Random(seed)
+    entrepreneur = rng.choice(dataset["entrepreneurs"])
+    cluster = rng.choice(dataset["clusters"])
+    return {
+        "entrepreneur_id": entrepreneur["id"],
+        "telegram_id": entrepreneur["telegram_id"],
+        "cluster_name": cluster["name"],
+        "cluster_id": cluster["id"],
+        "search": entrepreneur["name"].split()[0],
+        "post_urls": [e["post_url"] for e in rng.sample(dataset["entrepreneurs"], min(50, len(dataset["entrepreneurs"])))],
+        "chat_id": 500000 + rng.randrange(TELEGRAM_CHATS),
+        "message_ids": [rng.randrange(1, TELEGRAM_MESSAGES) for _ in range(3)],
+        "session_id": f"plan-session-{rng.randrange(WEB_CHAT_SESSIONS)}",
+        "tag_ids": sorted({t["id"] for t in rng.sample(dataset["tags"], min(8, len(dataset["tags"])))}),
+        "ranked_ids": [e["id"] for e in rng.sample(dataset["entrepreneurs"], min(20, len(dataset["entrepreneurs"])))],
+    }
+
+
+def walk(node: Dict[str, Any]):
+    """All nodes of an EXPLAIN JSON plan tree"""
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def explain(cur, sql: str, params: tuple) -> Dict[str, Any]:
+    """EXPLAIN ANALYZE one statement inside a rolled-back transaction"""
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+        plan = cur.fetchone()[0][0]
+    finally:
+        cur.connection.rollback()
+    return plan
+
+
+def table_sizes(cur) -> Dict[str, float]:
+    """Planner row estimates for the app tables"""
+    cur.execute("""
+        SELECT c.relname, c.reltuples
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relkind IN ('r', 'p')
+    """, (SCHEMA,))
+    sizes = {name: float(rows) for name, rows in cur.fetchall()}
+    cur.connection.rollback()
+    return sizes
+
+
+def check_plans(conn, sample: Dict[str, Any], only: Set[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    """Plan stats per query and the sequential-scan violations"""
+    results: Dict[str, Dict[str, Any]] = {}
+    violations: List[str] = []
+    with conn.cursor() as cur:
+        sizes = table_sizes(cur)
+        for name, (sql, params, allowed_seq) in {**QUERIES, **handler_queries()}.items():
+            if only and name not in only:
+                continue
+            plan = explain(cur, sql, params(sample))
+            root = plan["Plan"]
+            seq_scans = sorted({n["Relation Name"] for n in walk(root)
+                                if n["Node Type"] == "Seq Scan" and "Relation Name" in n})
+            results[name] = {
+                "total_cost": root["Total Cost"],
+                "execution_ms": round(plan["Execution Time"], 3),
+                "seq_scans": seq_scans,
+            }
+            for table in seq_scans:
+                if table not in allowed_seq and sizes.get(table, 0) >= SEQ_SCAN_MIN_ROWS:
+                    violations.append(f"{name}: sequential scan on {table} ({int(sizes[table])} rows)")
+    return results, violations
+
+
+def compare_costs(path: str, results: Dict[str, Dict[str, Any]], max_cost_growth: float) -> List[str]:
+    """Human-readable plan-cost regressions against a saved baseline"""
+    baseline = json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+    regressions = []
+    for size, queries in results.items():
+        for name, stats in queries.items():
+            previous = baseline.get(size, {}).get(name)
+            if previous and previous["total_cost"] and stats["total_cost"] > previous["total_cost"] * max_cost_growth:
+                regressions.append(f"{size}/{name}: cost {previous['total_cost']} -> {stats['total_cost']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE every handler query")
+    parser.add_argument("--size", type=int, default=20000, help="participants to seed")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="", help="comma-separated query names")
+    parser.add_argument("--save", help="write plan costs to this baseline file")
+    parser.add_argument("--compare", help="fail on cost regressions against this baseline file")
+    parser.add_argument("--max-cost-growth", type=float, default=1.5)
+    args = parser.parse_args()
+
+    database_url = os.environ.get("BENCH_DATABASE_URL")
+    if not database_url:
+        print("BENCH_DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    if database_url == os.environ.get("DATABASE_URL") and not os.environ.get("BENCH_ALLOW_DATABASE_URL"):
+        print("Refusing to re-seed DATABASE_URL; use a disposable database", file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    dataset = generate_dataset(args.size, seed=args.seed)
+    conn = psycopg2.connect(database_url)
+    try:
+        seed_database(conn, dataset)
+        seed_activity(conn)
+        only = {name for name in args.only.split(",") if name}
+        plans, violations = check_plans(conn, build_sample(dataset, args.seed), only)
+    finally:
+        conn.close()
+
+    size_key = f"participants={args.size}"
+    for name, stats in plans.items():
+        scans = f" seq={','.join(stats['seq_scans'])}" if stats["seq_scans"] else ""
+        print(f"{name:<36} cost={stats['total_cost']:>12.2f} time={stats['execution_ms']:>9.3f}ms{scans}")
+
+    results = {size_key: plans}
+    if args.save:
+        save_baseline(args.save, results, {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "seed": args.seed,
+        })
+        print(f"Baseline saved to {args.save}")
+
+    failures = [f"SEQ SCAN {v}" for v in violations]
+    if args.compare:
+        failures += [f"REGRESSION {r}" for r in compare_costs(args.compare, results, args.max_cost_growth)]
+    for line in failures:
+        print(line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
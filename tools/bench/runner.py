@@ -0,0 +1,86 @@
+"""Timing, memory and baseline helpers in the spirit of pytest-benchmark."""
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Any, Optional
+
+
+def measure(
+    func: Callable[[], Any],
+    rounds: int = 5,
+    warmup: int = 1,
+    setup: Optional[Callable[[], None]] = None,
+) -> Dict[str, float]:
+    """Time func over several rounds, then record its peak traced memory once"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    timings = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(timings)
+    return {
+        "rounds": rounds,
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Any]], meta: Dict[str, Any]) -> None:
+    """Write results as a baseline JSON file"""
+    Path(path).write_text(
+        json.dumps({"meta": meta, "results": results}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+
+
+def compare_to_baseline(
+    path: str,
+    results: Dict[str, Dict[str, Any]],
+    max_slowdown: float = 1.2,
+    max_memory_growth: float = 1.2,
+) -> list:
+    """Return human-readable regressions against a saved baseline"""
+    baseline = json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+    regressions = []
+
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous:
+                continue
+            if previous["median_ms"] and stats["median_ms"] > previous["median_ms"] * max_slowdown:
+                regressions.append(
+                    f"{size}/{name}: median {previous['median_ms']}ms -> {stats['median_ms']}ms"
+                )
+            if previous["peak_kb"] and stats["peak_kb"] > previous["peak_kb"] * max_memory_growth:
+                regressions.append(
+                    f"{size}/{name}: peak {previous['peak_kb']}KB -> {stats['peak_kb']}KB"
+                )
+
+    return regressions
@@ -0,0 +1,285 @@
+"""Seeded synthetic community data for benchmarks.
+
+generate_dataset() builds entrepreneurs, clusters, tags, tag_connections and
+entrepreneur_tags in memory; seed_database() recreates the app schema in a
+local Postgres and bulk-loads the dataset. The base DDL mirrors the tables as
+they stand after V0021; later migrations from db_migrations are applied on
+top so the benchmarks always run against the current schema.
+"""
+import random
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+from tools.functions import MIGRATIONS_DIR
+
+SCHEMA = "t_p95295728_unicorn_lab_visualiz"
+BASE_MIGRATION_VERSION = 21
+
+BASE_SCHEMA_DDL = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA};
+
+CREATE TABLE clusters (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    color VARCHAR(7),
+    display_order INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE tag_categories (
+    id SERIAL PRIMARY KEY,
+    key VARCHAR(50) NOT NULL UNIQUE,
+    name VARCHAR(100) NOT NULL,
+    display_order INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE tags (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    category_id INTEGER REFERENCES tag_categories(id),
+    display_order INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE tag_connections (
+    id SERIAL PRIMARY KEY,
+    tag1_id INTEGER REFERENCES tags(id),
+    tag2_id INTEGER REFERENCES tags(id),
+    strength FLOAT DEFAULT 0.5 CHECK (strength >= 0 AND strength <= 1),
+    connection_type VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(tag1_id, tag2_id)
+);
+CREATE INDEX idx_tags_category ON tags(category_id);
+CREATE INDEX idx_tag_connections_tags ON tag_connections(tag1_id, tag2_id);
+
+CREATE TABLE entrepreneurs (
+    id SERIAL PRIMARY KEY,
+    telegram_id VARCHAR(255) UNIQUE,
+    username VARCHAR(255),
+    name VARCHAR(255) NOT NULL,
+    role VARCHAR(255),
+    cluster VARCHAR(100),
+    description TEXT,
+    tags TEXT[],
+    post_url TEXT,
+    goal TEXT,
+    needs_reanalysis BOOLEAN DEFAULT FALSE,
+    emoji VARCHAR(10) DEFAULT '😊',
+    cluster_id INTEGER REFERENCES clusters(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_entrepreneurs_name ON entrepreneurs(name);
+CREATE INDEX idx_entrepreneurs_cluster ON entrepreneurs(cluster);
+CREATE INDEX idx_entrepreneurs_tags ON entrepreneurs USING GIN(tags);
+CREATE INDEX idx_entrepreneurs_cluster_id ON entrepreneurs(cluster_id);
+
+CREATE TABLE entrepreneur_tags (
+    id SERIAL PRIMARY KEY,
+    entrepreneur_id INTEGER NOT NULL REFERENCES entrepreneurs(id),
+    tag_id INTEGER NOT NULL REFERENCES tags(id),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(entrepreneur_id, tag_id)
+);
+CREATE INDEX idx_entrepreneur_tags_entrepreneur_id ON entrepreneur_tags(entrepreneur_id);
+CREATE INDEX idx_entrepreneur_tags_tag_id ON entrepreneur_tags(tag_id);
+
+CREATE TABLE telegram_messages (
+    id SERIAL PRIMARY KEY,
+    chat_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    user_id BIGINT,
+    role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT idx_telegram_messages_chat_id_created UNIQUE (chat_id, message_id)
+);
+CREATE INDEX idx_telegram_messages_chat_created ON telegram_messages(chat_id, created_at DESC);
+"""
+
+CLUSTERS = [
+    ("IT", "#3b82f6"), ("Маркетинг", "#ef4444"), ("Финансы", "#10b981"),
+    ("Производство", "#f97316"), ("Ритейл", "#8b5cf6"), ("Консалтинг", "#06b6d4"),
+    ("Логистика", "#84cc16"), ("Медиа", "#e11d48"), ("Инвестиции", "#14b8a6"),
+    ("Здоровье", "#ec4899"), ("Недвижимость", "#f59e0b"), ("Образование", "#6366f1"),
+]
+
+TAG_CATEGORIES = {
+    "skills": ("Навыки", ["Разработка", "Маркетинг", "Продажи B2B", "Дизайн", "Аналитика",
+                          "AI/ML", "Нейросети", "HR", "Финансы", "Юриспруденция",
+                          "Управление проектами", "Автоматизация", "Копирайтинг", "SEO"]),
+    "industries": ("Отрасли", ["Финтех", "E-commerce", "EdTech", "HealthTech", "SaaS",
+                               "Ритейл", "Логистика", "Недвижимость", "Производство",
+                               "Медиа", "Туризм", "Агротех", "GameDev", "Крипто"]),
+    "stage": ("Стадия", ["Идея", "MVP", "Первые продажи", "Масштабирование", "Выход на IPO"]),
+    "needs": ("Ищу", ["Инвестиции", "Клиенты", "Сотрудники", "Подрядчики", "Менторство",
+                      "Партнёры", "Экспертиза", "Кофаундер"]),
+    "offers": ("Предлагаю", ["Инвестирую", "Консультирую", "Нетворкинг", "Коучинг",
+                             "Делюсь опытом", "Аутсорс"]),
+}
+
+FIRST_NAMES = ["Александр", "Мария", "Иван", "Елена", "Дмитрий", "Анна", "Сергей", "Ольга",
+               "Алексей", "Наталья", "Михаил", "Татьяна", "Андрей", "Екатерина", "Павел",
+               "Юлия", "Никита", "Ирина", "Артём", "Светлана"]
+LAST_NAMES = ["Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев",
+              "Козлов", "Новиков", "Морозов", "Волков", "Зайцев", "Павлов", "Семёнов",
+              "Голубев", "Виноградов", "Богданов", "Воробьёв", "Фёдоров", "Михайлов"]
+TEXT_WORDS = ["развиваю", "стартап", "платформу", "сервис", "для", "малого", "бизнеса",
+              "ищу", "инвестора", "партнёров", "клиентов", "в", "сфере", "маркетинга",
+              "автоматизации", "продаж", "обучения", "логистики", "финансов", "здоровья",
+              "опыт", "лет", "запустил", "продукт", "команда", "масштабировать", "рынок",
+              "искусственный", "интеллект", "данные", "аналитика", "производство"]
+
+SIZES = [100, 1000, 5000, 20000, 50000]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(TEXT_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def generate_dataset(participants: int, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """Build a deterministic community of the given size"""
+    rng = random.Random(seed)
+
+    clusters = [
+        {"id": i + 1, "name": name, "color": color, "display_order": i}
+        for i, (name, color) in enumerate(CLUSTERS)
+    ]
+
+    categories = []
+    tags = []
+    for order, (key, (category_name, names)) in enumerate(TAG_CATEGORIES.items()):
+        category_id = order + 1
+        categories.append({"id": category_id, "key": key, "name": category_name, "display_order": order})
+        for name in names:
+            tags.append({"id": len(tags) + 1, "name": name, "category_id": category_id})
+
+    tag_connections = []
+    seen_pairs = set()
+    while len(tag_connections) < len(tags) * 2:
+        tag1, tag2 = rng.sample(tags, 2)
+        pair = (tag1["id"], tag2["id"])
+        if pair in seen_pairs or pair[::-1] in seen_pairs:
+            continue
+        seen_pairs.add(pair)
+        tag_connections.append({
+            "tag1_id": tag1["id"],
+            "tag2_id": tag2["id"],
+            "strength": round(rng.uniform(0.3, 1.0), 2),
+            "connection_type": rng.choice(["complementary", "related", "stage_related"]),
+        })
+
+    started = datetime(2025, 1, 1)
+    entrepreneurs = []
+    entrepreneur_tags = []
+    for i in range(participants):
+        cluster = rng.choice(clusters)
+        created_at = started + timedelta(minutes=i * 7)
+        entrepreneur_id = i + 1
+        entrepreneurs.append({
+            "id": entrepreneur_id,
+            "telegram_id": f"bench{entrepreneur_id}",
+            "username": f"user{entrepreneur_id}",
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {entrepreneur_id}",
+            "cluster": cluster["name"],
+            "cluster_id": cluster["id"],
+            "description": _text(rng, rng.randint(12, 30)),
+            "goal": _text(rng, rng.randint(6, 14)),
+            "post_url": f"https://t.me/unicornlab/{entrepreneur_id}",
+            "emoji": "😊",
+            "created_at": created_at,
+            "updated_at": created_at,
+        })
+        for tag in rng.sample(tags, rng.randint(3, 10)):
+            entrepreneur_tags.append({"entrepreneur_id": entrepreneur_id, "tag_id": tag["id"]})
+
+    return {
+        "clusters": clusters,
+        "tag_categories": categories,
+        "tags": tags,
+        "tag_connections": tag_connections,
+        "entrepreneurs": entrepreneurs,
+        "entrepreneur_tags": entrepreneur_tags,
+    }
+
+
+def tag_names_by_entrepreneur(dataset: Dict[str, List[Dict[str, Any]]]) -> Dict[int, List[str]]:
+    """entrepreneur id -> tag names, as the handlers see them"""
+    names = {t["id"]: t["name"] for t in dataset["tags"]}
+    result: Dict[int, List[str]] = {}
+    for row in dataset["entrepreneur_tags"]:
+        result.setdefault(row["entrepreneur_id"], []).append(names[row["tag_id"]])
+    return result
+
+
+def tag_connections_by_name(dataset: Dict[str, List[Dict[str, Any]]]) -> Dict[tuple, float]:
+    """The (tag1, tag2) -> strength map get-participants builds per request"""
+    names = {t["id"]: t["name"] for t in dataset["tags"]}
+    return {
+        (names[c["tag1_id"]], names[c["tag2_id"]]): c["strength"]
+        for c in dataset["tag_connections"]
+    }
+
+
+def _migration_version(path) -> int:
+    match = re.match(r"V(\d+)__", path.name)
+    return int(match.group(1)) if match else 0
+
+
+def apply_later_migrations(conn) -> List[str]:
+    """Apply db_migrations newer than the base DDL, in version order"""
+    applied = []
+    migrations = sorted(
+        (p for p in MIGRATIONS_DIR.glob("V*.sql")
+         if len(re.match(r"V(\d+)", p.name).group(1)) == 4 and _migration_version(p) > BASE_MIGRATION_VERSION),
+        key=_migration_version,
+    )
+    with conn.cursor() as cur:
+        for path in migrations:
+            cur.execute(path.read_text(encoding="utf-8"))
+            applied.append(path.name)
+    conn.commit()
+    return applied
+
+
+def seed_database(conn, dataset: Dict[str, List[Dict[str, Any]]]) -> None:
+    """Recreate the schema and bulk-load the dataset"""
+    from psycopg2.extras import execute_values
+
+    with conn.cursor() as cur:
+        cur.execute(BASE_SCHEMA_DDL)
+    conn.commit()
+    apply_later_migrations(conn)
+
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}, public")
+        execute_values(cur, "INSERT INTO clusters (id, name, color, display_order) VALUES %s",
+                       [(c["id"], c["name"], c["color"], c["display_order"]) for c in dataset["clusters"]])
+        execute_values(cur, "INSERT INTO tag_categories (id, key, name, display_order) VALUES %s",
+                       [(c["id"], c["key"], c["name"], c["display_order"]) for c in dataset["tag_categories"]])
+        execute_values(cur, "INSERT INTO tags (id, name, category_id) VALUES %s",
+                       [(t["id"], t["name"], t["category_id"]) for t in dataset["tags"]])
+        execute_values(cur, "INSERT INTO tag_connections (tag1_id, tag2_id, strength, connection_type) VALUES %s",
+                       [(c["tag1_id"], c["tag2_id"], c["strength"], c["connection_type"])
+                        for c in dataset["tag_connections"]])
+        execute_values(
+            cur,
+            """INSERT INTO entrepreneurs (id, telegram_id, username, name, cluster, cluster_id,
+                   description, goal, post_url, emoji, created_at, updated_at) VALUES %s""",
+            [(e["id"], e["telegram_id"], e["username"], e["name"], e["cluster"], e["cluster_id"],
+              e["description"], e["goal"], e["post_url"], e["emoji"], e["created_at"], e["updated_at"])
+             for e in dataset["entrepreneurs"]],
+            page_size=1000,
+        )
+        execute_values(cur, "INSERT INTO entrepreneur_tags (entrepreneur_id, tag_id) VALUES %s",
+                       [(r["entrepreneur_id"], r["tag_id"]) for r in dataset["entrepreneur_tags"]],
+                       page_size=5000)
+        for table in ("clusters", "tag_categories", "tags", "entrepreneurs"):
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+        cur.execute("ANALYZE")
+    conn.commit()
@@ -0,0 +1,261 @@
+"""Concurrent load harness for the ai-assistant Telegram webhook.
+
+Replays synthetic TelegramUpdate payloads against handler() at a given
+concurrency. The Bot API is a local fake server and the LLM is the OpenAI
+stub in synthetic mode, so only the handler, its threads and Postgres are
+real:
+
+    BENCH_DATABASE_URL=postgresql://localhost/unicorn_bench \
+        python -m tools.bench.webhook_load --requests 200 --concurrency 32 \
+            --llm-latency lognormal:2000:0.5 --seed-size 1000
+
+Reports p50/p95/p99 latency, peak threads, DB connections opened, Bot API
+calls and the timeout/error rate. Requests shed by the LLM governor and
+messages merged into another turn of the same chat are counted separately.
+--db-pool-size sets the assistant's DB_POOL_SIZE (default: two connections
+per concurrent request); lower it to measure queueing for the pool.
+
+To check that overlapping turns of one chat lose nothing, make webhooks give
+up on the chat lock while the previous turn still runs; unanswered_messages
+must stay 0:
+
+    python -m tools.bench.webhook_load --requests 40 --concurrency 8 --chats 2 \
+        --llm-latency fixed:4000 --chat-lock-timeout 1
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+QUERIES = [
+    "Найди инвесторов",
+    "Кто может помочь с маркетингом?",
+    "Ищу разработчиков AI",
+    "Нужен ментор по продажам B2B",
+    "Кто занимается логистикой?",
+    "Посоветуй, с кем обсудить выход на новый рынок",
+]
+
+
+def make_fake_bot_api(latency_ms: float = 0.0) -> ThreadingHTTPServer:
+    """Fake Telegram Bot API answering sendMessage/editMessageText"""
+    counters = {'sendMessage': 0, 'editMessageText': 0, 'other': 0}
+    lock = threading.Lock()
+    message_ids = iter(range(1_000_000, 10_000_000))
+
+    class BotHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            method = self.path.rsplit('/', 1)[-1]
+            with lock:
+                counters[method if method in counters else 'other'] += 1
+                message_id = next(message_ids)
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            body = json.dumps({'ok': True, 'result': {'message_id': message_id}}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BotHandler)
+    server.daemon_threads = True
+    server.counters = counters
+    return server
+
+
+def make_update(update_id: int, chat_id: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'from': {'id': chat_id, 'first_name': 'Load'},
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': rng.choice(QUERIES),
+        },
+    }
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Concurrent Telegram webhook load test')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--chats', type=int, default=50, help='distinct chat ids')
+    parser.add_argument('--llm-latency', default='lognormal:2000:0.5')
+    parser.add_argument('--bot-latency-ms', type=float, default=30.0)
+    parser.add_argument('--timeout', type=float, default=55.0, help='TELEGRAM_PROCESSING_TIMEOUT')
+    parser.add_argument('--merge-window', type=float, default=0.0, help='TELEGRAM_MERGE_WINDOW seconds')
+    parser.add_argument('--chat-lock-timeout', type=float, default=20.0, help='TELEGRAM_CHAT_LOCK_TIMEOUT seconds')
+    parser.add_argument('--llm-max-concurrency', type=int, default=8, help='LLM_MAX_CONCURRENCY')
+    parser.add_argument('--llm-queue-timeout', type=float, default=15.0, help='LLM_QUEUE_TIMEOUT seconds')
+    parser.add_argument('--db-pool-size', type=int, default=0,
+                        help='DB_POOL_SIZE of the assistant (default: two per concurrent request)')
+    parser.add_argument('--seed-size', type=int, default=0, help='re-seed the DB with N participants')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-query-cache', action='store_true', help='send every question to the LLM stub')
+    args = parser.parse_args()
+
+    database_url = os.environ.get('BENCH_DATABASE_URL')
+    if not database_url:
+        print('BENCH_DATABASE_URL is not set', file=sys.stderr)
+        return 2
+
+    import psycopg2
+    from tools.openai_stub import make_server
+
+    if args.seed_size:
+        from tools.bench.synthetic import generate_dataset, seed_database
+        conn = psycopg2.connect(database_url)
+        try:
+            seed_database(conn, generate_dataset(args.seed_size, seed=args.seed))
+        finally:
+            conn.close()
+
+    bot_api = make_fake_bot_api(args.bot_latency_ms)
+    llm = make_server('', latency=args.llm_latency, seed=args.seed, address=('127.0.0.1', 0), synthetic=True)
+    for server in (bot_api, llm):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    os.environ.update({
+        'DATABASE_URL': database_url,
+        'TELEGRAM_BOT_TOKEN': 'load-test',
+        'TELEGRAM_API_URL': f"http://127.0.0.1:{bot_api.server_address[1]}",
+        'TELEGRAM_PROCESSING_TIMEOUT': str(args.timeout),
+        'TELEGRAM_MERGE_WINDOW': str(args.merge_window),
+        'TELEGRAM_CHAT_LOCK_TIMEOUT': str(args.chat_lock_timeout),
+        'LLM_MAX_CONCURRENCY': str(args.llm_max_concurrency),
+        'LLM_QUEUE_TIMEOUT': str(args.llm_queue_timeout),
+        'DB_POOL_SIZE': str(args.db_pool_size or 2 * args.concurrency),
+        'OPENAI_API_KEY': 'stub',
+        'OPENAI_BASE_URL': f"http://127.0.0.1:{llm.server_address[1]}/v1",
+    })
+    if args.no_query_cache:
+        os.environ['QUERY_CACHE_MAX_ENTRIES'] = '0'
+    os.environ.pop('OPENAI_TRANSPORT', None)
+    os.environ.pop('OPENAI_HTTP_PROXY', None)
+
+    # Count every connection the handler opens
+    connections = {'opened': 0}
+    connections_lock = threading.Lock()
+    real_connect = psycopg2.connect
+
+    def counting_connect(*connect_args, **connect_kwargs):
+        with connections_lock:
+            connections['opened'] += 1
+        return real_connect(*connect_args, **connect_kwargs)
+
+    psycopg2.connect = counting_connect
+
+    from tools.functions import load_function
+    assistant = load_function('ai-assistant')
+
+    thread_samples: List[int] = []
+    sampling = threading.Event()
+
+    def sample_threads() -> None:
+        while not sampling.is_set():
+            thread_samples.append(threading.active_count())
+            time.sleep(0.1)
+
+    rng = random.Random(args.seed)
+    updates = [make_update(100_000 + i, 500_000 + rng.randrange(args.chats), rng) for i in range(args.requests)]
+    results: List[Dict[str, Any]] = []
+    results_lock = threading.Lock()
+
+    def send(update: Dict[str, Any]) -> None:
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            response = assistant.handler({'httpMethod': 'POST', 'body': json.dumps(update)}, None)
+            body = json.loads(response['body'] or '{}')
+            if body.get('error') == 'timeout':
+                outcome = 'timeout'
+            elif str(body.get('error', '')).startswith('No LLM slot'):
+                outcome = 'shed'
+            elif body.get('merged') or body.get('queued'):
+                outcome = 'merged' if body.get('merged') else 'queued'
+            elif response['statusCode'] != 200 or not body.get('ok', False):
+                outcome = 'error'
+        except Exception as e:
+            print(f"Handler raised: {e}", file=sys.stderr)
+            outcome = 'exception'
+        with results_lock:
+            results.append({'latency': time.perf_counter() - started, 'outcome': outcome})
+
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(send, updates))
+    wall = time.perf_counter() - started
+    sampling.set()
+    psycopg2.connect = real_connect
+
+    # Every message must end up answered, also those whose webhook gave up on the chat lock
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT count(*) FROM t_p95295728_unicorn_lab_visualiz.telegram_messages
+                WHERE role = 'user' AND NOT answered AND message_id = ANY(%s)
+            """, ([u['message']['message_id'] for u in updates],))
+            unanswered = cur.fetchone()[0]
+    finally:
+        conn.close()
+
+    latencies = sorted(r['latency'] * 1000 for r in results)
+    outcomes: Dict[str, int] = {}
+    for r in results:
+        outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+
+    report = {
+        'requests': len(results),
+        'concurrency': args.concurrency,
+        'db_pool_size': int(os.environ['DB_POOL_SIZE']),
+        'wall_s': round(wall, 2),
+        'throughput_rps': round(len(results) / wall, 2) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 1),
+            'p95': round(percentile(latencies, 0.95), 1),
+            'p99': round(percentile(latencies, 0.99), 1),
+            'max': round(latencies[-1], 1) if latencies else 0.0,
+            'mean': round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        },
+        'threads': {'peak': max(thread_samples, default=0),
+                    'mean': round(statistics.fmean(thread_samples), 1) if thread_samples else 0.0},
+        'db_connections_opened': connections['opened'],
+        'db_connections_per_request': round(connections['opened'] / len(results), 2) if results else 0.0,
+        'bot_api_calls': dict(bot_api.counters),
+        'llm_requests': llm.stats['requests'],
+        'outcomes': outcomes,
+        'timeout_rate': round(outcomes.get('timeout', 0) / len(results), 3) if results else 0.0,
+        'unanswered_messages': unanswered,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    bot_api.shutdown()
+    llm.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
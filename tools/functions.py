@@ -0,0 +1,36 @@
+"""Load backend cloud functions from their directories for local tooling.
+
+Every backend/<function> directory is deployed on its own, with index.py at
+the top level and sibling modules imported by bare name. These helpers put a
+function directory on sys.path and import its modules under unique names so
+several functions can live in one process.
+"""
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "db_migrations"
+
+
+def function_names() -> list:
+    """Names of all backend functions (directories with an index.py)"""
+    return sorted(p.parent.name for p in BACKEND_DIR.glob("*/index.py"))
+
+
+def load_function(name: str, module: str = "index") -> ModuleType:
+    """Import backend/<name>/<module>.py, e.g. load_function('get-participants')"""
+    function_dir = BACKEND_DIR / name
+    module_name = f"{name.replace('-', '_')}__{module}"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if str(function_dir) not in sys.path:
+        sys.path.insert(0, str(function_dir))
+
+    spec = importlib.util.spec_from_file_location(module_name, function_dir / f"{module}.py")
+    loaded = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = loaded
+    spec.loader.exec_module(loaded)
+    return loaded
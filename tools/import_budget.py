@@ -0,0 +1,97 @@
+"""Cold-start import budget for the backend functions.
+
+Imports each function's index.py in a fresh interpreter with
+`python -X importtime`, the same way the platform does on a cold start, and
+fails when the cumulative import time of `index` exceeds the function's
+budget or when a heavy dependency is imported at module load:
+
+    python -m tools.import_budget
+    python -m tools.import_budget --only ai-assistant --runs 5
+
+Budgets live in tools/import_budget.json. The best of --runs is compared so a
+noisy machine does not fail the check.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Any
+
+from tools.functions import BACKEND_DIR, function_names
+
+BUDGETS_PATH = Path(__file__).resolve().parent / "import_budget.json"
+
+PROBE = (
+    "import json, sys\n"
+    "import index\n"
+    "print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))\n"
+)
+
+
+def parse_importtime(stderr: str, module: str = "index") -> float:
+    """Cumulative import time of a top-level module in ms from -X importtime output"""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+            return int(parts[1]) / 1000
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def measure_function(name: str, heavy: List[str]) -> Dict[str, Any]:
+    """Import backend/<name>/index.py once in a clean interpreter"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("PYTHON")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(heavy=heavy)],
+        cwd=BACKEND_DIR / name, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import index failed for {name}:\n{result.stderr[-2000:]}")
+    return {
+        "import_ms": parse_importtime(result.stderr),
+        "heavy_imported": json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def check(names: List[str], budgets: Dict[str, Any], runs: int) -> List[Dict[str, Any]]:
+    heavy = budgets["heavy_modules"]
+    report = []
+    for name in names:
+        measurements = [measure_function(name, heavy) for _ in range(runs)]
+        import_ms = min(m["import_ms"] for m in measurements)
+        budget_ms = budgets["functions"].get(name, budgets["default_ms"])
+        heavy_imported = measurements[0]["heavy_imported"]
+        report.append({
+            "function": name,
+            "import_ms": round(import_ms, 1),
+            "budget_ms": budget_ms,
+            "heavy_imported": heavy_imported,
+            "ok": import_ms <= budget_ms and not heavy_imported,
+        })
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check cold-start import budgets")
+    parser.add_argument("--only", nargs="*", help="function names to check")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    budgets = json.loads(BUDGETS_PATH.read_text(encoding="utf-8"))
+    report = check(args.only or function_names(), budgets, args.runs)
+
+    for row in report:
+        status = "ok" if row["ok"] else "FAIL"
+        line = f"{status:4} {row['function']:24} {row['import_ms']:8.1f} ms  (budget {row['budget_ms']} ms)"
+        if row["heavy_imported"]:
+            line += f"  heavy at import: {', '.join(row['heavy_imported'])}"
+        print(line)
+
+    return 0 if all(row["ok"] for row in report) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
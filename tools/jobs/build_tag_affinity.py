@@ -0,0 +1,161 @@
+"""Learn tag affinities from entrepreneur_tags co-occurrence and publish them.
+
+Computes normalized PMI between every pair of tags over the participants'
+tag sets, merges the result with the curated tag_connections (the stronger
+link wins) and inserts one gzip artifact into tag_affinity. get-participants
+loads the latest artifact once per taxonomy version:
+
+    DATABASE_URL=postgresql://... python -m tools.jobs.build_tag_affinity
+    python -m tools.jobs.build_tag_affinity --min-support 5 --dry-run
+
+Re-run after imports or after editing tag_connections.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+SCHEMA = "t_p95295728_unicorn_lab_visualiz"
+PAYLOAD_FORMAT = 1
+METHOD = "npmi+curated"
+
+
+def npmi_matrix(membership: np.ndarray, min_support: int) -> np.ndarray:
+    """Normalized PMI in [0, 1] for a participants x tags 0/1 matrix
+
+    Pairs seen together fewer than min_support times and negative
+    associations are zero; the diagonal is zero.
+    """
+    participants = membership.shape[0]
+    if participants == 0:
+        return np.zeros((membership.shape[1], membership.shape[1]))
+
+    x = membership.astype(np.float64)
+    together = x.T @ x
+    singles = np.diag(together).copy()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_pair = together / participants
+        p_single = singles / participants
+        pmi = np.log(p_pair / np.outer(p_single, p_single))
+        npmi = pmi / -np.log(p_pair)
+
+    # p_pair == 1 makes the normalizer zero: the tags always co-occur
+    npmi[(together > 0) & (p_pair >= 1.0)] = 1.0
+    npmi[together < min_support] = 0.0
+    npmi = np.nan_to_num(npmi, nan=0.0, posinf=1.0, neginf=0.0)
+    np.fill_diagonal(npmi, 0.0)
+    return np.clip(npmi, 0.0, 1.0)
+
+
+def merge_pairs(
+    tag_ids: List[int],
+    learned: np.ndarray,
+    curated: Dict[Tuple[int, int], float],
+    min_affinity: float
+) -> List[List[float]]:
+    """Sparse [tag1_id, tag2_id, strength] rows with tag1_id < tag2_id"""
+    merged: Dict[Tuple[int, int], float] = {}
+
+    rows, cols = np.nonzero(np.triu(learned >= min_affinity, k=1))
+    for i, j in zip(rows.tolist(), cols.tolist()):
+        a, b = sorted((tag_ids[i], tag_ids[j]))
+        merged[(a, b)] = float(learned[i, j])
+
+    for (tag1, tag2), strength in curated.items():
+        if tag1 == tag2:
+            continue
+        key = (min(tag1, tag2), max(tag1, tag2))
+        merged[key] = max(merged.get(key, 0.0), strength)
+
+    return [[a, b, round(s, 3)] for (a, b), s in sorted(merged.items())]
+
+
+def load_inputs(cur) -> Tuple[List[int], np.ndarray, Dict[Tuple[int, int], float]]:
+    """Tag ids, participants x tags membership matrix and curated links"""
+    cur.execute(f"SELECT id FROM {SCHEMA}.tags ORDER BY id")
+    tag_ids = [row[0] for row in cur.fetchall()]
+    column = {tag_id: i for i, tag_id in enumerate(tag_ids)}
+
+    cur.execute(f"""
+        SELECT entrepreneur_id, array_agg(tag_id)
+        FROM {SCHEMA}.entrepreneur_tags
+        GROUP BY entrepreneur_id
+    """)
+    rows = cur.fetchall()
+    membership = np.zeros((len(rows), len(tag_ids)), dtype=np.uint8)
+    for i, (_, tags) in enumerate(rows):
+        membership[i, [column[t] for t in tags if t in column]] = 1
+
+    cur.execute(f"SELECT tag1_id, tag2_id, strength FROM {SCHEMA}.tag_connections WHERE strength > 0")
+    curated: Dict[Tuple[int, int], float] = {}
+    for tag1, tag2, strength in cur.fetchall():
+        key = (min(tag1, tag2), max(tag1, tag2))
+        curated[key] = max(curated.get(key, 0.0), float(strength))
+
+    return tag_ids, membership, curated
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build and publish the tag affinity matrix")
+    parser.add_argument("--min-support", type=int, default=3,
+                        help="minimum participants sharing a tag pair")
+    parser.add_argument("--min-affinity", type=float, default=0.1,
+                        help="drop learned affinities below this NPMI")
+    parser.add_argument("--keep", type=int, default=5, help="published artifacts to keep")
+    parser.add_argument("--dry-run", action="store_true", help="compute and report, do not publish")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    try:
+        cur = conn.cursor()
+        tag_ids, membership, curated = load_inputs(cur)
+        learned = npmi_matrix(membership, args.min_support)
+        pairs = merge_pairs(tag_ids, learned, curated, args.min_affinity)
+
+        payload = gzip.compress(json.dumps(
+            {"format": PAYLOAD_FORMAT, "pairs": pairs}, separators=(",", ":")
+        ).encode("utf-8"))
+        learned_pairs = int(np.count_nonzero(np.triu(learned >= args.min_affinity, k=1)))
+        print(json.dumps({
+            "participants": membership.shape[0],
+            "tags": len(tag_ids),
+            "learned_pairs": learned_pairs,
+            "curated_pairs": len(curated),
+            "published_pairs": len(pairs),
+            "payload_bytes": len(payload),
+        }))
+
+        if args.dry_run:
+            return 0
+
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.tag_affinity (method, tag_count, pair_count, participant_count, payload)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING id
+        """, (METHOD, len(tag_ids), len(pairs), membership.shape[0], psycopg2.Binary(payload)))
+        artifact_id = cur.fetchone()[0]
+        cur.execute(f"""
+            DELETE FROM {SCHEMA}.tag_affinity
+            WHERE id NOT IN (SELECT id FROM {SCHEMA}.tag_affinity ORDER BY id DESC LIMIT %s)
+        """, (max(args.keep, 1),))
+        conn.commit()
+        print(f"Published tag affinity artifact {artifact_id}")
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""Build or refresh the text-similarity edges between participants.
+
+import-with-clustering refreshes only the participants whose description or
+goal changed, so weights between untouched participants drift as IDF moves
+with new imports. Run with --full after large imports (or from cron) to
+recompute every neighbour list with the current vocabulary:
+
+    DATABASE_URL=... python -m tools.jobs.build_text_similarity --full
+    python -m tools.jobs.build_text_similarity            # changed texts only
+
+Tuning comes from the function's environment variables
+(TEXT_SIMILARITY_TOP_K, TEXT_SIMILARITY_MIN).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from tools.functions import load_function
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Refresh TF-IDF similarity edges between participants")
+    parser.add_argument("--full", action="store_true", help="recompute neighbours of every participant")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    text_similarity = load_function("import-with-clustering", "text_similarity")
+    conn = psycopg2.connect(database_url)
+    try:
+        started = time.monotonic()
+        stats = text_similarity.update_text_similarity(conn, full=args.full)
+        stats["seconds"] = round(time.monotonic() - started, 2)
+        print(json.dumps(stats))
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Compute participant communities and centrality.
+
+get-participants only serves the stored metrics; this job computes them, so
+Louvain and betweenness never run inside a request. A refresh is a no-op
+when the metrics already match the current participants/taxonomy version,
+and otherwise keeps communities stable when only a few participants
+changed. Run it after imports, either from cron or as a listener that
+refreshes whenever an import or taxonomy edit commits:
+
+    DATABASE_URL=... python -m tools.jobs.graph_metrics
+    DATABASE_URL=... python -m tools.jobs.graph_metrics --listen
+    DATABASE_URL=... python -m tools.jobs.graph_metrics --full   # rerun Louvain for everyone
+    GRAPH_METRICS_BETWEENNESS_SAMPLES=500 python -m tools.jobs.graph_metrics --full
+
+--listen waits on the data_versions notifications and refreshes once
+changes have been quiet for --debounce seconds, so a burst of import
+batches costs one refresh. Nightly --full runs undo the drift of
+incremental community assignment.
+"""
+import argparse
+import json
+import os
+import select
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from tools.functions import load_function
+
+# Notifications that change the connection graph
+GRAPH_SOURCES = ("participants", "taxonomy")
+
+
+def refresh(conn, full: bool) -> Optional[Dict[str, Any]]:
+    """Run one refresh; None when the data versions are missing or another refresh is running"""
+    participants_fn = load_function("get-participants")
+    graph_metrics = load_function("get-participants", "graph_metrics")
+    cur = conn.cursor()
+    try:
+        key = participants_fn.version_key(participants_fn.get_data_versions(cur), *GRAPH_SOURCES)
+        if key is None:
+            print("data_versions is missing; apply the migrations first", file=sys.stderr)
+            return None
+
+        def graph_inputs():
+            participants = participants_fn.load_participants(cur)
+            connections = participants_fn.compute_connections(cur, participants, participants_fn.get_taxonomy(cur))
+            return [p["id"] for p in participants], connections
+
+        started = time.monotonic()
+        summary = graph_metrics.refresh_graph_metrics(conn, ".".join(str(v) for v in key), graph_inputs,
+                                                      full=full)
+        if summary is None:
+            print("Another graph metrics refresh is running", file=sys.stderr)
+            return None
+        summary["seconds"] = round(time.monotonic() - started, 2)
+        print(json.dumps(summary))
+        return summary
+    finally:
+        cur.close()
+
+
+def listen(database_url: str, conn, debounce: float) -> None:
+    """Refresh now and after every quiet period following graph changes"""
+    import psycopg2
+
+    listener = psycopg2.connect(database_url)
+    listener.autocommit = True
+    listener.cursor().execute("LISTEN data_versions")
+    print(f"Listening for participant and taxonomy changes (debounce {debounce:.0f}s)")
+    refresh(conn, full=False)
+
+    pending_since: Optional[float] = None
+    while True:
+        timeout = debounce if pending_since is not None else 60.0
+        if select.select([listener], [], [], timeout)[0]:
+            listener.poll()
+            if any(n.payload.split(":", 1)[0] in GRAPH_SOURCES for n in listener.notifies):
+                pending_since = time.monotonic()
+            del listener.notifies[:]
+            continue
+        if pending_since is not None and time.monotonic() - pending_since >= debounce:
+            pending_since = None
+            try:
+                refresh(conn, full=False)
+            except psycopg2.Error as e:
+                # Keep listening; the next change or restart retries
+                print(f"Graph metrics refresh failed: {str(e)}", file=sys.stderr)
+                conn.rollback()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Refresh graph communities and centrality")
+    parser.add_argument("--full", action="store_true", help="rerun Louvain for every participant")
+    parser.add_argument("--listen", action="store_true", help="keep running and refresh after each change")
+    parser.add_argument("--debounce", type=float, default=30.0,
+                        help="seconds without changes before a --listen refresh")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    if args.listen and args.full:
+        print("--full runs once; start --listen separately", file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    try:
+        if args.listen:
+            try:
+                listen(database_url, conn, args.debounce)
+            except KeyboardInterrupt:
+                return 0
+        return 0 if refresh(conn, args.full) is not None else 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Re-classify entrepreneurs flagged with needs_reanalysis.
+
+The import handler skips every post it has already seen, so rows marked by
+V0007 (and anything flagged since) never get re-classified through it. This
+job walks the flagged rows in id order, sends them through the import
+function's own prompt and structured-output schema (several batches at once)
+and writes cluster, tags and missing goals back, one transaction per chunk
+together with its checkpoint. A crash or Ctrl-C loses at most the chunk in
+flight; the next run continues after the last committed id:
+
+    DATABASE_URL=... OPENAI_API_KEY=... python -m tools.jobs.reanalyze
+    python -m tools.jobs.reanalyze --chunk 200 --batch 10 --workers 4
+    python -m tools.jobs.reanalyze --restart     # retry rows that failed earlier
+
+Rows whose batch failed keep the flag and are counted as failed; --restart
+scans from the beginning again and picks them up.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.functions import load_function
+
+SCHEMA = "t_p95295728_unicorn_lab_visualiz"
+JOB_NAME = "reanalyze"
+
+
+def load_checkpoint(cur, restart: bool) -> Tuple[int, int, int]:
+    """(last_id, processed, failed) to resume from"""
+    if restart:
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.job_checkpoints (job_name) VALUES (%s)
+            ON CONFLICT (job_name) DO UPDATE
+            SET last_id = 0, processed = 0, failed = 0, started_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP, finished_at = NULL
+        """, (JOB_NAME,))
+        return 0, 0, 0
+    cur.execute(f"""
+        INSERT INTO {SCHEMA}.job_checkpoints (job_name) VALUES (%s)
+        ON CONFLICT (job_name) DO UPDATE SET finished_at = NULL
+        RETURNING last_id, processed, failed
+    """, (JOB_NAME,))
+    return cur.fetchone()
+
+
+def count_remaining(cur, after_id: int) -> int:
+    cur.execute(f"""
+        SELECT COUNT(*) FROM {SCHEMA}.entrepreneurs
+        WHERE needs_reanalysis AND id > %s
+    """, (after_id,))
+    return cur.fetchone()[0]
+
+
+def fetch_chunk(cur, after_id: int, size: int) -> List[Dict[str, Any]]:
+    """Next flagged rows after the checkpoint, as import-style participants"""
+    cur.execute(f"""
+        SELECT id, telegram_id, name, role, description, goal
+        FROM {SCHEMA}.entrepreneurs
+        WHERE needs_reanalysis AND id > %s
+        ORDER BY id
+        LIMIT %s
+    """, (after_id, size))
+    chunk = []
+    for row_id, telegram_id, name, role, description, goal in cur.fetchall():
+        # The original post text is not stored; what we kept about the person is
+        text = "\n".join(part for part in (role, description, goal and f"Цель: {goal}") if part)
+        chunk.append({
+            "row_id": row_id,
+            "authorId": telegram_id or f"id:{row_id}",
+            "author": name,
+            "text": text,
+        })
+    return chunk
+
+
+def classify(importer, batch: List[Dict[str, Any]], allowed_tags: List[str],
+             clusters: Dict[str, int]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """(parsed participants, error) for one batch"""
+    try:
+        return importer.process_with_structured_output(batch, allowed_tags, clusters), None
+    except Exception as e:
+        return [], str(e)
+
+
+def save_chunk(cur, chunk: List[Dict[str, Any]], parsed: Dict[str, Dict[str, Any]],
+               clusters: Dict[str, int], tag_ids: Dict[str, int], tag_index) -> List[int]:
+    """Write classifications for a chunk; returns row ids that were not updated"""
+    missed = []
+    for participant in chunk:
+        result = parsed.get(participant["authorId"])
+        cluster_id = clusters.get(result["cluster"]) if result else None
+        if not cluster_id:
+            missed.append(participant["row_id"])
+            continue
+
+        row_id = participant["row_id"]
+        cur.execute(f"""
+            UPDATE {SCHEMA}.entrepreneurs
+            SET cluster = %s, cluster_id = %s,
+                goal = COALESCE(NULLIF(goal, ''), %s),
+                emoji = COALESCE(NULLIF(emoji, ''), %s),
+                needs_reanalysis = FALSE,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        """, (result["cluster"], cluster_id, result["goal"], result.get("emoji"), row_id))
+        cur.execute(f"DELETE FROM {SCHEMA}.entrepreneur_tags WHERE entrepreneur_id = %s", (row_id,))
+        tags, _ = tag_index.resolve_all(result["tags"])
+        known = sorted({tag_ids[t] for t in tags})
+        if known:
+            cur.execute(f"""
+                INSERT INTO {SCHEMA}.entrepreneur_tags (entrepreneur_id, tag_id)
+                SELECT %s, unnest(%s::int[])
+                ON CONFLICT (entrepreneur_id, tag_id) DO NOTHING
+            """, (row_id, known))
+    return missed
+
+
+def format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-classify entrepreneurs flagged for reanalysis")
+    parser.add_argument("--chunk", type=int, default=100, help="rows per committed chunk")
+    parser.add_argument("--batch", type=int, default=10, help="rows per LLM request")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent LLM requests")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many rows (0 = all)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and rescan from the start")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    importer = load_function("import-with-clustering")
+    allowed_tags, clusters = importer.get_tags_and_clusters_from_db()
+    if not clusters:
+        print("No clusters in the database", file=sys.stderr)
+        return 1
+
+    conn = psycopg2.connect(database_url)
+    try:
+        cur = conn.cursor()
+        last_id, processed, failed = load_checkpoint(cur, args.restart)
+        cur.execute(f"SELECT name, id FROM {SCHEMA}.tags")
+        tag_ids = dict(cur.fetchall())
+        tag_index = load_function("import-with-clustering", "normalizer").get_name_index(list(tag_ids))
+        remaining = count_remaining(cur, last_id)
+        conn.commit()
+        print(f"Resuming after id {last_id}: {remaining} flagged rows left "
+              f"({processed} done, {failed} failed so far)")
+
+        started = time.monotonic()
+        done_this_run = 0
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as pool:
+            while remaining > 0:
+                size = args.chunk
+                if args.limit:
+                    size = min(size, args.limit - done_this_run)
+                    if size <= 0:
+                        break
+                chunk = fetch_chunk(cur, last_id, size)
+                if not chunk:
+                    break
+
+                batches = [chunk[i:i + args.batch] for i in range(0, len(chunk), args.batch)]
+                parsed: Dict[str, Dict[str, Any]] = {}
+                for results, error in pool.map(lambda b: classify(importer, b, allowed_tags, clusters), batches):
+                    if error:
+                        print(f"Batch failed: {error}")
+                    for result in results:
+                        parsed[result["telegram_id"]] = result
+
+                missed = save_chunk(cur, chunk, parsed, clusters, tag_ids, tag_index)
+                last_id = chunk[-1]["row_id"]
+                processed += len(chunk) - len(missed)
+                failed += len(missed)
+                cur.execute(f"""
+                    UPDATE {SCHEMA}.job_checkpoints
+                    SET last_id = %s, processed = %s, failed = %s, updated_at = CURRENT_TIMESTAMP
+                    WHERE job_name = %s
+                """, (last_id, processed, failed, JOB_NAME))
+                conn.commit()
+
+                done_this_run += len(chunk)
+                remaining = max(remaining - len(chunk), 0)
+                elapsed = time.monotonic() - started
+                rate = done_this_run / elapsed if elapsed else 0.0
+                eta = format_eta(remaining / rate) if rate else "?"
+                print(f"id<={last_id}: +{len(chunk) - len(missed)} ok, {len(missed)} failed | "
+                      f"{rate:.2f} rows/s | {remaining} left | ETA {eta}")
+
+        if remaining == 0:
+            cur.execute(f"""
+                UPDATE {SCHEMA}.job_checkpoints SET finished_at = CURRENT_TIMESTAMP
+                WHERE job_name = %s
+            """, (JOB_NAME,))
+            conn.commit()
+
+        elapsed = time.monotonic() - started
+        print(json.dumps({
+            "processed": processed,
+            "failed": failed,
+            "this_run": done_this_run,
+            "seconds": round(elapsed, 1),
+            "rows_per_second": round(done_this_run / elapsed, 2) if elapsed else None,
+            "last_id": last_id,
+        }))
+        return 0 if failed == 0 else 1
+    except KeyboardInterrupt:
+        conn.rollback()
+        print(f"Interrupted; the next run resumes after id {last_id}", file=sys.stderr)
+        return 130
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
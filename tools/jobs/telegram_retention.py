@@ -0,0 +1,158 @@
+"""Maintain the monthly telegram_messages partitions.
+
+Creates the partitions for the coming months, then archives and drops the
+ones older than the retention window. Dropping a partition is instant and
+leaves no bloat behind, unlike DELETE on one big table. Run it from cron,
+e.g. daily:
+
+    DATABASE_URL=... python -m tools.jobs.telegram_retention --archive-dir /var/backups/telegram
+    python -m tools.jobs.telegram_retention --keep-months 12 --dry-run
+    python -m tools.jobs.telegram_retention --no-archive   # drop without archiving
+
+An archive is one gzip CSV per month (telegram_messages_YYYY_MM.csv.gz, with
+a header row). The partition is dropped only after its archive is fully
+written and synced.
+
+Detaching takes an ACCESS EXCLUSIVE lock on telegram_messages, so history
+reads and webhook writes wait for it. DETACH PARTITION CONCURRENTLY is not
+an option while the table has a default partition (V0029). The lock is held
+only for the catalog change, and it is requested with a short lock_timeout
+and retried, so a long-running read makes the job back off instead of
+queueing every request behind it.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import List, Tuple
+
+SCHEMA = "t_p95295728_unicorn_lab_visualiz"
+PARTITION_NAME = re.compile(r"^telegram_messages_y(\d{4})m(\d{2})$")
+DETACH_LOCK_TIMEOUT_MS = 2000
+DETACH_ATTEMPTS = 5
+
+
+def list_partitions(cur) -> List[Tuple[str, date]]:
+    """(partition name, first day of its month), oldest first"""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        WHERE n.nspname = %s AND p.relname = 'telegram_messages'
+    """, (SCHEMA,))
+    partitions = []
+    for (name,) in cur.fetchall():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def cutoff_month(today: date, keep_months: int) -> date:
+    """First month that is kept; partitions for earlier months expire"""
+    month_index = today.year * 12 + today.month - 1 - keep_months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def archive_partition(cur, name: str, month: date, archive_dir: Path) -> Tuple[Path, int]:
+    """Write the partition as gzip CSV; returns (path, bytes written)"""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"telegram_messages_{month:%Y_%m}.csv.gz"
+    partial = path.with_suffix(".gz.partial")
+    with open(partial, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9) as archive:
+            cur.copy_expert(
+                f"COPY (SELECT id, chat_id, message_id, user_id, role, content, created_at "
+                f"FROM {SCHEMA}.{name} ORDER BY created_at, id) TO STDOUT WITH (FORMAT csv, HEADER)",
+                archive,
+            )
+        raw.flush()
+        os.fsync(raw.fileno())
+    partial.replace(path)
+    return path, path.stat().st_size
+
+
+def drop_partition(conn, name: str) -> None:
+    """Detach and drop a partition, backing off while the parent is busy"""
+    from psycopg2 import errors
+
+    for attempt in range(1, DETACH_ATTEMPTS + 1):
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL lock_timeout = {DETACH_LOCK_TIMEOUT_MS}")
+                cur.execute(f"ALTER TABLE {SCHEMA}.telegram_messages DETACH PARTITION {SCHEMA}.{name}")
+                cur.execute(f"DROP TABLE {SCHEMA}.{name}")
+            conn.commit()
+            return
+        except errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == DETACH_ATTEMPTS:
+                raise
+            print(f"telegram_messages is busy, retrying detach of {name}", file=sys.stderr)
+            time.sleep(attempt * 5)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Create, archive and drop telegram_messages partitions")
+    parser.add_argument("--keep-months", type=int, default=int(os.environ.get("TELEGRAM_RETENTION_MONTHS", "6")),
+                        help="whole months to keep besides the current one")
+    parser.add_argument("--months-ahead", type=int, default=2, help="future partitions to create")
+    parser.add_argument("--archive-dir", default=os.environ.get("TELEGRAM_ARCHIVE_DIR"),
+                        help="where to write gzip CSV archives before dropping")
+    parser.add_argument("--no-archive", action="store_true", help="drop expired partitions without archiving")
+    parser.add_argument("--dry-run", action="store_true", help="report what would happen")
+    args = parser.parse_args()
+
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+    if not args.archive_dir and not args.no_archive:
+        print("Pass --archive-dir (or TELEGRAM_ARCHIVE_DIR), or --no-archive to drop without archiving",
+              file=sys.stderr)
+        return 2
+
+    import psycopg2
+
+    conn = psycopg2.connect(database_url)
+    try:
+        cur = conn.cursor()
+        created = 0
+        if not args.dry_run:
+            cur.execute(f"SELECT {SCHEMA}.ensure_telegram_message_partitions(CURRENT_DATE, %s)",
+                        (args.months_ahead,))
+            created = cur.fetchone()[0]
+            conn.commit()
+
+        cutoff = cutoff_month(date.today(), args.keep_months)
+        expired = [(name, month) for name, month in list_partitions(cur) if month < cutoff]
+        report = {"created": created, "cutoff": cutoff.isoformat(), "dropped": [], "dry_run": args.dry_run}
+
+        for name, month in expired:
+            entry = {"partition": name}
+            if args.dry_run:
+                report["dropped"].append(entry)
+                continue
+            if not args.no_archive:
+                path, size = archive_partition(cur, name, month, Path(args.archive_dir))
+                entry.update(archive=str(path), bytes=size)
+            conn.commit()
+            drop_partition(conn, name)
+            report["dropped"].append(entry)
+            print(f"Dropped {name}" + (f", archived to {entry['archive']}" if "archive" in entry else ""))
+
+        print(json.dumps(report))
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
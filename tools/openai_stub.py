@@ -0,0 +1,127 @@
+"""Local stub of the OpenAI HTTP API backed by recorded fixtures.
+
+Record fixtures once against the real API:
+
+    OPENAI_TRANSPORT=record OPENAI_FIXTURES_DIR=fixtures/openai <run the handler>
+
+then point the functions at the stub instead of the real API:
+
+    python -m tools.openai_stub --fixtures fixtures/openai --latency lognormal:1500:0.4
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=stub <run the handler>
+
+The replay logic is the same module the functions use for OPENAI_TRANSPORT=replay.
+With --synthetic no fixtures are needed: every chat completion is a canned
+assistant answer (AssistantResponse JSON) naming a few IDs from the prompt.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from tools.functions import load_function
+
+_PROMPT_ID_RE = re.compile(r"ID: (\d+)")
+_completion_ids = itertools.count(1)
+
+
+def synthetic_completion(body: bytes) -> dict:
+    """Canned chat.completion whose content parses as an AssistantResponse"""
+    request = json.loads(body or b'{}')
+    prompt = "".join(m.get('content') or '' for m in request.get('messages', []))
+    related_ids = _PROMPT_ID_RE.findall(prompt)[:3]
+    content = json.dumps({
+        'completion_text': 'Нашёл подходящих участников для вашего запроса.',
+        'related_users_ids': related_ids,
+    }, ensure_ascii=False)
+    prompt_tokens = len(prompt) // 4
+    return {
+        'status_code': 200,
+        'headers': {'content-type': 'application/json'},
+        'body': json.dumps({
+            'id': f"chatcmpl-stub-{next(_completion_ids)}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', ''),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content, 'refusal': None},
+                'logprobs': None,
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': 40,
+                      'total_tokens': prompt_tokens + 40},
+        }, ensure_ascii=False),
+    }
+
+
+def make_server(fixtures_dir: str, latency: str = 'recorded', match: str = 'model',
+                seed: int = 0, address: Tuple[str, int] = ('127.0.0.1', 8900),
+                synthetic: bool = False) -> ThreadingHTTPServer:
+    """Build (but do not start) a threaded stub server"""
+    transport = load_function('ai-assistant', 'openai_transport')
+    store = transport.FixtureStore(fixtures_dir)
+    latency_model = transport.LatencyModel(latency, seed)
+    stats = {'requests': 0, 'misses': 0}
+    stats_lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self) -> None:
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if synthetic:
+                delay_ms = latency_model.sample_ms(0.0)
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000)
+                fixture = synthetic_completion(body)
+            else:
+                fixture = transport.replay_response(store, latency_model, match, 'POST', self.path, body)
+            with stats_lock:
+                stats['requests'] += 1
+                if fixture['status_code'] == 404:
+                    stats['misses'] += 1
+
+            content = fixture['body'].encode('utf-8')
+            self.send_response(fixture['status_code'])
+            for name, value in fixture['headers'].items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(address, StubHandler)
+    server.daemon_threads = True
+    server.stats = stats
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay recorded OpenAI responses over HTTP')
+    parser.add_argument('--fixtures', default='openai_fixtures')
+    parser.add_argument('--latency', default='recorded',
+                        help="recorded | none | fixed:MS | uniform:MIN:MAX | lognormal:MEDIAN:SIGMA")
+    parser.add_argument('--match', default='model', choices=['exact', 'model'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--synthetic', action='store_true', help='canned assistant answers, no fixtures')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    args = parser.parse_args()
+
+    server = make_server(args.fixtures, args.latency, args.match, args.seed, (args.host, args.port),
+                         synthetic=args.synthetic)
+    print(f"OpenAI stub on http://{args.host}:{args.port}/v1 serving {args.fixtures}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Stopped after {server.stats['requests']} requests ({server.stats['misses']} misses)")
+
+
+if __name__ == '__main__':
+    main()
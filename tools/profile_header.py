@@ -0,0 +1,34 @@
+"""Print a signed X-Profile header for profiling one production invocation.
+
+The function profiles the request (cProfile + tracemalloc, within its
+PROFILE_MAX_PER_MINUTE limit) and logs the top functions and allocation
+sites, or writes a .pstats file when PROFILE_DIR is set. The signature is
+valid for five minutes:
+
+    PROFILE_SECRET=... python -m tools.profile_header get-participants
+    curl -H "$(PROFILE_SECRET=... python -m tools.profile_header get-participants)" https://...
+"""
+import argparse
+import os
+import sys
+
+from tools.functions import function_names, load_function
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sign an X-Profile request header")
+    parser.add_argument("function", choices=function_names(), help="function to profile")
+    args = parser.parse_args()
+
+    secret = os.environ.get("PROFILE_SECRET")
+    if not secret:
+        print("PROFILE_SECRET is not set", file=sys.stderr)
+        return 2
+
+    profiling = load_function(args.function, "profiling")
+    print(f"X-Profile: {profiling.sign(args.function, secret)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
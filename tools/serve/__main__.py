@@ -0,0 +1,181 @@
+"""Serve every backend function from one long-running asyncio process.
+
+Self-hosting option for the functions in backend/func2url.json. Each one is
+mounted at /<function-name> (sub-paths included). A request becomes the same
+event dict the platform passes to handler, and the handler runs unchanged
+on a thread pool. Because the process lives on, everything the functions
+cache per container stays warm across requests: the taxonomy cache, the
+graph payload and facet index, the ai-assistant caches. Their DB connections
+come from one shared pool (tools/serve/pool.py).
+
+    DATABASE_URL=... python -m tools.serve --port 8000
+    DATABASE_URL=... python -m tools.serve --workers 4 --threads 16 --warm
+    curl 'localhost:8000/get-participants?search=AI'
+
+--workers N forks N processes that share the port through SO_REUSEPORT
+(Linux), and the kernel spreads connections across them. Point
+GET_PARTICIPANTS_URL at this server for import-with-clustering to warm it
+after imports.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict
+
+from tools.serve.functions import build_event, check_shared_modules, load_handlers, response_parts, routes
+from tools.serve.pool import SharedPool, install
+
+# Set by aiohttp itself for the bytes it sends
+SKIPPED_HEADERS = {"connection", "content-length", "keep-alive", "transfer-encoding"}
+
+# GET requests that build the expensive per-process caches
+WARM_REQUESTS = [("get-tags-config", {}), ("get-participants", {}), ("get-participants", {"view": "clusters"})]
+
+
+def warm(handlers: Dict[str, Callable]) -> None:
+    """Fill the taxonomy, graph and cluster caches before taking traffic"""
+    for name, query in WARM_REQUESTS:
+        if name not in handlers:
+            continue
+        event, context = build_event("GET", f"/{name}", {}, query, b"", "127.0.0.1")
+        started = time.perf_counter()
+        try:
+            status = handlers[name](event, context).get("statusCode")
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {str(e)}", file=sys.stderr)
+            continue
+        print(f"Warmed {name} {query or ''} -> {status} in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def make_app(handlers: Dict[str, Callable], executor: ThreadPoolExecutor, pool: SharedPool, max_body: int):
+    from aiohttp import web
+
+    async def dispatch(request, name: str):
+        body = await request.read()
+        event, context = build_event(request.method, request.path, request.headers, request.query,
+                                     body, request.remote or "")
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(executor, handlers[name], event, context)
+        except Exception:
+            traceback.print_exc()
+            return web.json_response({"error": "Internal server error"}, status=500)
+        status, headers, payload = response_parts(response)
+        headers = {k: v for k, v in headers.items() if k.lower() not in SKIPPED_HEADERS}
+        return web.Response(status=status, body=payload, headers=headers)
+
+    async def health(request):
+        return web.json_response({"pid": os.getpid(), "functions": sorted(handlers), "pool": pool.stats()})
+
+    def mount(name: str) -> Callable:
+        async def route(request):
+            return await dispatch(request, name)
+        return route
+
+    async def shutdown(app) -> None:
+        executor.shutdown(wait=True)
+
+    app = web.Application(client_max_size=max_body)
+    for name, path in routes().items():
+        if name in handlers:
+            app.router.add_route("*", path, mount(name))
+            app.router.add_route("*", path + "/{tail:.*}", mount(name))
+    app.router.add_get("/healthz", health)
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+def serve(handlers: Dict[str, Callable], args: argparse.Namespace, reuse_port: bool) -> None:
+    """Run one worker until it is signalled"""
+    from aiohttp import web
+
+    pool = install(args.pool_size or args.threads)
+    executor = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix="handler")
+    if args.warm:
+        warm(handlers)
+    app = make_app(handlers, executor, pool, args.max_body)
+    print(f"Worker {os.getpid()} serving {', '.join(sorted(handlers))} on {args.host}:{args.port}")
+    web.run_app(app, host=args.host, port=args.port, reuse_port=reuse_port or None, print=None)
+
+
+def supervise(handlers: Dict[str, Callable], args: argparse.Namespace) -> int:
+    """Fork the workers and replace any that exits unexpectedly"""
+    context = multiprocessing.get_context("fork")
+
+    def stop(signum, frame) -> None:
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+
+    def start() -> Any:
+        process = context.Process(target=serve, args=(handlers, args, True), daemon=True)
+        process.start()
+        return process
+
+    workers = [start() for _ in range(args.workers)]
+    try:
+        while True:
+            for sentinel in wait([w.sentinel for w in workers]):
+                index = next(i for i, w in enumerate(workers) if w.sentinel == sentinel)
+                print(f"Worker {workers[index].pid} exited with {workers[index].exitcode}; restarting",
+                      file=sys.stderr)
+                time.sleep(1)
+                workers[index] = start()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Serve all backend functions from one process")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the port (SO_REUSEPORT)")
+    parser.add_argument("--threads", type=int, default=16, help="concurrent handler calls per worker")
+    parser.add_argument("--pool-size", type=int, default=0,
+                        help="idle DB connections kept per worker (default: --threads)")
+    parser.add_argument("--max-body", type=int, default=10 * 1024 * 1024, help="largest request body in bytes")
+    parser.add_argument("--only", default="", help="comma-separated functions to mount (default: all)")
+    parser.add_argument("--warm", action="store_true", help="fill participant and taxonomy caches at start")
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        print("DATABASE_URL is not set", file=sys.stderr)
+        return 2
+
+    names = sorted(routes())
+    if args.only:
+        wanted = {n.strip() for n in args.only.split(",") if n.strip()}
+        unknown = wanted - set(names)
+        if unknown:
+            print(f"Unknown functions: {', '.join(sorted(unknown))}", file=sys.stderr)
+            return 2
+        names = [n for n in names if n in wanted]
+
+    problems = check_shared_modules(names)
+    if problems:
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        return 1
+
+    # Import once in the parent so forked workers share the loaded code
+    handlers = load_handlers(names)
+    if args.workers > 1:
+        return supervise(handlers, args)
+    serve(handlers, args, reuse_port=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Mount the backend functions in one process and translate HTTP to events.
+
+Each function directory is deployed on its own and imports its sibling
+modules by bare name, so in one process a shared name such as tracing or
+taxonomy_cache resolves to a single module for every function. That is only
+correct while the copies are identical; check_shared_modules refuses to
+start otherwise.
+"""
+import base64
+import hashlib
+import json
+import uuid
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from tools.functions import BACKEND_DIR, function_names, load_function
+
+
+def routes() -> Dict[str, str]:
+    """Function name -> mount path, for every function listed in func2url.json"""
+    deployed = json.loads((BACKEND_DIR / "func2url.json").read_text(encoding="utf-8"))
+    return {name: f"/{name}" for name in function_names() if name in deployed}
+
+
+def check_shared_modules(names: List[str]) -> List[str]:
+    """Problems with sibling modules that exist in several function directories"""
+    digests: Dict[str, Dict[str, List[str]]] = {}
+    for name in names:
+        for path in sorted((BACKEND_DIR / name).glob("*.py")):
+            if path.name == "index.py":
+                continue
+            digest = hashlib.sha1(path.read_bytes()).hexdigest()
+            digests.setdefault(path.stem, {}).setdefault(digest, []).append(name)
+
+    problems = []
+    for module, variants in sorted(digests.items()):
+        if len(variants) > 1:
+            groups = "; ".join(", ".join(owners) for owners in variants.values())
+            problems.append(f"{module}.py differs between function directories ({groups})")
+    return problems
+
+
+def load_handlers(names: List[str]) -> Dict[str, Callable]:
+    """handler of each function's index module"""
+    return {name: load_function(name).handler for name in names}
+
+
+def build_event(method: str, path: str, headers: Mapping[str, str], query: Mapping[str, str],
+                body: bytes, remote: str) -> Tuple[Dict[str, Any], Any]:
+    """(event, context) in the shape the platform passes to handler"""
+    try:
+        text, encoded = body.decode("utf-8"), False
+    except UnicodeDecodeError:
+        text, encoded = base64.b64encode(body).decode("ascii"), True
+
+    merged: Dict[str, str] = {}
+    for name, value in headers.items():
+        merged[name] = f"{merged[name]}, {value}" if name in merged else value
+
+    request_id = str(uuid.uuid4())
+    event = {
+        "httpMethod": method,
+        "path": path,
+        "headers": merged,
+        "queryStringParameters": dict(query),
+        "body": text,
+        "isBase64Encoded": encoded,
+        "requestContext": {
+            "requestId": request_id,
+            "identity": {"sourceIp": remote},
+            "httpMethod": method,
+        },
+    }
+    return event, SimpleNamespace(request_id=request_id)
+
+
+def response_parts(response: Any) -> Tuple[int, Dict[str, str], bytes]:
+    """(status, headers, body bytes) from a handler's return value"""
+    if not isinstance(response, dict):
+        return 200, {"Content-Type": "application/json"}, json.dumps(response).encode("utf-8")
+
+    headers = {str(k): str(v) for k, v in (response.get("headers") or {}).items()}
+    body = response.get("body")
+    if body is None:
+        payload = b""
+    elif not isinstance(body, str):
+        payload = json.dumps(body).encode("utf-8")
+    elif response.get("isBase64Encoded"):
+        payload = base64.b64decode(body)
+    else:
+        payload = body.encode("utf-8")
+    return int(response.get("statusCode", 200)), headers, payload
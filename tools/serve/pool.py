@@ -0,0 +1,121 @@
+"""One connection pool behind psycopg2.connect for every mounted function.
+
+The handlers open a connection per request and close it when done, which is
+right for short-lived containers. In the long-running server
+psycopg2.connect is replaced with SharedPool.connect. It hands out an idle
+connection for the same DSN, and close() returns that connection to the
+pool instead of closing it. Session state (open transaction, SET,
+LISTEN, advisory locks) is discarded on the way back, so a request cannot
+leak state into the next one. The functions' lazy psycopg2 proxies always
+look attributes up on the real module, so they see the replacement.
+"""
+import threading
+from typing import Any, Callable, Dict, List
+
+
+class PooledConnection:
+    """psycopg2 connection whose close() gives it back to the pool"""
+
+    def __init__(self, raw, pool: "SharedPool", dsn: str):
+        self.__dict__["_raw"] = raw
+        self.__dict__["_pool"] = pool
+        self.__dict__["_dsn"] = dsn
+
+    def __getattr__(self, name: str) -> Any:
+        raw = self.__dict__["_raw"]
+        if raw is None:
+            import psycopg2
+            raise psycopg2.InterfaceError("connection already closed")
+        return getattr(raw, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.__dict__["_raw"], name, value)
+
+    def __enter__(self) -> "PooledConnection":
+        self.__dict__["_raw"].__enter__()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.__dict__["_raw"].__exit__(*exc)
+
+    @property
+    def closed(self) -> int:
+        raw = self.__dict__["_raw"]
+        return 1 if raw is None else raw.closed
+
+    def close(self) -> None:
+        raw = self.__dict__["_raw"]
+        if raw is not None:
+            self.__dict__["_raw"] = None
+            self.__dict__["_pool"].release(raw, self.__dict__["_dsn"])
+
+
+class SharedPool:
+    """Idle connections per DSN, opened on demand and kept up to max_idle"""
+
+    def __init__(self, connect: Callable[..., Any], max_idle: int):
+        self._connect = connect
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def connect(self, dsn=None, connection_factory=None, cursor_factory=None, **kwargs) -> Any:
+        # Anything beyond a plain DSN gets a private connection
+        if dsn is None or connection_factory is not None or cursor_factory is not None or kwargs:
+            return self._connect(dsn, connection_factory=connection_factory,
+                                 cursor_factory=cursor_factory, **kwargs)
+        raw = None
+        with self._lock:
+            idle = self._idle.get(dsn)
+            while idle and raw is None:
+                candidate = idle.pop()
+                if not candidate.closed:
+                    raw = candidate
+                    self.reused += 1
+        if raw is None:
+            raw = self._connect(dsn)
+            with self._lock:
+                self.opened += 1
+        return PooledConnection(raw, self, dsn)
+
+    def release(self, raw, dsn: str) -> None:
+        """Discard session state and keep the connection, or close it"""
+        try:
+            if raw.closed:
+                return
+            raw.rollback()
+            raw.autocommit = True
+            with raw.cursor() as cur:
+                cur.execute("DISCARD ALL")
+            raw.autocommit = False
+            del raw.notices[:]
+            del raw.notifies[:]
+        except Exception:
+            raw.close()
+            return
+
+        with self._lock:
+            idle = self._idle.setdefault(dsn, [])
+            if len(idle) < self.max_idle:
+                idle.append(raw)
+                return
+        raw.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "idle": sum(len(c) for c in self._idle.values()),
+                "opened": self.opened,
+                "reused": self.reused,
+            }
+
+
+def install(max_idle: int) -> SharedPool:
+    """Route psycopg2.connect through a shared pool for this process"""
+    import psycopg2
+
+    pool = SharedPool(psycopg2.connect, max_idle)
+    psycopg2.connect = pool.connect
+    return pool